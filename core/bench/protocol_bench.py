@@ -0,0 +1,77 @@
+# core/bench/protocol_bench.py
+#
+# Microbenchmark: pydantic schemas vs. the slotted hot-path messages.
+# Run with `python -m core.bench.protocol_bench`.
+
+import argparse
+import timeit
+
+from core.protocol.fast_messages import (
+    ExecuteRequestMessage,
+    ExecuteResponseMessage,
+    validate_requests
+)
+
+try:
+    from core.protocol.schemas import ExecuteRequest, ExecuteResponse
+except ImportError:  # pydantic is not installed: time the fast path only
+    ExecuteRequest = ExecuteResponse = None
+
+REQUEST = {
+    "type": "execute_request",
+    "request_id": "uuid-1234",
+    "session_id": "session-abc",
+    "language": "cpp",
+    "code": "int x = 10;",
+    "timeout": 3
+}
+
+RESULT = {
+    "stdout": "15\n",
+    "stderr": "",
+    "status": "ok"
+}
+
+
+def _bench(label, stmt, number, per=1):
+    # Best of three to reduce scheduler noise.
+    best = min(timeit.repeat(stmt, number=number, repeat=3))
+    per_call = best / (number * per) * 1e6
+    print(f"{label:<42} {per_call:8.3f} us/msg")
+    return per_call
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Protocol validation microbenchmark")
+    parser.add_argument("--number", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    n = args.number
+    batch = [dict(REQUEST, request_id=f"uuid-{i}") for i in range(args.batch)]
+    rounds = max(1, n // args.batch)
+
+    print(f"{n} messages, batch size {args.batch}")
+
+    if ExecuteRequest is None:
+        print("pydantic not installed: skipping the schema baseline")
+
+    fast = _bench("ExecuteRequestMessage.validate(data)",
+                  lambda: ExecuteRequestMessage.validate(REQUEST), n)
+    batched = _bench("validate_requests(batch)",
+                     lambda: validate_requests(batch), rounds, args.batch)
+    if ExecuteRequest is not None:
+        base = _bench("ExecuteRequest(**data)", lambda: ExecuteRequest(**REQUEST), n)
+        print(f"{'request speedup (single / batch)':<42} {base / fast:8.1f}x {base / batched:8.1f}x")
+
+    fast = _bench("ExecuteResponseMessage.from_result(...)",
+                  lambda: ExecuteResponseMessage.from_result("uuid-1234", 1, RESULT), n)
+    if ExecuteResponse is not None:
+        base = _bench("ExecuteResponse(...)", lambda: ExecuteResponse(
+            type="execute_response", request_id="uuid-1234", execution_count=1, **RESULT
+        ), n)
+        print(f"{'response speedup':<42} {base / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+# core/bench/suite.py
+#
+# End-to-end benchmarks for the kernel layer.
+#
+#     python -m core.bench.suite --out results.json
+#     python -m core.bench.suite --baseline baseline.json --threshold 0.2
+#
+# Runs against the simulated kernel by default (--kernel cling for the real
+# one). Each scenario runs --repeat times and every metric reports its
+# median. Exits with status 1 if any metric regressed past its threshold
+# (THRESHOLDS, overridable with --metric-threshold, else --threshold).
+#
+# Baselines are machine-specific, so none is checked in. Create one on the
+# machine that runs the comparison, from the commit to compare against:
+#
+#     git checkout <base> && python -m core.bench.suite --repeat 5 --out baseline.json
+#     git checkout <change> && python -m core.bench.suite --baseline baseline.json
+
+import argparse
+import functools
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+
+from core.kernel.cpp_kernel import CppKernel
+from core.kernel.kernal_manager import KernelManager
+from core.kernel.kernel_pool import KernelPool
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.fast_messages import ExecuteResponseMessage, parse_requests
+from core.session.notebook_session import NotebookSession
+from core.utils import proc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Cell text per kernel: the simulator is driven by //sim: directives.
+CELLS = {
+    "sim": {
+        "setup": "//sim: print=setup",
+        "tiny": "//sim: sleep=0",
+        "large": "//sim: out=1048576",
+        "hang": "//sim: hang"
+    },
+    "cling": {
+        "setup": "int bench_x = 0;",
+        "tiny": "bench_x += 1;",
+        "large": 'for (int i = 0; i < 13108; ++i) std::cout << std::string(79, \'x\') << "\\n";',
+        "hang": "while (true) {}"
+    }
+}
+
+# Metrics where a larger value is better; everything else is a cost.
+HIGHER_IS_BETTER = ("_per_sec", "hit_rate", "recovered_ratio")
+
+# Allowed relative regression by metric name ending; the longest match
+# wins and --threshold covers the rest. Tails are noisy, memory and
+# ratios are not.
+THRESHOLDS = {"_p99": 0.5, "max_rss_kb": 0.1, "hit_rate": 0.05, "recovered_ratio": 0.05}
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    if not samples:
+        return {}
+
+    def pick(q):
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    return {"p50": pick(0.5), "p99": pick(0.99), "max": samples[-1]}
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def rss_kb():
+    """Peak RSS of this process and of reaped children, in KiB (None on Windows)."""
+    if resource is None:
+        return {}
+    reap()
+    scale = 1024 if sys.platform == "darwin" else 1
+    return {
+        "self_max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        "children_max_rss_kb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    }
+
+
+def reap():
+    """Wait for exited children nobody waited for (kernels stopped with
+    terminate()), so RUSAGE_CHILDREN counts them."""
+    if not hasattr(os, "WNOHANG"):
+        return
+    while True:
+        try:
+            pid, _ = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+
+
+class ChildRss:
+
+    """Samples the peak RSS of every descendant from /proc while active.
+
+    Sees kernels whether or not they are ever waited for; stays 0 where
+    /proc is unavailable.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            for pid in proc.descendants(os.getpid()):
+                self.peak_kb = max(self.peak_kb, proc.peak_rss_bytes(pid) // 1024)
+            if self._stop.wait(self.interval):
+                return
+
+
+def median_metrics(runs):
+    """Per-metric median over repeated runs of a scenario."""
+    merged = {}
+    for run in runs:
+        for metric in run:
+            merged.setdefault(metric, None)
+    for metric in merged:
+        values = [run[metric] for run in runs if isinstance(run.get(metric), (int, float))]
+        merged[metric] = statistics.median(values) if values else None
+    return merged
+
+
+def run_scenario(scenario, factory, cells, args):
+    """Run a scenario args.repeat times; median metrics plus the peak RSS
+    of the kernels it started (kernel_max_rss_kb)."""
+    runs = []
+    for _ in range(args.repeat):
+        with ChildRss() as children:
+            result = scenario(factory, cells, args)
+        if children.peak_kb:
+            result["kernel_max_rss_kb"] = children.peak_kb
+        runs.append(result)
+        reap()
+    return median_metrics(runs)
+
+
+# ---- scenarios ----
+
+def bench_cold_start(factory, cells, args):
+    samples = []
+    for _ in range(args.starts):
+        kernel = factory()
+        samples.append(timed(kernel.start))
+        kernel.shutdown()
+
+    stats = percentiles(samples)
+    return {"start_seconds_p50": stats["p50"], "start_seconds_p99": stats["p99"]}
+
+
+def bench_pooled_start(factory, cells, args):
+    pool = KernelPool(factory, size=args.pool_size)
+    pool.start()
+    samples = []
+
+    try:
+        for _ in range(args.starts):
+            pool.wait_ready(timeout=30)
+            kernel = None
+
+            def acquire():
+                nonlocal kernel
+                kernel = pool.acquire()
+
+            samples.append(timed(acquire))
+            kernel.shutdown()
+        hit_rate = pool.stats()["hit_rate"]
+    finally:
+        pool.close()
+
+    stats = percentiles(samples)
+    return {
+        "acquire_seconds_p50": stats["p50"],
+        "acquire_seconds_p99": stats["p99"],
+        "hit_rate": hit_rate
+    }
+
+
+def _run_cells(factory, code, count):
+    kernel = factory()
+    kernel.start()
+    samples = []
+
+    try:
+        elapsed = timed(lambda: samples.extend(
+            timed(lambda: kernel.execute(code)) for _ in range(count)
+        ))
+    finally:
+        kernel.shutdown()
+
+    stats = percentiles(samples)
+    return {
+        "cells_per_sec": count / elapsed,
+        "latency_seconds_p50": stats["p50"],
+        "latency_seconds_p99": stats["p99"]
+    }
+
+
+def bench_tiny_cells(factory, cells, args):
+    return _run_cells(factory, cells["tiny"], args.cells)
+
+
+def bench_large_output(factory, cells, args):
+    result = _run_cells(factory, cells["large"], max(1, args.cells // 50))
+    # Each large cell prints 1 MiB.
+    result["output_mb_per_sec"] = result["cells_per_sec"]
+    return result
+
+
+def bench_timeout_storm(factory, cells, args):
+    manager = KernelManager(factory)
+    samples = []
+    recovered = 0
+
+    try:
+        manager.execute(cells["setup"])
+        for _ in range(args.timeouts):
+            # Time from submitting a hung cell to the next cell completing.
+            start = time.perf_counter()
+            manager.execute(cells["hang"], timeout=args.timeout)
+            result = manager.execute(cells["tiny"], timeout=5)
+            samples.append(time.perf_counter() - start - args.timeout)
+            recovered += result["status"] == "ok"
+    finally:
+        manager.kernel.shutdown()
+
+    stats = percentiles(samples)
+    return {
+        "recovery_seconds_p50": stats["p50"],
+        "recovery_seconds_p99": stats["p99"],
+        "recovered_ratio": recovered / args.timeouts
+    }
+
+
+def bench_concurrent_sessions(factory, cells, args):
+    sessions = [NotebookSession(kernel_factory=factory) for _ in range(args.sessions)]
+    samples = []
+    lock = threading.Lock()
+
+    def worker(session):
+        local = [timed(lambda: session.run_cell(cells["tiny"])) for _ in range(args.cells)]
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in sessions]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    for session in sessions:
+        session.kernel.shutdown()
+
+    stats = percentiles(samples)
+    return {
+        "cells_per_sec": len(samples) / elapsed,
+        "latency_seconds_p50": stats["p50"],
+        "latency_seconds_p99": stats["p99"]
+    }
+
+
+def bench_protocol(factory, cells, args):
+    batch = json.dumps([{
+        "type": "execute_request",
+        "request_id": f"uuid-{i}",
+        "session_id": "session-abc",
+        "language": "cpp",
+        "code": "int x = 10;"
+    } for i in range(100)])
+    result = {"stdout": "15\n", "stderr": "", "status": "ok"}
+    rounds = max(1, args.cells // 10)
+
+    decode = timed(lambda: [parse_requests(batch) for _ in range(rounds)])
+    encode = timed(lambda: [
+        json.dumps(ExecuteResponseMessage.from_result("uuid-1", 1, result).to_dict())
+        for _ in range(rounds * 100)
+    ])
+
+    return {
+        "decode_msgs_per_sec": rounds * 100 / decode,
+        "encode_msgs_per_sec": rounds * 100 / encode
+    }
+
+
+SCENARIOS = {
+    "cold_start": bench_cold_start,
+    "pooled_start": bench_pooled_start,
+    "tiny_cells": bench_tiny_cells,
+    "large_output": bench_large_output,
+    "timeout_storm": bench_timeout_storm,
+    "concurrent_sessions": bench_concurrent_sessions,
+    "protocol": bench_protocol
+}
+
+
+# ---- baseline comparison ----
+
+def compare(results, baseline, threshold, thresholds=THRESHOLDS):
+    """Return a list of (scenario, metric, baseline, current, change) regressions.
+
+    thresholds maps metric name endings to their own allowed regression;
+    threshold applies to metrics that match none.
+    """
+    regressions = []
+
+    for scenario, metrics in results.items():
+        for metric, current in metrics.items():
+            base = baseline.get(scenario, {}).get(metric)
+            if not base or not isinstance(current, (int, float)):
+                continue
+
+            change = (current - base) / base
+            if metric.endswith(HIGHER_IS_BETTER):
+                change = -change
+            if change > _threshold(metric, threshold, thresholds):
+                regressions.append((scenario, metric, base, current, change))
+
+    return regressions
+
+
+def _threshold(metric, default, thresholds):
+    matches = [suffix for suffix in thresholds if metric.endswith(suffix)]
+    return thresholds[max(matches, key=len)] if matches else default
+
+
+def _metric_threshold(text):
+    metric, _, value = text.partition("=")
+    try:
+        return metric, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected METRIC=FRACTION, got {text!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kernel layer benchmark suite")
+    parser.add_argument("--kernel", choices=("sim", "cling"), default="sim")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--cells", type=int, default=200)
+    parser.add_argument("--starts", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--timeouts", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=0.2)
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per scenario; metrics report the median")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative regression per metric (0.2 = 20%%)")
+    parser.add_argument("--metric-threshold", type=_metric_threshold, action="append", default=[],
+                        metavar="METRIC=FRACTION",
+                        help="threshold for metrics ending in METRIC (repeatable)")
+    args = parser.parse_args(argv)
+
+    if args.kernel == "sim":
+        factory = functools.partial(SimKernel, seed=0)
+    else:
+        factory = CppKernel
+    cells = CELLS[args.kernel]
+
+    results = {}
+    for name in args.scenarios.split(","):
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = run_scenario(SCENARIOS[name], factory, cells, args)
+
+    report = {
+        "meta": {
+            "kernel": args.kernel,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.time(),
+            "repeat": args.repeat,
+            **rss_kb()
+        },
+        "results": results
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        thresholds = {**THRESHOLDS, **dict(args.metric_threshold)}
+        regressions = compare(results, baseline, args.threshold, thresholds)
+        for scenario, metric, base, current, change in regressions:
+            print(f"REGRESSION {scenario}.{metric}: {base:.6g} -> {current:.6g} "
+                  f"({change:+.1%} worse)", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
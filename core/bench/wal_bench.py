@@ -0,0 +1,72 @@
+# core/bench/wal_bench.py
+#
+# Write cost of the execution WAL per request (accepted, durable started,
+# finished) as concurrent sessions grow, against one fsync per record.
+# Run with `python -m core.bench.wal_bench`.
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from core.protocol.fast_messages import ExecuteRequestMessage
+from core.session.wal import WriteAheadLog
+
+_RESPONSE = {"type": "execute_response", "execution_count": 1, "status": "ok", "stdout": "", "stderr": ""}
+
+
+def bench_group(directory, sessions, requests):
+    wal = WriteAheadLog(directory, commit_delay=0.0)
+
+    def session(index):
+        for n in range(requests):
+            request = ExecuteRequestMessage(f"{index}-{n}", f"s{index}", "cpp", "int x = 1;")
+            wal.accepted(request)
+            wal.started(request.request_id)
+            wal.finished(request.request_id, request.session_id, dict(_RESPONSE, request_id=request.request_id))
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wal.flush()
+    elapsed = time.perf_counter() - start
+    stats = wal.stats()
+    wal.close()
+    return elapsed, stats["records_per_commit"]
+
+
+def bench_naive(directory, requests):
+    # Baseline: every record written and fsynced on its own.
+    path = os.path.join(directory, "naive.log")
+    record = b"x" * 96
+    start = time.perf_counter()
+    with open(path, "ab") as f:
+        for _ in range(requests * 3):
+            f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Execution WAL benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="requests per session")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 64])
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        naive = bench_naive(directory, args.requests)
+        print(f"{'fsync per record':<28} {naive / args.requests * 1e6:10.1f} us/request")
+        for sessions in args.sessions:
+            elapsed, batch = bench_group(os.path.join(directory, f"wal-{sessions}"), sessions, args.requests)
+            total = sessions * args.requests
+            print(f"{f'group commit, {sessions} sessions':<28} {elapsed / total * 1e6:10.1f} us/request"
+                  f"  ({batch:.1f} records/fsync)")
+
+
+if __name__ == "__main__":
+    main()
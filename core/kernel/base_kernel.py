@@ -2,18 +2,26 @@
 
 from abc import ABC, abstractmethod
 
+class KernelDied(RuntimeError):
+    """Raised when the kernel process exits while it is being used."""
+
 class BaseKernel(ABC):
 
     """Abstract interface for language execution kernels."""
 
+    # Name of a kernel that outlives this process (RemoteKernel); None
+    # for kernels this process owns.
+    kernel_id = None
+
     @abstractmethod
     def start(self):
         """Initialize and start the kernel process or session."""
         pass
 
     @abstractmethod
-    def execute(self, code: str) -> dict:
+    def execute(self, code: str, on_output=None) -> dict:
         """Execute code and return stdout/stderr/status output.
+        If given, on_output(stream, data) is called for each chunk as it is read.
         Returns:
         {
           stdout: str,
@@ -31,3 +39,16 @@ class BaseKernel(ABC):
     def shutdown(self):
         """Gracefully shut down the kernel and release resources."""
         pass
+
+    def is_alive(self):
+        """False once the kernel is known to have exited."""
+        return True
+
+    def detach(self):
+        """Let go of the kernel but leave it running where it can outlive
+        this process; other kernels are shut down."""
+        self.shutdown()
+
+    def rename(self, kernel_id):
+        """Change kernel_id."""
+        self.kernel_id = kernel_id
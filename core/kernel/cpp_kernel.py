@@ -1,38 +1,109 @@
 # core/kernel/cpp_kernel.py
 
+import codecs
+import os
+import select
 import subprocess
 import signal
-from core.kernel.base_kernel import BaseKernel
+import threading
+import time
+from core.kernel.base_kernel import BaseKernel, KernelDied
+from core.kernel.transcript import STDIN, STDOUT, STDERR
+from core.utils.metrics import REGISTRY
+
+# Per-phase timings. Cling does not report JIT and run time separately, so
+# "first_byte" covers compilation plus user code up to its first output.
+_PHASE_HELP = "Time spent in each phase of a Cling execution"
+_WRITE_TIME = REGISTRY.histogram("kernel_phase_seconds", _PHASE_HELP, phase="stdin_write")
+_FIRST_BYTE_TIME = REGISTRY.histogram("kernel_phase_seconds", _PHASE_HELP, phase="first_byte")
+_READ_TIME = REGISTRY.histogram("kernel_phase_seconds", _PHASE_HELP, phase="output_read")
+_EXECUTE_TIME = REGISTRY.histogram("kernel_phase_seconds", _PHASE_HELP, phase="total")
+_STARTS = REGISTRY.counter("kernel_starts_total", "Kernel processes started")
+_BYTES_READ = REGISTRY.counter("kernel_bytes_read_total", "Output bytes read from kernels")
+
+# Written to stderr after every cell, before the prompt, so stderr has an
+# end of cell too and none of a cell's stderr is left for the next one.
+# The REPL wrappers (sim_cling, native_host, replay_cling) write it
+# themselves; real Cling runs MARKER_CELL after each cell.
+DONE_MARKER = "\x1eccollab-done\n"
+MARKER_CELL = 'fputs("\\x1e" "ccollab-done\\n", stderr), fflush(stderr);'
+# Run once at start so MARKER_CELL compiles.
+SETUP_CELL = "#include <cstdio>"
 
 class CppKernel(BaseKernel):
 
     """Kernel wrapper for running C/C++ code via Cling."""
 
-    def __init__(self):
+    # Sent after each cell to make the REPL write DONE_MARKER; None when
+    # the REPL writes it on its own.
+    marker_cell = MARKER_CELL
+
+    def __init__(self, command=None, recorder=None):
+        # Command line of the REPL; anything speaking Cling's prompt protocol works.
+        self.command = command or ["cling", "--nologo"]
+
+        # Optional TranscriptRecorder capturing raw pipe traffic.
+        self.recorder = recorder
+
         # Track the Cling subprocess instance.
         self.process = None
 
+        # Working directory of the REPL (e.g. a session's uploaded files);
+        # None inherits ours.
+        self.cwd = None
+
+        # Partial lines read from stdout and stderr, by fd.
+        self._pending = {}
+        self._decoders = {}
+
+        # One execution at a time: a call abandoned by a timeout keeps reading
+        # until the interrupt prompt, and the next call must not share the pipe.
+        self._execute_lock = threading.Lock()
+
+        # perf_counter_ns() stamps of the last execute: write start, write
+        # end, first output line, prompt seen.
+        self.last_timings = None
+
     def start(self):
         # Start the Cling REPL process.
         self.process = subprocess.Popen(
-            ["cling", "--nologo"],
+            self.command,
             stdin=subprocess.PIPE,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
-            bufsize=1
+            bufsize=1,
+            cwd=self.cwd
         )
 
+        for stream in (self.process.stdout, self.process.stderr):
+            self._pending[stream.fileno()] = ""
+            self._decoders[stream.fileno()] = codecs.getincrementaldecoder("utf-8")("replace")
+
         # Consume the initial prompt so reads are clean.
         self._drain_prompt()
-
-    def execute(self, code: str) -> dict:
-        # Send code to Cling and flush to ensure execution.
-        self.process.stdin.write(code + "\n")
-        self.process.stdin.flush()
-
-        # Read output until the next prompt is seen.
-        stdout, stderr = self._read_until_prompt()
+        if self.marker_cell is not None:
+            self._write(SETUP_CELL)
+            self._read_until_prompt()
+        _STARTS.inc()
+
+    def execute(self, code: str, on_output=None) -> dict:
+        with self._execute_lock:
+            # Send code to Cling and flush to ensure execution.
+            t_start = time.perf_counter_ns()
+            self._write(code)
+            t_written = time.perf_counter_ns()
+
+            # Read output until the next prompt is seen.
+            stdout, stderr, t_first = self._read_until_prompt(on_output)
+            t_done = time.perf_counter_ns()
+
+        self.last_timings = (t_start, t_written, t_first, t_done)
+        _WRITE_TIME.record_ns(t_written - t_start)
+        _FIRST_BYTE_TIME.record_ns(t_first - t_written)
+        _READ_TIME.record_ns(t_done - t_first)
+        _EXECUTE_TIME.record_ns(t_done - t_start)
+        _BYTES_READ.inc(len(stdout) + len(stderr))
 
         return {
             "stdout": stdout,
@@ -45,33 +116,88 @@ class CppKernel(BaseKernel):
         if self.process and self.process.poll() is None:
             self.process.send_signal(signal.SIGINT)
 
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
     def shutdown(self):
         # Terminate the Cling process.
         self.process.terminate()
 
     # ---- internal helpers ----
 
-    def _wait_for_prompt(self):
-        while True:
-            if "cling>" in self.process.stdout.readline():
-                break   
+    def _write(self, code):
+        # The cell, then the marker cell when the REPL needs one.
+        data = code + "\n"
+        if self.marker_cell is not None:
+            data += self.marker_cell + "\n"
+        if self.recorder is not None:
+            self.recorder.write(STDIN, code + "\n")
+            if self.marker_cell is not None:
+                self.recorder.write(STDIN, self.marker_cell + "\n")
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
 
     def _drain_prompt(self):
         """Read until the initial Cling prompt appears."""
-        while "cling>" not in self.process.stdout.readline():
-            pass
-
-    def _read_until_prompt(self):
-        """Collect stdout/stderr output until the prompt is encountered."""
-        out, err = [], []
-
+        stdout = self.process.stdout.fileno()
         while True:
-            line = self.process.stdout.readline()
-            if "cling>" in line:
-                break
-            out.append(line)
-
-        while self.process.stderr.peek():
-            err.append(self.process.stderr.readline())
-
-        return "".join(out), "".join(err)
+            lines = self._read_lines([stdout])
+            if lines is None:
+                raise KernelDied(f"Kernel exited during startup (code {self.process.wait()})")
+            if any("cling>" in line for _, line in lines):
+                return
+
+    def _read_until_prompt(self, on_output=None):
+        """Collect stdout/stderr output until the prompt and the stderr
+        marker have both arrived (one prompt per cell sent). Also returns
+        when the first line (output or prompt) arrived."""
+        out, err = [], []
+        t_first = None
+        stdout, stderr = self.process.stdout.fileno(), self.process.stderr.fileno()
+        prompts = 1 if self.marker_cell is None else 2
+        marked = False
+
+        while prompts or not marked:
+            lines = self._read_lines([fd for fd, wanted in ((stdout, prompts), (stderr, not marked)) if wanted])
+            if lines is None:
+                raise KernelDied(f"Kernel exited (code {self.process.wait()})")
+            if t_first is None:
+                t_first = time.perf_counter_ns()
+
+            for fd, line in lines:
+                if fd == stdout:
+                    if "cling>" in line:
+                        prompts -= 1
+                        continue
+                    out.append(line)
+                    if on_output:
+                        on_output("stdout", line)
+                    continue
+
+                if line.endswith(DONE_MARKER):
+                    marked = True
+                    line = line[:-len(DONE_MARKER)]
+                    if not line:
+                        continue
+                err.append(line)
+                if on_output:
+                    on_output("stderr", line)
+
+        return "".join(out), "".join(err), t_first
+
+    def _read_lines(self, fds):
+        """Block until one of fds has data; returns the complete lines read
+        as (fd, line), or None once the process closed its pipes."""
+        ready, _, _ = select.select(fds, [], [])
+        lines = []
+        for fd in ready:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            # Recorded raw, so a replay reproduces what decoding sees.
+            if self.recorder is not None:
+                self.recorder.write(STDOUT if fd == self.process.stdout.fileno() else STDERR, chunk)
+            text = self._pending[fd] + self._decoders[fd].decode(chunk)
+            *complete, self._pending[fd] = text.split("\n")
+            lines.extend((fd, line + "\n") for line in complete)
+        return lines
@@ -1,23 +1,139 @@
 # core/kernel/kernel_manager.py
 
+import threading
+import time
+from core.kernel.base_kernel import KernelDied
 from core.kernel.cpp_kernel import CppKernel
+from core.kernel.standby_kernel import StandbyKernel
+from core.utils.proc import kernel_rss_bytes
 from core.utils.timeout import run_with_timeout, ExecutionTimeout
+from core.utils.metrics import REGISTRY
+
+_EXECUTE_TIME = REGISTRY.histogram(
+    "manager_execute_seconds", "KernelManager.execute wall time including timeout handling"
+)
+_TIMEOUTS = REGISTRY.counter("kernel_timeouts_total", "Executions that hit their timeout")
+_ERRORS = REGISTRY.counter("kernel_errors_total", "Executions that raised in the kernel layer")
+_RESTARTS = REGISTRY.counter("kernel_restarts_total", "Kernel restarts")
+_FAILOVERS = REGISTRY.counter("kernel_failovers_total", "Kernels replaced by their standby")
+_RECYCLE_HELP = "Kernels replaced in the background by the recycle policy"
+_RECYCLED = {
+    reason: REGISTRY.counter("kernel_recycles_total", _RECYCLE_HELP, reason=reason)
+    for reason in ("cells", "rss", "pressure")
+}
+_RESTORES = REGISTRY.counter("kernel_restores_total", "Evicted kernels brought back on demand")
+_RESTORE_FAILURES = REGISTRY.counter(
+    "kernel_restore_failures_total", "Restores that gave up and reset the kernel"
+)
+
+# A replacement that diverges, or is over recycle_rss as soon as it is
+# swapped in, holds the policy off for RECYCLE_BACKOFF cells, doubling
+# each time; after RECYCLE_GIVE_UP such failures in a row it stops.
+RECYCLE_BACKOFF = 8
+RECYCLE_GIVE_UP = 5
+
+class _Detachable:
+
+    """on_output wrapper that can be cut off from a call left running."""
+
+    __slots__ = ("target",)
+
+    def __init__(self, target):
+        self.target = target
+
+    def __call__(self, stream, data):
+        target = self.target
+        if target is not None:
+            target(stream, data)
+
+    def detach(self):
+        self.target = None
+
+class RestoreFailed(Exception):
+    pass
 
 class KernelManager:
 
-    def __init__(self):
-        self.kernel = CppKernel()
-        self.kernel.start()
+    def __init__(self, kernel_factory=CppKernel, standby=False, failover_timeout=5.0,
+                 recycle_after=None, recycle_rss=None, replay_cells=None,
+                 restore_timeout=60.0, on_state_lost=None, kernel_name=None, kernel=None):
+        # kernel_factory() builds an unstarted BaseKernel (e.g. SimKernel in benchmarks).
+        self.kernel_factory = kernel_factory
+        # kernel_id of the primary kernel when kernels outlive this process
+        # (RemoteKernel), so a restarted gateway reattaches to it.
+        self.kernel_name = kernel_name
+        # kernel, if given, is already started (e.g. from a KernelPool).
+        if kernel is None:
+            self.kernel = self._new_kernel()
+        else:
+            self.kernel = kernel
+            self._adopt(kernel)
+
+        # Optional second kernel replaying mirror()ed cells, swapped in when
+        # the primary dies or on restart_kernel(preserve_state=True).
+        self.standby = StandbyKernel(kernel_factory) if standby else None
+        self.failover_timeout = failover_timeout
+
+        # Recycle policy: replace the kernel after recycle_after cells or once
+        # its RSS passes recycle_rss bytes. The replacement is started and fed
+        # the history in the background, then swapped in between cells.
+        self.recycle_after = recycle_after
+        self.recycle_rss = recycle_rss
+        self.cells_run = 0
+        self._replacement = None
+        self._replacement_reason = None
+        self.recycle_failures = 0
+        self._recycle_wait = 0
+
+        # State-changing cells (see mirror), kept when something replays them.
+        # replay_cells() returns the cells that rebuild the state, e.g. a
+        # compacted History script; by default the mirrored cells themselves.
+        self.history = [] if standby or recycle_after or recycle_rss else None
+        self.replay_cells = replay_cells or (lambda: list(self.history or ()))
 
-    def execute(self, code: str, timeout=3):
+        # Bound on replaying the history into a restored kernel. Past it, or
+        # if a replayed cell fails, the kernel starts empty and
+        # on_state_lost() tells the owner its recorded cells are gone.
+        self.restore_timeout = restore_timeout
+        self.on_state_lost = on_state_lost
+
+        # Held while a cell runs; evict() skips busy managers.
+        self._lock = threading.Lock()
+        self.last_active = time.monotonic()
+
+    def execute(self, code: str, timeout=3, on_output=None):
+        with self._lock:
+            try:
+                return self._execute(code, timeout, on_output)
+            finally:
+                self.last_active = time.monotonic()
+
+    def _execute(self, code, timeout, on_output):
+        start = time.perf_counter_ns()
+        self._swap_replacement()
+        self.cells_run += 1
+        output = None
         try:
+            if self.kernel is None:
+                self._restore()
+
+            if timeout is None:
+                # No watchdog thread needed without a deadline.
+                return self.kernel.execute(code, on_output)
+
+            output = _Detachable(on_output) if on_output is not None else None
             return run_with_timeout(
-                lambda: self.kernel.execute(code),
+                lambda: self.kernel.execute(code, output),
                 timeout
             )
 
         except ExecutionTimeout:
+            # The abandoned call keeps reading the kernel (e.g. "Interrupted");
+            # none of it may reach the caller after the timeout result.
+            if output is not None:
+                output.detach()
             # Attempt soft interrupt
+            _TIMEOUTS.inc()
             self.kernel.interrupt()
 
             return {
@@ -26,14 +142,253 @@ class KernelManager:
                 "status": "timeout"
             }
 
+        except RestoreFailed as e:
+            _ERRORS.inc()
+            return {
+                "stdout": "",
+                "stderr": f"{e}; kernel reset, earlier definitions are lost",
+                "status": "error"
+            }
+
+        except KernelDied as e:
+            _ERRORS.inc()
+            message = str(e)
+            if self.failover():
+                message += "; state restored from standby kernel"
+            elif self.standby is not None:
+                # The standby diverged or lagged: rebuild from the history.
+                message += self._replay_after_crash()
+            return {
+                "stdout": "",
+                "stderr": message,
+                "status": "error"
+            }
+
         except Exception as e:
+            _ERRORS.inc()
             return {
                 "stdout": "",
                 "stderr": str(e),
                 "status": "error"
             }
 
-    def restart_kernel(self):
-        self.kernel.shutdown()
-        self.kernel = CppKernel()
-        self.kernel.start()
+        finally:
+            _EXECUTE_TIME.record_ns(time.perf_counter_ns() - start)
+            self._check_recycle()
+
+    def mirror(self, code: str):
+        """Record a state-changing cell for kernels that must replay it."""
+        if self.history is None:
+            return
+        self.history.append(code)
+        if self.standby is not None:
+            self.standby.mirror(code)
+        if self._replacement not in (None, self.standby):
+            self._replacement.mirror(code)
+
+    def failover(self):
+        """Swap in the standby kernel; False if there is none caught up."""
+        if self.standby is None:
+            return False
+
+        kernel = self.standby.promote(self.failover_timeout)
+        if kernel is None:
+            return False
+
+        _FAILOVERS.inc()
+        old, self.kernel = self.kernel, kernel
+        if old is not None:
+            old.shutdown()
+        self._adopt(kernel)
+        self.cells_run = 0
+
+        # Rebuild the next standby from the shortest equivalent script.
+        self.standby.clear(self.replay_cells())
+        return True
+
+    def evict(self):
+        """Shut an idle kernel down to free its memory. The next execute
+        brings it back from the standby or by replaying the history.
+        Returns False if a cell is running or there is nothing to evict."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self.kernel is None:
+                return False
+            self._drop_replacement()
+            self.kernel.shutdown()
+            self.kernel = None
+            return True
+        finally:
+            self._lock.release()
+
+    def recycle(self):
+        """Start a background replacement now, regardless of the policy.
+        Returns False if a cell is running or one is already under way."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._replacement is not None or self.kernel is None:
+                return False
+            self._start_replacement("pressure")
+            return True
+        finally:
+            self._lock.release()
+
+    def shutdown(self, detach=False):
+        """Stop the kernels. With detach the primary kernel is only let go
+        of, so a kernel host keeps it for the next gateway."""
+        if self.standby is not None:
+            self.standby.close()
+        self._drop_replacement()
+        if self.kernel is None:
+            return
+        if detach:
+            self.kernel.detach()
+        else:
+            self.kernel.shutdown()
+
+    def restart_kernel(self, preserve_state=False):
+        """Replace the kernel; returns True if its state was kept."""
+        _RESTARTS.inc()
+        if preserve_state and self.failover():
+            return True
+
+        if self.kernel is not None:
+            self.kernel.shutdown()
+        self.kernel = self._new_kernel()
+        self.cells_run = 0
+        self._drop_replacement()
+        # A fresh kernel with no history gets the policy back.
+        self.recycle_failures = self._recycle_wait = 0
+        if self.history is not None:
+            self.history = []
+        if self.standby is not None:
+            self.standby.clear()
+        return False
+
+    # ---- internal helpers ----
+
+    def _check_recycle(self):
+        if self._replacement is not None or self.recycle_failures >= RECYCLE_GIVE_UP:
+            return
+        if self._recycle_wait:
+            self._recycle_wait -= 1
+            return
+
+        if self.recycle_after and self.cells_run >= self.recycle_after:
+            self._start_replacement("cells")
+        elif self.recycle_rss and kernel_rss_bytes(self.kernel) >= self.recycle_rss:
+            self._start_replacement("rss")
+
+    def _start_replacement(self, reason):
+        self._replacement_reason = reason
+        if self.standby is not None:
+            # The standby already holds the state; the next cell swaps it in.
+            self._replacement = self.standby
+            return
+
+        # A normal-priority standby fed the whole history, used once.
+        self._replacement = StandbyKernel(self.kernel_factory, niceness=0)
+        for code in self.replay_cells():
+            self._replacement.mirror(code)
+
+    def _swap_replacement(self):
+        replacement = self._replacement
+        if replacement is None:
+            return
+
+        # Only swap once caught up; otherwise try again before the next cell.
+        kernel = replacement.promote(0, rebuild=replacement is self.standby)
+        if kernel is None:
+            if replacement is not self.standby and replacement.diverged:
+                # Replay diverged (the replacement closed itself); keep the
+                # current kernel and retry later.
+                self._replacement = None
+                self.cells_run = 0
+                self._recycle_failed()
+            return
+
+        self._replacement = None
+
+        _RECYCLED[self._replacement_reason].inc()
+        old, self.kernel = self.kernel, kernel
+        old.shutdown()
+        self._adopt(kernel)
+        self.cells_run = 0
+        if replacement is self.standby:
+            self.standby.clear(self.replay_cells())
+
+        if self.recycle_rss and kernel_rss_bytes(kernel) >= self.recycle_rss:
+            # Replaying the history alone fills it; recycling again won't help soon.
+            self._recycle_failed()
+        else:
+            self.recycle_failures = 0
+
+    def _recycle_failed(self):
+        self.recycle_failures += 1
+        self._recycle_wait = RECYCLE_BACKOFF << (self.recycle_failures - 1)
+
+    def _replay_after_crash(self):
+        # Status suffix for a crash the standby could not cover.
+        dead, self.kernel = self.kernel, None
+        dead.shutdown()
+        try:
+            self._restore(failover=False)
+        except RestoreFailed as e:
+            return f"; {e}; kernel reset, earlier definitions are lost"
+        return "; state restored by replaying history"
+
+    def _restore(self, failover=True):
+        _RESTORES.inc()
+        if failover and self.failover():
+            return
+
+        kernel = self._new_kernel()
+        deadline = time.monotonic() + self.restore_timeout
+        try:
+            for code in self.replay_cells():
+                remaining = max(deadline - time.monotonic(), 0)
+                result = run_with_timeout(lambda: kernel.execute(code), remaining)
+                if result["status"] != "ok":
+                    raise RestoreFailed(f"Restore failed replaying: {code.strip()[:80]}")
+        except Exception as e:
+            _RESTORE_FAILURES.inc()
+            kernel.shutdown()
+            self._reset_state()
+            if isinstance(e, RestoreFailed):
+                raise
+            if isinstance(e, ExecutionTimeout):
+                raise RestoreFailed(f"Restore timed out after {self.restore_timeout:g}s") from e
+            raise RestoreFailed(f"Restore failed: {e}") from e
+
+        self.kernel = kernel
+        self.cells_run = 0
+
+    def _new_kernel(self):
+        kernel = self.kernel_factory()
+        if self.kernel_name is not None and getattr(kernel, "kernel_id", None) is not None:
+            kernel.kernel_id = self.kernel_name
+        kernel.start()
+        return kernel
+
+    def _adopt(self, kernel):
+        # A swapped-in standby or replacement takes over the primary's name.
+        if self.kernel_name is not None and getattr(kernel, "kernel_id", None) not in (None, self.kernel_name):
+            kernel.rename(self.kernel_name)
+
+    def _reset_state(self):
+        # Give up on the recorded state: an empty kernel and no history.
+        self.kernel = self._new_kernel()
+        self.cells_run = 0
+        if self.history is not None:
+            self.history = []
+        if self.standby is not None:
+            self.standby.clear()
+        if self.on_state_lost is not None:
+            self.on_state_lost()
+
+    def _drop_replacement(self):
+        replacement, self._replacement = self._replacement, None
+        if replacement is not None and replacement is not self.standby:
+            replacement.close()
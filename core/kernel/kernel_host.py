@@ -0,0 +1,356 @@
+# core/kernel/kernel_host.py
+#
+# Kernel host daemon: owns the Cling processes so they outlive the gateway.
+# Gateways talk to it over a UNIX socket (see remote_kernel.RemoteKernel);
+# a restarted gateway reattaches to the kernels by id and picks up buffered
+# output, so a deploy re-executes nothing.
+#
+# Protocol: newline-delimited JSON requests, each with an "op".
+#     {"op": "start", "kernel_id", "kind", "options"}   -> {"ok", "pid", "reattached"}
+#     {"op": "execute", "kernel_id", "request_id", "code"}
+#         -> {"event": "output", "request_id", "seq", "stream", "data"} ...
+#            {"event": "result", "request_id", "result"}
+#     {"op": "attach", "kernel_id", "request_id", "last_seq"}   same stream, from last_seq
+#     {"op": "channel", "kernel_id", "name"} + 2 fds         -> {"ok"}
+#     {"op": "interrupt" | "shutdown", "kernel_id"}          -> {"ok"}
+#     {"op": "rename", "kernel_id", "new_id"}               -> {"ok"}
+#     {"op": "list"}                                      -> {"ok", "kernels": [...]}
+#     {"op": "ping"}                                      -> {"ok"}
+# Failures reply {"ok": false, "error": message}.
+#
+# Cells keep running when the gateway connection drops; their output stays
+# in a per-kernel ReplayStore until a gateway attaches again.
+#
+# "channel" attaches a gateway-created shared-memory ring (shm_ring.ShmRing;
+# its data and space eventfds travel as SCM_RIGHTS). An execute with
+# "channel": true then writes output chunks into the ring instead of the
+# socket, until one does not fit. Socket messages carry "ring_pos" so the
+# gateway keeps the order, and the result omits the output the gateway
+# already has ("streamed").
+
+import argparse
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from core.kernel.base_kernel import KernelDied
+from core.kernel.cpp_kernel import CppKernel
+from core.kernel.native_kernel import NativeKernel
+from core.kernel.shm_ring import ShmRing
+from core.kernel.sim_kernel import SimKernel
+from core.session.replay_buffer import ReplayStore
+
+KINDS = {"cling": CppKernel, "sim": SimKernel, "native": NativeKernel}
+
+
+class HostedKernel:
+
+    """A kernel owned by the host, with its buffered executions."""
+
+    def __init__(self, kernel_id, kind, kernel):
+        self.kernel_id = kernel_id
+        self.kind = kind
+        self.kernel = kernel
+        self.replay = ReplayStore()
+        self.lock = threading.Lock()
+        self.running = None
+        self.last_request = None
+        self.cells = 0
+        self.dead = False
+        self.channel = None
+
+    def describe(self):
+        return {
+            "kernel_id": self.kernel_id,
+            "kind": self.kind,
+            "pid": self.kernel.process.pid,
+            "running": self.running,
+            "last_request": self.last_request,
+            "cells": self.cells,
+            "dead": self.dead
+        }
+
+
+class KernelHost:
+
+    def __init__(self, path):
+        self.path = path
+        self.kernels = {}
+        self._lock = threading.Lock()
+        # kernel_id -> lock serializing its starts, so two gateways
+        # starting the same id get one kernel.
+        self._starting = {}
+        self._server = None
+
+    def serve(self):
+        self._server = _listen(self.path)
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        with self._lock:
+            hosted, self.kernels = list(self.kernels.values()), {}
+        for entry in hosted:
+            _shutdown(entry.kernel)
+            _close_channel(entry)
+        if self._server is not None:
+            self._server.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    # ---- ops ----
+
+    def op_ping(self, request, send):
+        send({"ok": True})
+
+    def op_list(self, request, send):
+        with self._lock:
+            kernels = [entry.describe() for entry in self.kernels.values()]
+        send({"ok": True, "kernels": kernels})
+
+    def op_start(self, request, send):
+        kernel_id = request["kernel_id"]
+        with self._lock:
+            starting = self._starting.setdefault(kernel_id, threading.Lock())
+
+        with starting:
+            with self._lock:
+                entry = self.kernels.get(kernel_id)
+            if entry is not None and not entry.dead:
+                send({"ok": True, "pid": entry.kernel.process.pid, "reattached": True})
+                return
+
+            kind = request.get("kind", "cling")
+            kernel = KINDS[kind](**request.get("options", {}))
+            kernel.start()
+
+            with self._lock:
+                self.kernels[kernel_id] = HostedKernel(kernel_id, kind, kernel)
+        if entry is not None:
+            _shutdown(entry.kernel)
+            _close_channel(entry)
+        send({"ok": True, "pid": kernel.process.pid, "reattached": False})
+
+    def op_execute(self, request, send):
+        entry = self._kernel(request["kernel_id"])
+        request_id = request["request_id"]
+        if request.get("channel") and entry.channel is not None:
+            send = _via_channel(entry.channel, send)
+        entry.replay.open(request_id, send)
+        entry.last_request = request_id
+
+        # The cell runs on its own thread so it outlives this connection.
+        threading.Thread(
+            target=self._execute, args=(entry, request_id, request["code"]), daemon=True
+        ).start()
+
+    def op_attach(self, request, send):
+        entry = self._kernel(request["kernel_id"])
+        if not entry.replay.resume(request["request_id"], request.get("last_seq", 0), send):
+            send({"ok": False, "error": f"Unknown request {request['request_id']}"})
+
+    def op_channel(self, request, send):
+        entry = self._kernel(request["kernel_id"])
+        data_fd, space_fd = request["fds"]
+        request["fds"] = []
+        channel = ShmRing(request["name"], data_fd=data_fd, space_fd=space_fd)
+        with entry.lock:
+            _close_channel(entry)
+            entry.channel = channel
+        send({"ok": True})
+
+    def op_interrupt(self, request, send):
+        self._kernel(request["kernel_id"]).kernel.interrupt()
+        send({"ok": True})
+
+    def op_shutdown(self, request, send):
+        with self._lock:
+            entry = self.kernels.pop(request["kernel_id"], None)
+            self._starting.pop(request["kernel_id"], None)
+        if entry is not None:
+            _shutdown(entry.kernel)
+            _close_channel(entry)
+        send({"ok": True})
+
+    def op_rename(self, request, send):
+        # A standby swapped in by the gateway takes over the primary's id;
+        # a kernel still holding that id is the replaced one.
+        kernel_id, new_id = request["kernel_id"], request["new_id"]
+        with self._lock:
+            entry = self.kernels.pop(kernel_id, None)
+            if entry is None:
+                raise KeyError(f"Unknown kernel {kernel_id}")
+            replaced = self.kernels.get(new_id)
+            entry.kernel_id = new_id
+            self.kernels[new_id] = entry
+        if replaced is not None:
+            _shutdown(replaced.kernel)
+            _close_channel(replaced)
+        send({"ok": True})
+
+    # ---- internal helpers ----
+
+    def _kernel(self, kernel_id):
+        with self._lock:
+            entry = self.kernels.get(kernel_id)
+        if entry is None:
+            raise KeyError(f"Unknown kernel {kernel_id}")
+        return entry
+
+    def _execute(self, entry, request_id, code):
+        def on_output(stream, data):
+            entry.replay.publish(request_id, {
+                "event": "output", "request_id": request_id, "stream": stream, "data": data
+            })
+
+        with entry.lock:
+            entry.running = request_id
+            try:
+                if entry.dead:
+                    raise KernelDied("Kernel is dead")
+                result = entry.kernel.execute(code, on_output)
+                entry.cells += 1
+            except KernelDied as e:
+                entry.dead = True
+                result = {"stdout": "", "stderr": "", "status": "died", "message": str(e)}
+            except Exception as e:
+                result = {"stdout": "", "stderr": str(e), "status": "error"}
+            finally:
+                entry.running = None
+
+            # Under the lock, so a channel is never swapped mid-execution.
+            entry.replay.finish(request_id, {"event": "result", "request_id": request_id, "result": result})
+
+    def _handle(self, conn):
+        write_lock = threading.Lock()
+
+        def send(message):
+            data = (json.dumps(message) + "\n").encode("utf-8")
+            with write_lock:
+                conn.sendall(data)
+
+        with conn:
+            for line, fds in _read_requests(conn):
+                request = {"fds": fds}
+                try:
+                    request = json.loads(line)
+                    request["fds"] = fds
+                    getattr(self, "op_" + request["op"])(request, send)
+                except Exception as e:
+                    try:
+                        send({"ok": False, "error": f"{type(e).__name__}: {e}"})
+                    except OSError:
+                        return
+                finally:
+                    # Descriptors no op took over.
+                    for fd in request.get("fds", fds):
+                        os.close(fd)
+
+
+def _read_requests(conn):
+    """Yield (request line, fds received with it) until the peer closes."""
+    buffer, fds = b"", []
+    while True:
+        try:
+            data, received, _, _ = socket.recv_fds(conn, 65536, 2)
+        except OSError:
+            data, received = b"", []
+        fds += received
+        if not data:
+            for fd in fds:
+                os.close(fd)
+            return
+        buffer += data
+        while b"\n" in buffer:
+            line, _, buffer = buffer.partition(b"\n")
+            yield line, fds
+            fds = []
+
+
+def _via_channel(channel, send):
+    # Output chunks go through the ring; anything else over the socket,
+    # stamped with the ring position so the gateway can tell which chunks
+    # came before it. The ring write never waits (this runs on the cell's
+    # thread): a chunk that does not fit right away, too large or the ring
+    # full, moves the rest of the execution to the socket, which keeps the
+    # order exact since nothing is written to the ring after it.
+    diverted = False
+
+    def forward(message):
+        nonlocal diverted
+        event = message.get("event")
+        if event == "output" and not diverted:
+            try:
+                channel.write(message["stream"], message["data"], timeout=0)
+                return
+            except (ValueError, TimeoutError):
+                diverted = True
+        elif event == "result":
+            result = dict(message["result"], stdout="", stderr="", streamed=True)
+            message = dict(message, result=result)
+        send(dict(message, ring_pos=channel.position()))
+    return forward
+
+
+def _close_channel(entry):
+    channel, entry.channel = entry.channel, None
+    if channel is not None:
+        channel.close()
+
+
+def _listen(path):
+    # A leftover socket file is only reused if nothing answers on it.
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            raise RuntimeError(f"A kernel host is already listening on {path}")
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+        finally:
+            probe.close()
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(128)
+    return server
+
+
+def _shutdown(kernel):
+    try:
+        kernel.shutdown()
+    except Exception:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kernel host daemon")
+    parser.add_argument("--socket", required=True, help="UNIX socket path to listen on")
+    args = parser.parse_args(argv)
+
+    host = KernelHost(args.socket)
+
+    def terminate(signum, frame):
+        host.close()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    signal.signal(signal.SIGINT, terminate)
+    host.serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+# core/kernel/kernel_pool.py
+
+import math
+import threading
+import time
+from collections import deque
+from core.kernel.cpp_kernel import CppKernel
+from core.utils.metrics import REGISTRY
+
+class ArrivalForecast:
+
+    """Holt (level + trend) forecast of the session arrival rate, plus an
+    EWMA of kernel start latency.
+
+    tick() closes one interval of arrivals; the trend term lets the pool
+    grow ahead of a morning ramp instead of trailing it by an interval.
+    """
+
+    def __init__(self, alpha=0.5, beta=0.2, latency_alpha=0.3, initial_latency=1.0):
+        self.alpha = alpha
+        self.beta = beta
+        self.latency_alpha = latency_alpha
+
+        self.level = None
+        self.trend = 0.0
+        self.start_latency = initial_latency
+        self._arrivals = 0
+
+    def arrival(self):
+        self._arrivals += 1
+
+    def observe_start(self, seconds):
+        self.start_latency += self.latency_alpha * (seconds - self.start_latency)
+
+    def tick(self, interval):
+        """Fold the arrivals counted since the last tick into the forecast."""
+        rate, self._arrivals = self._arrivals / interval, 0
+        if self.level is None:
+            self.level = rate
+            return
+        previous = self.level
+        self.level = self.alpha * rate + (1 - self.alpha) * (self.level + self.trend)
+        self.trend = self.beta * (self.level - previous) + (1 - self.beta) * self.trend
+
+    def rate(self, steps=1.0):
+        """Forecast arrivals per second, steps intervals ahead."""
+        if self.level is None:
+            return 0.0
+        return max(0.0, self.level + steps * self.trend)
+
+
+class KernelPool:
+
+    """Pre-started kernels handed out on demand and refilled in the background.
+
+    With autoscale the size follows the forecast instead of staying fixed:
+    enough idle kernels to cover the arrivals expected while one more
+    starts (rate x start latency, plus headroom x its square root as a
+    Poisson margin), clamped to [min_size, max_size]. Starts are spaced by
+    at least 1/spawn_rate seconds so a burst cannot trigger a spawn storm,
+    and surplus idle kernels are shut down one per interval. Idle kernels
+    that died while waiting are discarded when they would be handed out.
+    """
+
+    def __init__(self, kernel_factory=CppKernel, size=2, retry_delay=1.0, autoscale=False,
+                 min_size=0, max_size=16, interval=5.0, spawn_rate=2.0, headroom=1.0,
+                 forecast=None):
+        self.kernel_factory = kernel_factory
+        self.size = size
+        self.retry_delay = retry_delay
+        self.autoscale = autoscale
+        self.min_size = min_size
+        self.max_size = max_size
+        self.interval = interval
+        self.spawn_rate = spawn_rate
+        self.headroom = headroom
+        self.forecast = forecast or ArrivalForecast()
+
+        self._idle = deque()
+        self._starting = 0
+        self._last_spawn = 0.0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._filler = None
+        self._collector = None
+
+        self.hits = 0
+        self.misses = 0
+        self.spawned = 0
+        self.retired = 0
+        self.dead = 0
+
+    def start(self):
+        self._filler = threading.Thread(target=self._fill, daemon=True)
+        self._filler.start()
+        if self.autoscale:
+            threading.Thread(target=self._scale, daemon=True).start()
+
+        self._collector = self.stats
+        REGISTRY.register_collector("kernel_pool", self._collector)
+
+    def acquire(self):
+        """Return a started kernel, starting one inline if the pool is empty."""
+        with self._cond:
+            self.forecast.arrival()
+
+        while True:
+            with self._cond:
+                kernel = self._idle.popleft() if self._idle else None
+                self._cond.notify_all()
+            if kernel is None:
+                break
+            # Checked outside the lock: a hosted kernel asks its host.
+            if kernel.is_alive():
+                with self._cond:
+                    self.hits += 1
+                return kernel
+            with self._cond:
+                self.dead += 1
+            kernel.shutdown()
+
+        with self._cond:
+            self.misses += 1
+
+        started = time.monotonic()
+        kernel = self.kernel_factory()
+        kernel.start()
+        with self._cond:
+            self.forecast.observe_start(time.monotonic() - started)
+        return kernel
+
+    def wait_ready(self, timeout=None):
+        """Block until the pool is full (used by benchmarks and tests)."""
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self._idle) >= self.size, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+
+        if self._collector is not None:
+            REGISTRY.unregister_collector(self._collector)
+        for kernel in idle:
+            kernel.shutdown()
+
+    def stats(self):
+        with self._cond:
+            total = self.hits + self.misses
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "starting": self._starting,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "spawned": self.spawned,
+                "retired": self.retired,
+                "dead": self.dead,
+                "forecast_arrivals_per_second": self.forecast.rate(),
+                "start_latency_seconds": self.forecast.start_latency
+            }
+
+    # ---- internal helpers ----
+
+    def _target(self):
+        # Called with the lock held. Look ahead to the end of the next
+        # interval plus one start latency: the earliest a resize takes effect.
+        latency = self.forecast.start_latency
+        rate = self.forecast.rate(1.0 + latency / self.interval)
+        demand = rate * latency
+        target = math.ceil(demand + self.headroom * math.sqrt(demand))
+        return min(self.max_size, max(self.min_size, target))
+
+    def _scale(self):
+        while True:
+            with self._cond:
+                if self._cond.wait_for(lambda: self._closed, self.interval):
+                    return
+                self.forecast.tick(self.interval)
+                self.size = self._target()
+
+                surplus = None
+                if len(self._idle) > self.size:
+                    surplus = self._idle.pop()
+                    self.retired += 1
+                self._cond.notify_all()
+
+            if surplus is not None:
+                surplus.shutdown()
+
+    def _fill(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._idle) + self._starting < self.size
+                )
+                if self._closed:
+                    return
+
+                # Space out starts; re-check the size after the pause.
+                pause = 0
+                if self.autoscale and self.spawn_rate:
+                    pause = self._last_spawn + 1.0 / self.spawn_rate - time.monotonic()
+                if pause > 0:
+                    self._cond.wait(pause)
+                    continue
+                self._last_spawn = time.monotonic()
+                self._starting += 1
+
+            started = time.monotonic()
+            try:
+                kernel = self.kernel_factory()
+                kernel.start()
+            except Exception:
+                kernel = None
+
+            with self._cond:
+                self._starting -= 1
+                if kernel is None:
+                    # Back off so a broken kernel command does not spin.
+                    self._cond.wait(self.retry_delay)
+                elif not self._closed:
+                    self.forecast.observe_start(time.monotonic() - started)
+                    self.spawned += 1
+                    self._idle.append(kernel)
+                    kernel = None
+                self._cond.notify_all()
+
+            if kernel is not None:
+                kernel.shutdown()
@@ -0,0 +1,402 @@
+# core/kernel/native_host.py
+#
+# Kernel host process that runs cells in-process as native code and keeps
+# fork()ed checkpoints of itself. It speaks Cling's prompt protocol, so
+# CppKernel drives it unchanged (see native_kernel.NativeKernel).
+#
+# Cling itself cannot be forked from outside, so the host embeds the
+# interpreter instead: "cppyy" runs cells through cppyy's in-process Cling,
+# "sim" runs them like sim_cling for offline benchmarks.
+#
+# Process layout:
+#     supervisor   the process CppKernel started; forwards SIGINT to the
+#                  active worker, reaps orphans (child subreaper) and kills
+#                  the whole worker group on exit.
+#     worker       reads cells from stdin. After every successful cell it
+#                  forks a child that SIGSTOPs itself: a paused checkpoint
+#                  sharing all unmodified pages copy-on-write.
+#
+# Control cells:
+#     //host: checkpoints       JSON list of checkpoints with PSS/USS
+#     //host: rollback K        resume the checkpoint taken after cell K
+#     //host: undo              roll back the last successful cell
+#
+# On rollback the worker kills newer checkpoints, resumes checkpoint K and
+# exits; K forks a fresh paused copy of itself so it can be restored again.
+
+import argparse
+import ctypes
+import io
+import json
+import os
+import select
+import signal
+import sys
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from core.kernel import sim_cling
+from core.utils.proc import smaps_rollup
+
+PROMPT = b"cling>\n"
+DONE_MARKER = sim_cling.DONE_MARKER.encode("ascii")
+CONTROL = "//host:"
+PR_SET_CHILD_SUBREAPER = 36
+
+
+# ---- engines ----
+
+class CppyyEngine:
+
+    """Runs cells with cppyy's embedded Cling (optional dependency)."""
+
+    multiline = True
+
+    def __init__(self, args):
+        import cppyy
+        self.cppyy = cppyy
+        cppyy.include("iostream")
+        cppyy.include("cstdio")
+
+    def run(self, code: str) -> bool:
+        try:
+            self.cppyy.cppexec(code)
+            ok = True
+        except Exception as e:
+            os.write(2, f"{e}\n".encode("utf-8"))
+            ok = False
+        self.flush()
+        return ok
+
+    def flush(self):
+        self.cppyy.gbl.std.cout.flush()
+        self.cppyy.gbl.fflush(self.cppyy.nullptr)
+
+
+class SimEngine:
+
+    """Runs every line like sim_cling; a cell fails if it wrote to stderr."""
+
+    multiline = False
+
+    def __init__(self, args):
+        import random
+        self.args = argparse.Namespace(
+            output_bytes=args.output_bytes, stderr_rate=0.0, stderr_bytes=256,
+            crash_rate=0.0, hang_rate=0.0
+        )
+        self.latency = sim_cling.parse_latency(args.latency)
+        self.rng = random.Random(args.seed)
+
+    def run(self, code: str) -> bool:
+        err, real = io.StringIO(), sys.stderr
+        sys.stderr = err
+        try:
+            sim_cling.run_cell(code, self.args, self.latency, self.rng)
+        finally:
+            sys.stderr = real
+            self.flush()
+
+        if err.getvalue():
+            os.write(2, err.getvalue().encode("utf-8"))
+            return False
+        return True
+
+    def flush(self):
+        sys.stdout.flush()
+
+
+ENGINES = {"cppyy": CppyyEngine, "sim": SimEngine}
+
+
+# ---- worker ----
+
+class Checkpoint:
+
+    __slots__ = ("index", "pid", "fd")
+
+    def __init__(self, index, pid):
+        self.index = index
+        self.pid = pid
+        # A pidfd keeps signals from reaching a recycled pid.
+        self.fd = os.pidfd_open(pid) if hasattr(os, "pidfd_open") else None
+
+    def signal(self, sig):
+        if self.fd is not None:
+            signal.pidfd_send_signal(self.fd, sig)
+        else:
+            os.kill(self.pid, sig)
+
+    def alive(self):
+        try:
+            self.signal(0)
+            return True
+        except ProcessLookupError:
+            return False
+
+    def discard(self):
+        try:
+            self.signal(signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        if self.fd is not None:
+            os.close(self.fd)
+
+
+class Worker:
+
+    def __init__(self, engine, max_checkpoints, control):
+        self.engine = engine
+        self.max_checkpoints = max_checkpoints
+        self.control = control
+        self.reader = _LineReader(0)
+
+        # Successful cells run so far; checkpoint N holds the state after cell N.
+        self.cells = 0
+        self.checkpoints = []
+
+    def serve(self):
+        self._announce(os.getpid())
+        if self.max_checkpoints and self.checkpoint():
+            # Resumed by a rollback: this prompt ends the rollback cell.
+            self._reply({"restored": self.cells})
+            os.write(2, DONE_MARKER)
+        os.write(1, PROMPT)
+
+        while True:
+            try:
+                code = self._read_cell()
+                if code is None:
+                    return
+                if code.strip().startswith(CONTROL):
+                    self._handle_control(code.strip()[len(CONTROL):].split())
+                elif self.engine.run(code):
+                    self.cells += 1
+                    if self.max_checkpoints and self.checkpoint():
+                        self._reply({"restored": self.cells})
+            except KeyboardInterrupt:
+                os.write(2, b"Interrupted\n")
+            os.write(2, DONE_MARKER)
+            os.write(1, PROMPT)
+
+    def checkpoint(self):
+        """Fork a paused copy of this process as checkpoint self.cells.
+
+        Returns False in the caller. A copy that is later resumed by a
+        rollback first replaces itself with a new paused copy, then
+        returns True and carries on as the active worker.
+        """
+        resumed = False
+        while True:
+            self.engine.flush()
+            pid = os.fork()
+            if pid == 0:
+                os.kill(os.getpid(), signal.SIGSTOP)
+                # SIGCONT: a rollback picked this checkpoint.
+                resumed = True
+                self.reader.reset()
+                self.checkpoints = [c for c in self.checkpoints if c.alive()]
+                continue
+
+            self.checkpoints.append(Checkpoint(self.cells, pid))
+            while len(self.checkpoints) > self.max_checkpoints:
+                self.checkpoints.pop(0).discard()
+            return resumed
+
+    def rollback(self, index):
+        target = next((c for c in self.checkpoints if c.index == index and c.alive()), None)
+        if target is None:
+            os.write(2, f"No checkpoint for cell {index}\n".encode("utf-8"))
+            return
+
+        for newer in self.checkpoints[self.checkpoints.index(target) + 1:]:
+            newer.discard()
+
+        # Tell the supervisor first, so our exit is not taken for a crash.
+        self._announce(target.pid)
+        target.signal(signal.SIGCONT)
+        os._exit(0)
+
+    # ---- internal helpers ----
+
+    def _handle_control(self, words):
+        command = words[0] if words else ""
+
+        if command == "checkpoints":
+            self.checkpoints = [c for c in self.checkpoints if c.alive()]
+            entries = [dict(index=c.index, pid=c.pid, **smaps_rollup(c.pid)) for c in self.checkpoints]
+            self._reply({
+                "cells": self.cells,
+                "active": dict(pid=os.getpid(), **smaps_rollup(os.getpid())),
+                "checkpoints": entries,
+                "checkpoint_pss_bytes": sum(e["pss_bytes"] for e in entries)
+            })
+        elif command == "rollback" and len(words) == 2 and words[1].isdigit():
+            self.rollback(int(words[1]))
+        elif command == "undo":
+            self.rollback(self.cells - 1)
+        else:
+            os.write(2, f"Unknown host command: {' '.join(words)}\n".encode("utf-8"))
+
+    def _read_cell(self):
+        line = self.reader.readline()
+        if not line:
+            return None
+        if not self.engine.multiline:
+            return line
+
+        # Like Cling, keep reading while braces are open (strings ignored).
+        lines = [line]
+        depth = line.count("{") - line.count("}")
+        while depth > 0:
+            line = self.reader.readline()
+            if not line:
+                break
+            lines.append(line)
+            depth += line.count("{") - line.count("}")
+        return "".join(lines)
+
+    def _reply(self, data):
+        os.write(1, (json.dumps(data) + "\n").encode("utf-8"))
+
+    def _announce(self, pid):
+        os.write(self.control, f"active {pid}\n".encode("ascii"))
+
+
+class _LineReader:
+
+    """Unbuffered line reader: nothing read ahead survives into a checkpoint."""
+
+    def __init__(self, fd):
+        self.fd = fd
+        self.buffer = b""
+
+    def readline(self):
+        while b"\n" not in self.buffer:
+            chunk = os.read(self.fd, 65536)
+            if not chunk:
+                line, self.buffer = self.buffer, b""
+                return line.decode("utf-8")
+            self.buffer += chunk
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return line.decode("utf-8") + "\n"
+
+    def reset(self):
+        self.buffer = b""
+
+
+# ---- supervisor ----
+
+def supervise(args):
+    try:
+        ctypes.CDLL(None, use_errno=True).prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0)
+    except (OSError, AttributeError):
+        pass
+
+    control_r, control_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(control_r)
+        # Own process group, so the supervisor can kill every checkpoint at once.
+        os.setpgid(0, 0)
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+        try:
+            engine = ENGINES[args.engine](args)
+        except Exception as e:
+            os.write(2, f"Cannot start {args.engine} engine: {e}\n".encode("utf-8"))
+            os._exit(1)
+        Worker(engine, args.max_checkpoints, control_w).serve()
+        os._exit(0)
+
+    os.close(control_w)
+    group = pid
+    state = {"active": pid}
+    pending = b""
+
+    def forward(signum, frame):
+        try:
+            os.kill(state["active"], signum)
+        except ProcessLookupError:
+            pass
+
+    def terminate(signum, frame):
+        _kill_group(group)
+        os._exit(0)
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, terminate)
+
+    def drain(timeout):
+        """Apply queued control messages; False once every worker is gone."""
+        nonlocal pending
+        while select.select([control_r], [], [], timeout)[0]:
+            chunk = os.read(control_r, 4096)
+            if not chunk:
+                return False
+            pending += chunk
+            while b"\n" in pending:
+                line, _, pending = pending.partition(b"\n")
+                words = line.split()
+                if len(words) == 2 and words[0] == b"active":
+                    state["active"] = int(words[1])
+            timeout = 0
+        return True
+
+    while True:
+        workers_left = drain(0.1)
+
+        for reaped, status in _reap():
+            # A rollback announces the new worker before the old one exits.
+            drain(0)
+            if reaped == state["active"]:
+                _exit(group, status)
+
+        if not workers_left:
+            try:
+                _, status = os.waitpid(state["active"], 0)
+            except ChildProcessError:
+                status = 0
+            _exit(group, status)
+
+
+def _reap():
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if not pid:
+            return
+        yield pid, status
+
+
+def _exit(group, status):
+    # Mirror the worker's exit status, as if it had been the kernel process.
+    _kill_group(group)
+    code = os.waitstatus_to_exitcode(status)
+    os._exit(code if code >= 0 else 128 - code)
+
+
+def _kill_group(group):
+    try:
+        os.killpg(group, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Checkpointing native kernel host")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="cppyy")
+    parser.add_argument("--max-checkpoints", type=int, default=8, help="0 disables checkpoints")
+    parser.add_argument("--latency", default="fixed:0", help="sim engine only")
+    parser.add_argument("--output-bytes", type=int, default=0, help="sim engine only")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--nologo", action="store_true")
+    args = parser.parse_args(argv)
+    supervise(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# core/kernel/native_kernel.py
+
+import json
+import os
+import sys
+from core.kernel.cpp_kernel import CppKernel
+
+NATIVE_HOST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "native_host.py")
+
+class NativeKernel(CppKernel):
+
+    """CppKernel on the checkpointing native host (native_host.py).
+
+    After every successful cell the host forks a paused copy of itself, so
+    undo() and rollback(k) restore state in milliseconds instead of
+    replaying history. At most max_checkpoints copies are kept (0 turns
+    checkpoints off). engine is "cppyy" (needs the cppyy package) or "sim".
+    """
+
+    # The wrapper writes the end-of-cell marker itself.
+    marker_cell = None
+
+    def __init__(self, engine="cppyy", max_checkpoints=8, latency="fixed:0",
+                 output_bytes=0, seed=None, recorder=None):
+        command = [
+            sys.executable, NATIVE_HOST, "--nologo",
+            "--engine", engine,
+            "--max-checkpoints", str(max_checkpoints),
+            "--latency", latency,
+            "--output-bytes", str(output_bytes)
+        ]
+        if seed is not None:
+            command += ["--seed", str(seed)]
+
+        super().__init__(command, recorder)
+
+    def checkpoints(self):
+        """Live checkpoints and the active worker, with RSS/PSS/USS in bytes.
+        PSS is the copy-on-write aware figure: shared pages are split
+        between the processes sharing them."""
+        return self._control("checkpoints")
+
+    def rollback(self, index: int):
+        """Restore the state right after successful cell number index."""
+        return self._control(f"rollback {index}")
+
+    def undo(self):
+        """Restore the state before the last successful cell."""
+        return self._control("undo")
+
+    # ---- internal helpers ----
+
+    def _control(self, command):
+        result = self.execute(f"//host: {command}")
+        if result["status"] != "ok":
+            raise RuntimeError(result["stderr"].strip())
+        return json.loads(result["stdout"].strip().splitlines()[-1])
@@ -0,0 +1,299 @@
+# core/kernel/remote_kernel.py
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from core.kernel import shm_ring
+from core.kernel.base_kernel import BaseKernel, KernelDied
+
+KERNEL_HOST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kernel_host.py")
+
+class HostedProcess:
+
+    """Stands in for the Popen of a kernel the host owns (pid only)."""
+
+    __slots__ = ("pid",)
+
+    def __init__(self, pid):
+        self.pid = pid
+
+
+class RemoteKernel(BaseKernel):
+
+    """Kernel living in the kernel host daemon (kernel_host.py).
+
+    start() reattaches when the host already runs kernel_id, so a gateway
+    restarted with the same ids finds every session's state intact;
+    reattached tells which happened. kind and options pick the kernel class
+    on the host ("cling", "sim" or "native" and its constructor arguments).
+    With spawn the host is started, detached from this process, if nothing
+    listens on socket_path yet.
+
+    transport "shm" streams output through a shared-memory ring
+    (shm_ring.ShmRing) set up on the first execute; without eventfd or
+    /dev/shm, or if the host refuses the ring, it stays on the socket. So
+    does an execute that finds the ring busy for connect_timeout, e.g.
+    with an abandoned timed-out call still reading it. A ring execution
+    silent for connect_timeout checks that the host still answers.
+    """
+
+    def __init__(self, socket_path, kernel_id=None, kind="cling", options=None,
+                 spawn=True, connect_timeout=10.0, transport="socket", ring_capacity=1 << 20):
+        self.socket_path = socket_path
+        self.kernel_id = kernel_id or uuid.uuid4().hex
+        self.kind = kind
+        self.options = options or {}
+        self.spawn = spawn
+        self.connect_timeout = connect_timeout
+        self.transport = transport
+        self.ring_capacity = ring_capacity
+
+        self.process = None
+        self.reattached = False
+        self.ring = None
+        self._ring_lock = threading.Lock()
+
+    def start(self):
+        if self.spawn:
+            ensure_host(self.socket_path, self.connect_timeout)
+        reply = self._call({
+            "op": "start", "kernel_id": self.kernel_id, "kind": self.kind, "options": self.options
+        })
+        self.process = HostedProcess(reply["pid"])
+        self.reattached = reply["reattached"]
+
+    def execute(self, code: str, on_output=None) -> dict:
+        request = {"op": "execute", "kernel_id": self.kernel_id, "request_id": uuid.uuid4().hex, "code": code}
+        if self.transport != "shm":
+            return self._stream(request, on_output)
+
+        # The ring has a single consumer: one ring execution at a time.
+        if not self._ring_lock.acquire(timeout=self.connect_timeout):
+            return self._stream(request, on_output)
+        try:
+            if self.ring is None:
+                self._open_channel()
+            if self.ring is None:
+                return self._stream(request, on_output)
+            request["channel"] = True
+            return self._stream_ring(request, on_output)
+        finally:
+            self._ring_lock.release()
+
+    def resume(self, request_id, last_seq=0, on_output=None) -> dict:
+        """Output after last_seq and the result of an execution started
+        before this gateway attached; waits for it if still running."""
+        return self._stream(
+            {"op": "attach", "kernel_id": self.kernel_id, "request_id": request_id, "last_seq": last_seq},
+            on_output
+        )
+
+    def describe(self):
+        """The host's view of this kernel: running and last request ids, cells run."""
+        for kernel in self._call({"op": "list"})["kernels"]:
+            if kernel["kernel_id"] == self.kernel_id:
+                return kernel
+        return None
+
+    def interrupt(self):
+        try:
+            self._call({"op": "interrupt", "kernel_id": self.kernel_id})
+        except (OSError, RuntimeError):
+            pass
+
+    def shutdown(self):
+        try:
+            self._call({"op": "shutdown", "kernel_id": self.kernel_id})
+        finally:
+            self._close_ring()
+
+    def is_alive(self):
+        try:
+            self._check_alive()
+        except KernelDied:
+            return False
+        return True
+
+    def detach(self):
+        """Forget the kernel here and leave it running on the host."""
+        self.process = None
+        self._close_ring()
+
+    def rename(self, kernel_id):
+        """Rename the kernel on the host; later starts with kernel_id reattach to it."""
+        try:
+            self._call({"op": "rename", "kernel_id": self.kernel_id, "new_id": kernel_id})
+            self.kernel_id = kernel_id
+        except (OSError, RuntimeError):
+            pass
+
+    # ---- internal helpers ----
+
+    def _connect(self, timeout=None):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(timeout)
+        try:
+            conn.connect(self.socket_path)
+        except OSError as e:
+            conn.close()
+            raise KernelDied(f"Kernel host unreachable: {e}")
+        return conn
+
+    def _call(self, request, fds=(), timeout=None):
+        with self._connect(timeout) as conn, conn.makefile("r", encoding="utf-8") as reader:
+            payload = (json.dumps(request) + "\n").encode("utf-8")
+            if fds:
+                socket.send_fds(conn, [payload], fds)
+            else:
+                conn.sendall(payload)
+            line = reader.readline()
+        if not line:
+            raise KernelDied("Kernel host closed the connection")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(reply.get("error", "Kernel host request failed"))
+        return reply
+
+    def _stream(self, request, on_output):
+        with self._connect() as conn, conn.makefile("r", encoding="utf-8") as reader:
+            conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            for line in reader:
+                message = json.loads(line)
+                event = message.get("event")
+                if event == "output":
+                    if on_output:
+                        on_output(message["stream"], message["data"])
+                elif event == "result":
+                    return self._result(message["result"])
+                elif not message.get("ok", True):
+                    raise RuntimeError(message["error"])
+        raise KernelDied("Kernel host connection lost")
+
+    def _stream_ring(self, request, on_output):
+        ring = self.ring
+        out, err = [], []
+
+        def emit(chunks):
+            for stream, data in chunks:
+                (out if stream == "stdout" else err).append(data)
+                if on_output:
+                    on_output(stream, data)
+
+        with self._connect() as conn:
+            conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            buffer = b""
+            active = time.monotonic()
+            while True:
+                chunks = ring.read()
+                if chunks:
+                    emit(chunks)
+                    active = time.monotonic()
+                while b"\n" in buffer:
+                    line, _, buffer = buffer.partition(b"\n")
+                    message = json.loads(line)
+                    # Ring chunks written before this message come first.
+                    emit(ring.read(message.get("ring_pos")))
+                    event = message.get("event")
+                    if event == "output":
+                        emit([(message["stream"], message["data"])])
+                    elif event == "result":
+                        return self._result(message["result"], out, err)
+                    elif not message.get("ok", True):
+                        raise RuntimeError(message["error"])
+
+                if ring.wait([conn.fileno()]):
+                    data = conn.recv(65536)
+                    if not data:
+                        raise KernelDied("Kernel host connection lost")
+                    buffer += data
+                    active = time.monotonic()
+                elif time.monotonic() - active > self.connect_timeout:
+                    self._check_alive()
+                    active = time.monotonic()
+
+    def _check_alive(self):
+        # A long-running cell is fine; a host that stopped answering or
+        # lost the kernel is not.
+        try:
+            kernels = self._call({"op": "list"}, timeout=self.connect_timeout)["kernels"]
+        except (OSError, RuntimeError) as e:
+            raise KernelDied(f"Kernel host not responding: {e}")
+        for kernel in kernels:
+            if kernel["kernel_id"] == self.kernel_id:
+                if kernel["dead"]:
+                    raise KernelDied("Kernel died on the host")
+                return
+        raise KernelDied("Kernel is gone from the host")
+
+    def _open_channel(self):
+        if not shm_ring.available():
+            self.transport = "socket"
+            return
+        ring = shm_ring.ShmRing(capacity=self.ring_capacity)
+        try:
+            self._call(
+                {"op": "channel", "kernel_id": self.kernel_id, "name": ring.name},
+                [ring.data_fd, ring.space_fd]
+            )
+        except RuntimeError:
+            # The host cannot map the ring: stay on the socket.
+            ring.close()
+            self.transport = "socket"
+            return
+        except Exception:
+            ring.close()
+            raise
+        self.ring = ring
+
+    def _close_ring(self):
+        with self._ring_lock:
+            ring, self.ring = self.ring, None
+        if ring is not None:
+            ring.close()
+
+    def _result(self, result, out=(), err=()):
+        # The result carries the whole output, even past the replay window,
+        # unless it was streamed through the ring.
+        if result["status"] == "died":
+            raise KernelDied(result["message"])
+        if result.get("streamed"):
+            return {"stdout": "".join(out), "stderr": "".join(err), "status": result["status"]}
+        return {"stdout": result["stdout"], "stderr": result["stderr"], "status": result["status"]}
+
+
+def ensure_host(socket_path, timeout=10.0):
+    """Start the kernel host on socket_path unless one already answers.
+    It runs in its own session, so it survives this process exiting."""
+    if _ping(socket_path):
+        return False
+
+    subprocess.Popen(
+        [sys.executable, KERNEL_HOST, "--socket", socket_path],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _ping(socket_path):
+            return True
+        time.sleep(0.05)
+    raise KernelDied(f"Kernel host did not come up on {socket_path}")
+
+
+def _ping(socket_path):
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+        conn.sendall(b'{"op": "ping"}\n')
+        return conn.recv(64).startswith(b'{"ok": true')
+    except OSError:
+        return False
+    finally:
+        conn.close()
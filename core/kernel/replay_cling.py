@@ -0,0 +1,77 @@
+# core/kernel/replay_cling.py
+#
+# Plays a recorded kernel transcript back through real pipes, so CppKernel
+# parses recorded production output exactly as it parsed it live.
+#
+# Output recorded before the first stdin chunk (banner, first prompt) is
+# written at startup. After that, each chunk read from stdin releases the
+# output recorded after the matching stdin record, with the original
+# spacing divided by --speed (0 = as fast as possible). Output chunks are
+# written back byte for byte, one write each, end-of-cell markers and
+# all; ReplayKernel sends the same setup and marker cells the recorded
+# kernel sent, so the turns line up.
+
+import argparse
+import os
+import signal
+import sys
+import time
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from core.kernel.transcript import STDIN, STDOUT, read_transcript
+
+
+def split_turns(records):
+    """Group records into (startup output, [(stdin data, t_ns, output after it), ...])."""
+    startup, turns = [], []
+    current = startup
+
+    for channel, t_ns, data in records:
+        if channel == STDIN:
+            turns.append((data, t_ns, []))
+            current = turns[-1][2]
+        else:
+            current.append((channel, t_ns, data))
+
+    return startup, turns
+
+
+def play(output, origin_ns, speed):
+    start = time.perf_counter()
+
+    for channel, t_ns, data in output:
+        if speed > 0:
+            delay = (t_ns - origin_ns) / 1e9 / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        fd = 1 if channel == STDOUT else 2
+        while data:
+            data = data[os.write(fd, data):]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a kernel transcript")
+    parser.add_argument("transcript")
+    parser.add_argument("--speed", type=float, default=1.0)
+    parser.add_argument("--nologo", action="store_true")
+    args = parser.parse_args(argv)
+
+    # Interrupts were recorded along with their effect; just keep playing.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    startup, turns = split_turns(read_transcript(args.transcript))
+    play(startup, 0, args.speed)
+
+    for data, t_ns, output in turns:
+        # A recorded stdin chunk may span several lines.
+        for _ in range(max(1, data.count(b"\n"))):
+            if not sys.stdin.buffer.readline():
+                return
+        play(output, t_ns, args.speed)
+
+
+if __name__ == "__main__":
+    main()
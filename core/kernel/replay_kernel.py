@@ -0,0 +1,34 @@
+# core/kernel/replay_kernel.py
+
+import os
+import sys
+from core.kernel.cpp_kernel import MARKER_CELL, SETUP_CELL, CppKernel
+from core.kernel.transcript import STDIN, read_transcript
+
+REPLAY_CLING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "replay_cling.py")
+
+class ReplayKernel(CppKernel):
+
+    """CppKernel fed from a recorded transcript instead of a live Cling.
+
+    speed scales the recorded timing (1.0 = original, 10.0 = ten times
+    faster, 0 = no delays). Cells are matched to the recording by position,
+    not by their text, so a transcript can drive any cell sequence. Marker
+    cells are sent only if the recorded kernel sent them; their recorded
+    output, markers included, is replayed like any other.
+    """
+
+    def __init__(self, transcript, speed=1.0, recorder=None):
+        super().__init__(
+            [sys.executable, REPLAY_CLING, transcript, "--speed", str(speed)],
+            recorder
+        )
+        self.marker_cell = MARKER_CELL if _sent_marker_cells(transcript) else None
+
+
+def _sent_marker_cells(transcript):
+    # A kernel with marker cells sends SETUP_CELL before anything else.
+    for channel, _, data in read_transcript(transcript):
+        if channel == STDIN:
+            return data == (SETUP_CELL + "\n").encode("utf-8")
+    return False
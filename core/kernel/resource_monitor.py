@@ -0,0 +1,174 @@
+# core/kernel/resource_monitor.py
+
+import threading
+import time
+from core.utils import proc
+from core.utils.metrics import REGISTRY
+
+_EVICTION_HELP = "Idle kernels freed or replaced under memory pressure"
+_EVICTED = REGISTRY.counter("kernel_evictions_total", _EVICTION_HELP, action="evict")
+_RECYCLED = REGISTRY.counter("kernel_evictions_total", _EVICTION_HELP, action="recycle")
+
+class ResourceMonitor:
+
+    """Samples every registered kernel on a fixed cadence and frees the
+    largest idle kernels when the node runs short of memory.
+
+    statm and stat are read on every pass; smaps_rollup (PSS/USS) only on
+    every smaps_every-th pass since it walks the page tables. The node is
+    under pressure when PSI "some" avg10 reaches pressure_watermark percent
+    or MemAvailable falls below available_watermark of MemTotal. Each
+    pressured pass evicts (or recycles) one kernel idle for at least
+    min_idle seconds, largest RSS first, then re-checks on the next pass.
+    action "recycle" replaces it with a replayed kernel instead, which
+    briefly costs a second process but keeps the session warm.
+    """
+
+    def __init__(self, interval=1.0, smaps_every=5, pressure_watermark=10.0,
+                 available_watermark=0.1, min_idle=30.0, action="evict"):
+        self.interval = interval
+        self.smaps_every = smaps_every
+        self.pressure_watermark = pressure_watermark
+        self.available_watermark = available_watermark
+        self.min_idle = min_idle
+        self.action = action
+
+        # manager -> (session_id, latest sample, collector)
+        self._managers = {}
+        self._cpu = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._passes = 0
+        self.node = {}
+
+        # Kept so close() unregisters the same bound method.
+        self._node_collector = self.node_stats
+        REGISTRY.register_collector("node", self._node_collector)
+
+    def register(self, manager, session_id):
+        collect = lambda: self.sample_of(manager)
+        with self._lock:
+            self._managers[manager] = (session_id, {}, collect)
+        REGISTRY.register_collector("kernel", collect, session=session_id)
+
+    def unregister(self, manager):
+        with self._lock:
+            entry = self._managers.pop(manager, None)
+            self._cpu.pop(manager, None)
+        if entry is not None:
+            REGISTRY.unregister_collector(entry[2])
+
+    def sample_of(self, manager):
+        with self._lock:
+            entry = self._managers.get(manager)
+            return dict(entry[1]) if entry else {}
+
+    def node_stats(self):
+        return dict(self.node)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        REGISTRY.unregister_collector(self._node_collector)
+
+    def sample(self):
+        """One pass: sample every kernel, update node figures, evict if needed."""
+        self._passes += 1
+        with_smaps = self.smaps_every and (self._passes - 1) % self.smaps_every == 0
+        now = time.monotonic()
+
+        with self._lock:
+            managers = list(self._managers.items())
+
+        for manager, (session_id, previous, _) in managers:
+            sample = self._sample_manager(manager, previous, with_smaps, now)
+            with self._lock:
+                if manager in self._managers:
+                    self._managers[manager] = (session_id, sample, self._managers[manager][2])
+
+        self.node = self._sample_node(managers)
+        if self.node["under_pressure"]:
+            self._relieve(now)
+        return self.node
+
+    # ---- internal helpers ----
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def _sample_manager(self, manager, previous, with_smaps, now):
+        process = getattr(manager.kernel, "process", None)
+        if process is None:
+            return {"running": 0, "idle_seconds": now - manager.last_active}
+
+        pid = process.pid
+        vsz, rss, shared = proc.statm(pid)
+        cpu = proc.cpu_seconds(pid)
+
+        # CPU percent over the interval since this pid was last seen.
+        last_pid, last_cpu, last_time = self._cpu.get(manager, (None, 0.0, now))
+        elapsed = now - last_time
+        cpu_percent = 100.0 * (cpu - last_cpu) / elapsed if last_pid == pid and elapsed > 0 else 0.0
+        self._cpu[manager] = (pid, cpu, now)
+
+        sample = {
+            "running": 1,
+            "vsz_bytes": vsz,
+            "rss_bytes": rss,
+            "shared_bytes": shared,
+            "cpu_seconds": cpu,
+            "cpu_percent": cpu_percent,
+            "idle_seconds": now - manager.last_active,
+            "standby_rss_bytes": proc.kernel_rss_bytes(getattr(manager.standby, "_kernel", None))
+        }
+        if with_smaps:
+            rollup = proc.smaps_rollup(pid)
+            sample["pss_bytes"] = rollup["pss_bytes"]
+            sample["uss_bytes"] = rollup["uss_bytes"]
+        else:
+            # Keep the last PSS/USS between the costlier reads.
+            for key in ("pss_bytes", "uss_bytes"):
+                if key in previous:
+                    sample[key] = previous[key]
+        return sample
+
+    def _sample_node(self, managers):
+        memory = proc.meminfo()
+        pressure = proc.memory_pressure() or {}
+        total = memory["total_bytes"]
+        available_ratio = memory["available_bytes"] / total if total else 1.0
+        some = pressure.get("some_avg10", 0.0)
+
+        return {
+            "kernels": len(managers),
+            "kernel_rss_bytes": sum(self.sample_of(m).get("rss_bytes", 0) for m, _ in managers),
+            "memory_total_bytes": total,
+            "memory_available_bytes": memory["available_bytes"],
+            "pressure_some_avg10": some,
+            "pressure_full_avg10": pressure.get("full_avg10", 0.0),
+            "under_pressure": int(
+                some >= self.pressure_watermark or available_ratio < self.available_watermark
+            )
+        }
+
+    def _relieve(self, now):
+        with self._lock:
+            candidates = [
+                (sample.get("rss_bytes", 0), manager)
+                for manager, (_, sample, _) in self._managers.items()
+                if sample.get("running") and now - manager.last_active >= self.min_idle
+            ]
+
+        for _, manager in sorted(candidates, key=lambda c: c[0], reverse=True):
+            if self.action == "recycle":
+                if manager.recycle():
+                    _RECYCLED.inc()
+                    return
+            elif manager.evict():
+                _EVICTED.inc()
+                return
@@ -0,0 +1,205 @@
+# core/kernel/shm_ring.py
+
+import os
+import select
+import struct
+import time
+from multiprocessing import shared_memory
+
+# Header: each index on its own cache line so producer and consumer do not
+# false-share. Positions only grow; used bytes are head - tail.
+_HEAD = 0
+_TAIL = 64
+_CONSUMER_WAITING = 128
+_PRODUCER_WAITING = 192
+_CAPACITY = 248
+_DATA = 256
+
+_U64 = struct.Struct("<Q")
+_U32 = struct.Struct("<I")
+_FRAME = struct.Struct("<IB")
+
+STREAMS = ("stdout", "stderr")
+_STREAM_CODES = {name: code for code, name in enumerate(STREAMS)}
+
+# Upper bound on a blocking wait. Python cannot fence between publishing a
+# position and reading the other side's waiting flag, so a wakeup can be
+# missed; the bounded wait turns that into a short delay, not a hang.
+_RECHECK = 0.05
+
+
+def available():
+    """Whether this platform has what the ring needs (Linux eventfd, /dev/shm)."""
+    return hasattr(os, "eventfd") and hasattr(os, "eventfd_write") and os.path.isdir("/dev/shm")
+
+
+class ShmRing:
+
+    """Single-producer single-consumer ring of framed output chunks in
+    shared memory, with eventfd wakeups.
+
+    The consumer creates the ring and its two eventfds (data, space) and
+    hands the name and fds to the producer, e.g. with socket.send_fds.
+    Frames are [u32 length][u8 stream][utf-8 payload] and wrap around the
+    end of the buffer. Each side signals the other only when it announced
+    it is about to sleep, so a busy stream costs no syscalls per chunk.
+    """
+
+    def __init__(self, name=None, capacity=1 << 20, data_fd=None, space_fd=None):
+        create = name is None
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=_DATA + capacity)
+            self.shm.buf[:_DATA] = bytes(_DATA)
+            _U64.pack_into(self.shm.buf, _CAPACITY, capacity)
+            self.data_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+            self.space_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        else:
+            self.shm = _attach(name)
+            self.data_fd = data_fd
+            self.space_fd = space_fd
+
+        self.name = self.shm.name
+        self.owner = create
+        self.capacity = _U64.unpack_from(self.shm.buf, _CAPACITY)[0]
+        self._buf = self.shm.buf
+        self._data = self.shm.buf[_DATA:_DATA + self.capacity]
+
+    # ---- producer ----
+
+    def write(self, stream, data: str, timeout=5.0):
+        """Append one chunk; raises ValueError if it can never fit and
+        TimeoutError if the consumer does not make room in time."""
+        payload = data.encode("utf-8")
+        size = _FRAME.size + len(payload)
+        if size > self.capacity:
+            raise ValueError(f"Chunk of {size} bytes exceeds ring capacity {self.capacity}")
+
+        head = self._load(_HEAD)
+        deadline = None
+        while self.capacity - (head - self._load(_TAIL)) < size:
+            if deadline is None:
+                deadline = time.monotonic() + timeout
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Ring consumer is not draining")
+            self._store32(_PRODUCER_WAITING, 1)
+            if self.capacity - (head - self._load(_TAIL)) >= size:
+                break
+            _wait(self.space_fd, min(remaining, _RECHECK))
+        self._store32(_PRODUCER_WAITING, 0)
+
+        self._copy_in(head, _FRAME.pack(len(payload), _STREAM_CODES[stream]))
+        self._copy_in(head + _FRAME.size, payload)
+        self._store(_HEAD, head + size)
+
+        if self._load32(_CONSUMER_WAITING):
+            os.eventfd_write(self.data_fd, 1)
+
+    def position(self):
+        """Bytes written so far; read(until=...) stops there."""
+        return self._load(_HEAD)
+
+    # ---- consumer ----
+
+    def read(self, until=None):
+        """Return complete chunks as [(stream, data), ...] without blocking,
+        all of them or those written before position until."""
+        head = self._load(_HEAD)
+        if until is not None:
+            head = min(head, until)
+        tail = self._load(_TAIL)
+        chunks = []
+        while tail < head:
+            length, code = _FRAME.unpack(self._copy_out(tail, _FRAME.size))
+            payload = self._copy_out(tail + _FRAME.size, length)
+            chunks.append((STREAMS[code], payload.decode("utf-8")))
+            tail += _FRAME.size + length
+
+        if chunks:
+            self._store(_TAIL, tail)
+            if self._load32(_PRODUCER_WAITING):
+                os.eventfd_write(self.space_fd, 1)
+        return chunks
+
+    def wait(self, other_fds=(), timeout=None):
+        """Block until data is in the ring or one of other_fds is readable.
+        Returns the readable subset of other_fds."""
+        self._store32(_CONSUMER_WAITING, 1)
+        try:
+            if self._load(_HEAD) != self._load(_TAIL):
+                return []
+            limit = _RECHECK if timeout is None else min(timeout, _RECHECK)
+            ready = select.select([self.data_fd, *other_fds], [], [], limit)[0]
+            if self.data_fd in ready:
+                _drain_eventfd(self.data_fd)
+            return [fd for fd in ready if fd != self.data_fd]
+        finally:
+            self._store32(_CONSUMER_WAITING, 0)
+
+    def close(self):
+        self._data.release()
+        self._buf = self._data = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        for fd in (self.data_fd, self.space_fd):
+            if fd is not None:
+                os.close(fd)
+        self.data_fd = self.space_fd = None
+
+    # ---- internal helpers ----
+
+    def _load(self, offset):
+        return _U64.unpack_from(self._buf, offset)[0]
+
+    def _store(self, offset, value):
+        _U64.pack_into(self._buf, offset, value)
+
+    def _load32(self, offset):
+        return _U32.unpack_from(self._buf, offset)[0]
+
+    def _store32(self, offset, value):
+        _U32.pack_into(self._buf, offset, value)
+
+    def _copy_in(self, position, data):
+        start = position % self.capacity
+        first = min(len(data), self.capacity - start)
+        self._data[start:start + first] = data[:first]
+        if first < len(data):
+            self._data[:len(data) - first] = data[first:]
+
+    def _copy_out(self, position, length):
+        start = position % self.capacity
+        first = min(length, self.capacity - start)
+        data = bytes(self._data[start:start + first])
+        if first < length:
+            data += bytes(self._data[:length - first])
+        return data
+
+
+def _attach(name):
+    # The consumer owns the segment; keep the resource tracker of this
+    # process from unlinking it at exit.
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _wait(fd, timeout):
+    if select.select([fd], [], [], timeout)[0]:
+        _drain_eventfd(fd)
+
+
+def _drain_eventfd(fd):
+    try:
+        os.eventfd_read(fd)
+    except BlockingIOError:
+        pass
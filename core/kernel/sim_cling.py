@@ -0,0 +1,129 @@
+# core/kernel/sim_cling.py
+#
+# Stand-in for the Cling REPL used for offline, deterministic benchmarks.
+# It speaks the same line protocol CppKernel expects: every stdin line is
+# one cell, output goes to stdout/stderr and a "cling>" prompt line marks
+# completion, after the end-of-cell marker on stderr (cpp_kernel.DONE_MARKER).
+# Runs as a plain script so it needs nothing from `core`.
+#
+# A cell may override the configured behaviour with a directive comment:
+#     //sim: sleep=0.2 out=4096 err=128 print=hello crash exit=3 hang
+
+import argparse
+import math
+import os
+import random
+import signal
+import sys
+import time
+
+PROMPT = "cling>\n"
+DONE_MARKER = "\x1eccollab-done\n"  # same as cpp_kernel.DONE_MARKER
+FILLER = "x" * 79 + "\n"
+
+
+def parse_latency(spec):
+    """Turn "fixed:S", "uniform:A,B", "exp:MEAN" or "lognormal:MEDIAN,SIGMA" into a sampler."""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",")] if args else []
+
+    if kind == "fixed":
+        return lambda rng: values[0] if values else 0.0
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "exp":
+        return lambda rng: rng.expovariate(1.0 / values[0])
+    if kind == "lognormal":
+        mu = math.log(values[0])
+        return lambda rng: rng.lognormvariate(mu, values[1])
+    raise ValueError(f"Unknown latency spec {spec!r}")
+
+
+def parse_directive(line):
+    directive = {}
+    _, marker, rest = line.partition("//sim:")
+    if not marker:
+        return directive
+
+    for token in rest.split():
+        key, _, value = token.partition("=")
+        directive[key] = value or True
+    return directive
+
+
+def emit(stream, nbytes):
+    # Write roughly nbytes of output in 80-byte lines.
+    for _ in range(int(nbytes) // len(FILLER)):
+        stream.write(FILLER)
+    rest = int(nbytes) % len(FILLER)
+    if rest:
+        stream.write("x" * (rest - 1) + "\n")
+
+
+def run_cell(line, args, latency, rng):
+    directive = parse_directive(line)
+
+    if "crash" in directive or rng.random() < args.crash_rate:
+        sys.stdout.flush()
+        os._exit(int(directive.get("exit", 139)))
+
+    if "hang" in directive or rng.random() < args.hang_rate:
+        while True:
+            time.sleep(3600)
+
+    err_bytes = directive.get("err")
+    if err_bytes is None and rng.random() < args.stderr_rate:
+        err_bytes = args.stderr_bytes
+    if err_bytes:
+        emit(sys.stderr, err_bytes)
+        sys.stderr.flush()
+
+    delay = float(directive.get("sleep", latency(rng)))
+    if delay > 0:
+        time.sleep(delay)
+
+    if "print" in directive:
+        sys.stdout.write(f"{directive['print']}\n")
+    emit(sys.stdout, directive.get("out", args.output_bytes))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulated Cling REPL")
+    parser.add_argument("--nologo", action="store_true")
+    parser.add_argument("--startup-delay", type=float, default=0.0)
+    parser.add_argument("--latency", default="fixed:0")
+    parser.add_argument("--output-bytes", type=int, default=0)
+    parser.add_argument("--stderr-rate", type=float, default=0.0)
+    parser.add_argument("--stderr-bytes", type=int, default=256)
+    parser.add_argument("--crash-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    latency = parse_latency(args.latency)
+
+    # SIGINT aborts the running cell and returns to the prompt, like Cling.
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    time.sleep(args.startup_delay)
+    sys.stdout.write(PROMPT)
+    sys.stdout.flush()
+
+    while True:
+        try:
+            line = sys.stdin.readline()
+            if not line:
+                break
+            run_cell(line, args, latency, rng)
+        except KeyboardInterrupt:
+            sys.stderr.write("Interrupted\n")
+
+        sys.stderr.write(DONE_MARKER)
+        sys.stderr.flush()
+        sys.stdout.write(PROMPT)
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
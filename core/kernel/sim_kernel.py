@@ -0,0 +1,36 @@
+# core/kernel/sim_kernel.py
+
+import os
+import sys
+from core.kernel.cpp_kernel import CppKernel
+
+SIM_CLING = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sim_cling.py")
+
+class SimKernel(CppKernel):
+
+    """CppKernel driving the simulated Cling process instead of the real one.
+
+    latency is a sim_cling spec: "fixed:S", "uniform:A,B", "exp:MEAN" or
+    "lognormal:MEDIAN,SIGMA" (seconds). Rates are per-cell probabilities.
+    """
+
+    # The wrapper writes the end-of-cell marker itself.
+    marker_cell = None
+
+    def __init__(self, startup_delay=0.0, latency="fixed:0", output_bytes=0,
+                 stderr_rate=0.0, stderr_bytes=256, crash_rate=0.0,
+                 hang_rate=0.0, seed=None, recorder=None):
+        command = [
+            sys.executable, SIM_CLING, "--nologo",
+            "--startup-delay", str(startup_delay),
+            "--latency", latency,
+            "--output-bytes", str(output_bytes),
+            "--stderr-rate", str(stderr_rate),
+            "--stderr-bytes", str(stderr_bytes),
+            "--crash-rate", str(crash_rate),
+            "--hang-rate", str(hang_rate)
+        ]
+        if seed is not None:
+            command += ["--seed", str(seed)]
+
+        super().__init__(command, recorder)
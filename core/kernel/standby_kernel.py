@@ -0,0 +1,218 @@
+# core/kernel/standby_kernel.py
+
+import os
+import threading
+import time
+from core.kernel.cpp_kernel import CppKernel
+from core.utils.proc import kernel_rss_bytes
+from core.utils.timeout import run_with_timeout, ExecutionTimeout
+
+class StandbyKernel:
+
+    """A second kernel kept in step with the primary by replaying its
+    state-changing cells on a background thread.
+
+    The standby process runs at a higher nice value so mirroring never
+    competes with the primary, but only where the value can be lowered
+    again on promotion (CAP_SYS_NICE or RLIMIT_NICE); elsewhere a promoted
+    kernel would keep the lower priority, so the standby runs at ours.
+    promote() hands over the caught-up kernel and a new standby is rebuilt
+    from the recorded history. A standby on which a mirrored cell failed
+    has diverged from the primary and is never handed over.
+    """
+
+    def __init__(self, kernel_factory=CppKernel, niceness=10, timeout=30, retry_delay=1.0):
+        self.kernel_factory = kernel_factory
+        self.niceness = niceness if niceness <= 0 or _can_raise_priority() else 0
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+
+        # Every mirrored cell as (code, enqueued_at); _applied is how many of
+        # them the current standby kernel has run.
+        self.history = []
+        self._applied = 0
+        self._kernel = None
+        self._busy = False
+        # A mirrored cell failed on the current standby kernel.
+        self.diverged = False
+        self._rebuilt_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.mirrored = 0
+        self.failures = 0
+        self.promotions = 0
+
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def mirror(self, code: str):
+        """Queue a cell that ran successfully on the primary."""
+        with self._cond:
+            self.history.append((code, time.monotonic()))
+            self._cond.notify_all()
+
+    def promote(self, timeout=5.0, rebuild=True):
+        """Return the standby kernel once it has caught up, or None.
+        Without rebuild the standby closes instead of starting over. A
+        diverged standby is not returned: it starts over from the history
+        (or closes) and diverged stays set until it has."""
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._closed or self.diverged or (
+                    self._kernel is not None and not self._busy
+                    and self._applied == len(self.history)
+                ),
+                timeout
+            )
+            if not ready or self._closed:
+                return None
+
+            kernel, self._kernel = self._kernel, None
+            if self.diverged:
+                self._applied = 0
+                self._rebuilt_at = time.monotonic()
+                self._closed = not rebuild
+                self._cond.notify_all()
+                if kernel is not None:
+                    kernel.shutdown()
+                return None
+
+            self._applied = 0
+            self._rebuilt_at = time.monotonic()
+            self._closed = not rebuild
+            self.promotions += 1
+            self._cond.notify_all()
+
+        _set_niceness(kernel, 0)
+        return kernel
+
+    def clear(self, history=()):
+        """Start over with a fresh standby kernel replaying only history."""
+        now = time.monotonic()
+        with self._cond:
+            kernel, self._kernel = self._kernel, None
+            self.history = [(code, now) for code in history]
+            self._applied = 0
+            self.diverged = False
+            self._rebuilt_at = time.monotonic()
+            self._cond.notify_all()
+
+        if kernel is not None:
+            kernel.shutdown()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            kernel, self._kernel = self._kernel, None
+            self._cond.notify_all()
+
+        if kernel is not None:
+            kernel.shutdown()
+
+    def stats(self):
+        with self._cond:
+            pending = len(self.history) - self._applied
+            lag = 0.0
+            if pending:
+                oldest = self.history[self._applied][1]
+                lag = time.monotonic() - max(oldest, self._rebuilt_at)
+            kernel = self._kernel
+
+            return {
+                "ready": int(kernel is not None and pending == 0),
+                "pending_cells": pending,
+                "lag_seconds": lag,
+                "history_cells": len(self.history),
+                "mirrored": self.mirrored,
+                "failures": self.failures,
+                "diverged": int(self.diverged),
+                "promotions": self.promotions,
+                "rss_bytes": kernel_rss_bytes(kernel)
+            }
+
+    # ---- internal helpers ----
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or self._kernel is None
+                    or self._applied < len(self.history)
+                )
+                if self._closed:
+                    return
+                kernel = self._kernel
+                if kernel is not None:
+                    code = self.history[self._applied][0]
+                    self._busy = True
+
+            if kernel is None:
+                self._start_kernel()
+                continue
+
+            try:
+                result = run_with_timeout(lambda: kernel.execute(code), self.timeout)
+                failed = result["status"] != "ok"
+            except ExecutionTimeout:
+                kernel.interrupt()
+                failed = True
+            except Exception:
+                failed = True
+
+            with self._cond:
+                self._busy = False
+                # promote() or clear() may have taken the kernel meanwhile.
+                if kernel is self._kernel:
+                    self._applied += 1
+                    self.mirrored += 1
+                    self.failures += failed
+                    self.diverged = self.diverged or failed
+                self._cond.notify_all()
+
+    def _start_kernel(self):
+        try:
+            kernel = self.kernel_factory()
+            kernel.start()
+        except Exception:
+            with self._cond:
+                self.failures += 1
+            time.sleep(self.retry_delay)
+            return
+
+        _set_niceness(kernel, self.niceness)
+        with self._cond:
+            if self._closed:
+                kernel.shutdown()
+                return
+            self._kernel = kernel
+            self._applied = 0
+            self.diverged = False
+            self._cond.notify_all()
+
+
+def _can_raise_priority():
+    # Lowering a nice value needs CAP_SYS_NICE (bit 23) or RLIMIT_NICE >= 20.
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("CapEff:") and int(line.split()[1], 16) >> 23 & 1:
+                    return True
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+        limit = resource.getrlimit(resource.RLIMIT_NICE)[0]
+    except (ImportError, AttributeError, OSError):
+        return False
+    return limit == resource.RLIM_INFINITY or limit >= 20
+
+
+def _set_niceness(kernel, niceness):
+    process = getattr(kernel, "process", None)
+    if process is None:
+        return
+    try:
+        os.setpriority(os.PRIO_PROCESS, process.pid, niceness)
+    except (OSError, AttributeError):
+        pass
+
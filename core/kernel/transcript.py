@@ -0,0 +1,73 @@
+# core/kernel/transcript.py
+#
+# Binary transcripts of kernel pipe traffic.
+#
+# Layout: the 5-byte magic b"CCTR\x02", then one record per chunk:
+#     channel: u8   (0 = stdin, 1 = stdout, 2 = stderr)
+#     t_ns:    u64  (nanoseconds since the recorder was created)
+#     length:  u32
+#     data:    length bytes, exactly as written to or read from the pipe
+# Output chunks are recorded before decoding, so chunk boundaries, invalid
+# UTF-8 and unterminated lines survive. Version 1 transcripts (b"CCTR\x01",
+# one decoded line per record) still read. Paths ending in ".gz" are
+# gzip-compressed.
+
+import gzip
+import struct
+import threading
+import time
+
+MAGIC = b"CCTR\x02"
+_MAGIC_V1 = b"CCTR\x01"
+STDIN, STDOUT, STDERR = 0, 1, 2
+CHANNELS = {"stdin": STDIN, "stdout": STDOUT, "stderr": STDERR}
+
+_HEADER = struct.Struct("<BQI")
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+class TranscriptRecorder:
+
+    """Append timestamped stdin/stdout/stderr chunks (bytes, or text to
+    encode as UTF-8) to a transcript file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = _open(path, "wb")
+        self._file.write(MAGIC)
+        self._lock = threading.Lock()
+        self._start = time.perf_counter_ns()
+
+    def write(self, channel, data):
+        payload = data if isinstance(data, bytes) else data.encode("utf-8")
+        header = _HEADER.pack(channel, time.perf_counter_ns() - self._start, len(payload))
+        # stderr is recorded from its own reader thread.
+        with self._lock:
+            if self._file is not None:
+                self._file.write(header + payload)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_transcript(path):
+    """Yield (channel, t_ns, data) records from a transcript file; data
+    is bytes."""
+    with _open(path, "rb") as f:
+        if f.read(len(MAGIC)) not in (MAGIC, _MAGIC_V1):
+            raise ValueError(f"{path} is not a kernel transcript")
+
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            channel, t_ns, length = _HEADER.unpack(header)
+            yield channel, t_ns, f.read(length)
@@ -0,0 +1,263 @@
+# core/protocol/fast_messages.py
+
+import json
+import re
+from core.protocol.message_types import MessageType
+
+# Session ids also name per-session directories, so no separators or dots.
+_SESSION_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Well-formed UTF-8 (Unicode Table 3-7: no overlongs, surrogates or code
+# points past U+10FFFF), matched in C without building a str.
+_UTF8 = re.compile(
+    rb"(?:[\x00-\x7f]+"
+    rb"|[\xc2-\xdf][\x80-\xbf]"
+    rb"|\xe0[\xa0-\xbf][\x80-\xbf]"
+    rb"|[\xe1-\xec\xee\xef][\x80-\xbf]{2}"
+    rb"|\xed[\x80-\x9f][\x80-\xbf]"
+    rb"|\xf0[\x90-\xbf][\x80-\xbf]{2}"
+    rb"|[\xf1-\xf3][\x80-\xbf]{3}"
+    rb"|\xf4[\x80-\x8f][\x80-\xbf]{2})*"
+)
+
+# Accept both the wire value and the enum member itself.
+_TYPES = {t.value: t for t in MessageType}
+_TYPES.update({t: t for t in MessageType})
+
+
+class MessageValidationError(ValueError):
+
+    """Raised when a message fails hot-path validation."""
+
+    def __init__(self, message, index=None):
+        if index is not None:
+            message = f"message {index}: {message}"
+        super().__init__(message)
+        self.index = index
+
+
+def _decode(value):
+    """Decode a bytes-like payload to str."""
+    return bytes(value).decode("utf-8")
+
+
+def _is_text(value):
+    return isinstance(value, (str, bytes, bytearray, memoryview))
+
+
+def _check_type(data, expected):
+    msg_type = _TYPES.get(data.get("type"))
+    if msg_type is not expected:
+        raise MessageValidationError(f"type must be {expected.value!r}")
+    return msg_type
+
+
+def _require_str(data, name):
+    value = data.get(name)
+    if type(value) is not str:
+        raise MessageValidationError(f"{name} must be a string")
+    return value
+
+
+def validate_session_id(value):
+    """Return value if it is a well-formed session_id, else raise."""
+    if type(value) is not str or not _SESSION_ID.fullmatch(value):
+        raise MessageValidationError("session_id must be 1-64 letters, digits, '_' or '-'")
+    return value
+
+
+def _require_text(data, name):
+    # Payload fields may arrive as raw bytes. They stay undecoded until the
+    # attribute is read, but bad UTF-8 fails validation, not that read.
+    value = data.get(name)
+    if type(value) is str:
+        return value
+    if not _is_text(value):
+        raise MessageValidationError(f"{name} must be a string or bytes")
+    if type(value) is not memoryview and value.isascii():
+        return value
+    if _UTF8.fullmatch(value) is None:
+        raise MessageValidationError(f"{name} must be valid UTF-8")
+    return value
+
+
+class ExecuteRequestMessage:
+
+    """Slotted execute_request for the hot path, mirroring schemas.ExecuteRequest."""
+
+    __slots__ = ("type", "request_id", "session_id", "language", "timeout", "cell_id", "tenant_id", "_code")
+
+    def __init__(self, request_id, session_id, language, code, timeout=3,
+                 type=MessageType.EXECUTE_REQUEST, cell_id=None, tenant_id=None):
+        # Trusted constructor: callers that build requests internally skip validation.
+        self.type = type
+        self.request_id = request_id
+        self.session_id = session_id
+        self.language = language
+        self.timeout = timeout
+        self.cell_id = cell_id
+        self.tenant_id = tenant_id
+        self._code = code
+
+    @property
+    def code(self):
+        code = self._code
+        if type(code) is not str:
+            code = self._code = _decode(code)
+        return code
+
+    @classmethod
+    def validate(cls, data):
+        """Validate a decoded dict and build a message from it."""
+        if type(data) is not dict:
+            raise MessageValidationError("message must be an object")
+
+        msg_type = _check_type(data, MessageType.EXECUTE_REQUEST)
+
+        timeout = data.get("timeout", 3)
+        if timeout is not None and type(timeout) not in (int, float) and timeout != "auto":
+            raise MessageValidationError('timeout must be a number or "auto"')
+
+        cell_id = data.get("cell_id")
+        if cell_id is not None and type(cell_id) is not str:
+            raise MessageValidationError("cell_id must be a string")
+
+        tenant_id = data.get("tenant_id")
+        if tenant_id is not None and type(tenant_id) is not str:
+            raise MessageValidationError("tenant_id must be a string")
+
+        return cls(
+            _require_str(data, "request_id"),
+            validate_session_id(data.get("session_id")),
+            _require_str(data, "language"),
+            _require_text(data, "code"),
+            timeout,
+            msg_type,
+            cell_id,
+            tenant_id
+        )
+
+    def to_dict(self):
+        return {
+            "type": self.type.value,
+            "request_id": self.request_id,
+            "session_id": self.session_id,
+            "language": self.language,
+            "code": self.code,
+            "timeout": self.timeout,
+            "cell_id": self.cell_id,
+            "tenant_id": self.tenant_id
+        }
+
+    def __repr__(self):
+        return f"ExecuteRequestMessage(request_id={self.request_id!r}, session_id={self.session_id!r})"
+
+
+class ExecuteResponseMessage:
+
+    """Slotted execute_response for the hot path, mirroring schemas.ExecuteResponse."""
+
+    __slots__ = ("type", "request_id", "execution_count", "status", "_stdout", "_stderr")
+
+    def __init__(self, request_id, execution_count, status, stdout, stderr,
+                 type=MessageType.EXECUTE_RESPONSE):
+        # Trusted constructor: callers that build responses internally skip validation.
+        self.type = type
+        self.request_id = request_id
+        self.execution_count = execution_count
+        self.status = status
+        self._stdout = stdout
+        self._stderr = stderr
+
+    @property
+    def stdout(self):
+        stdout = self._stdout
+        if type(stdout) is not str:
+            stdout = self._stdout = _decode(stdout)
+        return stdout
+
+    @property
+    def stderr(self):
+        stderr = self._stderr
+        if type(stderr) is not str:
+            stderr = self._stderr = _decode(stderr)
+        return stderr
+
+    @classmethod
+    def from_result(cls, request_id, execution_count, result):
+        """Build a response from a kernel result dict without re-validating it."""
+        return cls(
+            request_id,
+            execution_count,
+            result["status"],
+            result["stdout"],
+            result["stderr"]
+        )
+
+    @classmethod
+    def validate(cls, data):
+        """Validate a decoded dict and build a message from it."""
+        if type(data) is not dict:
+            raise MessageValidationError("message must be an object")
+
+        msg_type = _check_type(data, MessageType.EXECUTE_RESPONSE)
+
+        execution_count = data.get("execution_count")
+        if type(execution_count) is not int:
+            raise MessageValidationError("execution_count must be an integer")
+
+        return cls(
+            _require_str(data, "request_id"),
+            execution_count,
+            _require_str(data, "status"),
+            _require_text(data, "stdout"),
+            _require_text(data, "stderr"),
+            msg_type
+        )
+
+    def to_dict(self):
+        return {
+            "type": self.type.value,
+            "request_id": self.request_id,
+            "execution_count": self.execution_count,
+            "status": self.status,
+            "stdout": self.stdout,
+            "stderr": self.stderr
+        }
+
+    def __repr__(self):
+        return f"ExecuteResponseMessage(request_id={self.request_id!r}, status={self.status!r})"
+
+
+# ---- batch helpers ----
+
+def _validate_many(cls, items):
+    validate = cls.validate
+    out = []
+    append = out.append
+
+    for index, item in enumerate(items):
+        try:
+            append(validate(item))
+        except MessageValidationError as e:
+            raise MessageValidationError(str(e), index) from None
+
+    return out
+
+
+def validate_requests(items):
+    """Validate a sequence of execute_request dicts in one call."""
+    return _validate_many(ExecuteRequestMessage, items)
+
+
+def validate_responses(items):
+    """Validate a sequence of execute_response dicts in one call."""
+    return _validate_many(ExecuteResponseMessage, items)
+
+
+def parse_requests(raw):
+    """Decode a JSON object or array of execute_request messages."""
+    data = json.loads(raw)
+    if type(data) is dict:
+        data = [data]
+    return validate_requests(data)
@@ -6,7 +6,10 @@ class MessageType(str, Enum):
     EXECUTE_REQUEST = "execute_request"
     EXECUTE_RESPONSE = "execute_response"
     STREAM_OUTPUT = "stream_output"
+    STREAM_GAP = "stream_gap"
     ERROR = "error"
     STATUS = "status"
     INTERRUPT = "interrupt"
     RESTART = "restart"
+    RESUME = "resume"
+    REQUEST_STATUS = "request_status"
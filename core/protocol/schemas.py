@@ -1,7 +1,7 @@
 # core/protocol/schemas.py
 
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional, Union
 from core.protocol.message_types import MessageType
 
 class ExecuteRequest(BaseModel):
@@ -10,7 +10,9 @@ class ExecuteRequest(BaseModel):
     session_id: str
     language: str
     code: str
-    timeout: Optional[int] = 3
+    timeout: Optional[Union[int, float, Literal["auto"]]] = 3
+    cell_id: Optional[str] = None
+    tenant_id: Optional[str] = None
 
 class ExecuteResponse(BaseModel):
     type: MessageType
@@ -1,14 +1,348 @@
 # core/runner.py
+#
+# Notebook load generator for capacity planning.
+#
+#     python -m core.runner --notebooks notebooks/ --concurrency 8 --duration 60
+#     python -m core.runner --notebooks notebooks/ --arrival open --rate 2 \
+#         --target tcp://127.0.0.1:8765
+#
+# Each virtual user opens a session, runs every cell of one notebook in
+# order and closes the session. "closed" keeps --concurrency users busy
+# back to back; "open" starts sessions as a Poisson process at --rate per
+# second (capped at --concurrency in flight, excess arrivals are counted
+# as dropped). Notebooks are .ipynb files or source files whose cells are
+# separated by "//%%" lines.
 
+import argparse
+import functools
+import glob
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import uuid
+
+from core.kernel.cpp_kernel import CppKernel
+from core.kernel.remote_kernel import RemoteKernel
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.message_types import MessageType
 from core.session.notebook_session import NotebookSession
+from core.utils.metrics import Histogram
+
+CELL_MARKER = re.compile(r"^\s*//\s*%%.*$", re.MULTILINE)
+
+
+def load_notebooks(directory, single_line=False):
+    """Return [(name, [cell code, ...]), ...] for every notebook in directory."""
+    notebooks = []
+
+    for path in sorted(glob.glob(os.path.join(directory, "*"))):
+        if path.endswith(".ipynb"):
+            with open(path) as f:
+                data = json.load(f)
+            cells = [
+                "".join(cell["source"]) if isinstance(cell["source"], list) else cell["source"]
+                for cell in data.get("cells", [])
+                if cell.get("cell_type") == "code"
+            ]
+        elif path.endswith((".c", ".cc", ".cpp", ".cxx", ".txt")):
+            with open(path) as f:
+                cells = CELL_MARKER.split(f.read())
+        else:
+            continue
+
+        cells = [cell.strip() for cell in cells if cell.strip()]
+        if single_line:
+            # The simulator treats every line as a cell; keep one line per cell.
+            cells = [" ".join(cell.splitlines()) for cell in cells]
+        if cells:
+            notebooks.append((os.path.basename(path), cells))
+
+    return notebooks
+
+
+# ---- targets ----
+
+class LocalTarget:
+
+    """Drive NotebookSession/KernelManager in this process."""
+
+    def __init__(self, kernel_factory):
+        self.kernel_factory = kernel_factory
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def open_session(self):
+        session = NotebookSession(kernel_factory=self.kernel_factory)
+        with self._lock:
+            self.active += 1
+        return session
+
+    def run(self, session, code, timeout):
+        return session.run_cell(code, timeout=timeout)["status"]
+
+    def close_session(self, session):
+        session.close()
+        with self._lock:
+            self.active -= 1
+
+
+class RemoteTarget:
+
+    """Drive a gateway speaking newline-delimited JSON protocol messages over TCP."""
+
+    def __init__(self, address):
+        host, _, port = address.rpartition(":")
+        self.address = (host, int(port))
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def open_session(self):
+        conn = socket.create_connection(self.address)
+        with self._lock:
+            self.active += 1
+        return {"id": uuid.uuid4().hex, "conn": conn, "reader": conn.makefile("r")}
+
+    def run(self, session, code, timeout):
+        request_id = uuid.uuid4().hex
+        message = {
+            "type": MessageType.EXECUTE_REQUEST.value,
+            "request_id": request_id,
+            "session_id": session["id"],
+            "language": "cpp",
+            "code": code,
+            "timeout": timeout
+        }
+        session["conn"].sendall((json.dumps(message) + "\n").encode("utf-8"))
+
+        for line in session["reader"]:
+            reply = json.loads(line)
+            if reply.get("request_id") != request_id:
+                continue
+            if reply["type"] == MessageType.EXECUTE_RESPONSE.value:
+                return reply["status"]
+            if reply["type"] == MessageType.ERROR.value:
+                # Shed by admission control, not a failure of the cell.
+                return "rejected" if "retry_after" in reply else "error"
+        raise ConnectionError("Gateway closed the connection")
+
+    def close_session(self, session):
+        session["conn"].close()
+        with self._lock:
+            self.active -= 1
+
+
+# ---- statistics ----
+
+class LoadStats:
+
+    """Per-interval and cumulative counters for the load run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = Histogram()
+        self.counts = {}
+        self.sessions_started = 0
+        self.sessions_finished = 0
+        self.dropped = 0
+        self._reset_interval()
+
+    def record(self, status, seconds):
+        with self._lock:
+            self.total.record(seconds * 1e6)
+            self.interval.record(seconds * 1e6)
+            self.counts[status] = self.counts.get(status, 0) + 1
+            self.interval_counts[status] = self.interval_counts.get(status, 0) + 1
+
+    def session_started(self):
+        with self._lock:
+            self.sessions_started += 1
+
+    def session_finished(self):
+        with self._lock:
+            self.sessions_finished += 1
+
+    def drop(self):
+        with self._lock:
+            self.dropped += 1
+
+    def take_interval(self, elapsed, active_kernels):
+        with self._lock:
+            hist, counts = self.interval, self.interval_counts
+            self._reset_interval()
+        return _summary(hist, counts, elapsed, active_kernels)
+
+    def summary(self, elapsed, active_kernels):
+        with self._lock:
+            report = _summary(self.total, self.counts, elapsed, active_kernels)
+            report.update({
+                "sessions_started": self.sessions_started,
+                "sessions_finished": self.sessions_finished,
+                "sessions_dropped": self.dropped
+            })
+            return report
+
+    def _reset_interval(self):
+        self.interval = Histogram()
+        self.interval_counts = {}
+
+
+def _summary(hist, counts, elapsed, active_kernels):
+    cells = sum(counts.values())
+    return {
+        "cells": cells,
+        "cells_per_sec": cells / elapsed if elapsed else 0.0,
+        "latency_p50": hist.quantile(0.5),
+        "latency_p99": hist.quantile(0.99),
+        "error_rate": counts.get("error", 0) / cells if cells else 0.0,
+        "timeout_rate": counts.get("timeout", 0) / cells if cells else 0.0,
+        "rejected_rate": counts.get("rejected", 0) / cells if cells else 0.0,
+        "kernels": active_kernels
+    }
+
+
+# ---- load generation ----
+
+def run_notebook(target, notebook, stats, args, deadline):
+    _, cells = notebook
+    stats.session_started()
+
+    try:
+        session = target.open_session()
+    except Exception:
+        stats.record("error", 0.0)
+        return
+
+    try:
+        for code in cells:
+            if time.monotonic() >= deadline:
+                break
+            start = time.monotonic()
+            try:
+                status = target.run(session, code, args.timeout)
+            except Exception:
+                status = "error"
+            stats.record(status, time.monotonic() - start)
+            if args.think_time:
+                time.sleep(args.think_time)
+    finally:
+        target.close_session(session)
+        stats.session_finished()
+
+
+def closed_loop(target, notebooks, stats, args, deadline, rng):
+    def user(index):
+        turn = index
+        while time.monotonic() < deadline:
+            run_notebook(target, notebooks[turn % len(notebooks)], stats, args, deadline)
+            turn += args.concurrency
+
+    threads = [threading.Thread(target=user, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def open_loop(target, notebooks, stats, args, deadline, rng):
+    slots = threading.BoundedSemaphore(args.concurrency)
+    threads = []
+
+    def arrival(notebook):
+        try:
+            run_notebook(target, notebook, stats, args, deadline)
+        finally:
+            slots.release()
+
+    def generator():
+        while True:
+            time.sleep(rng.expovariate(args.rate))
+            if time.monotonic() >= deadline:
+                return
+            if not slots.acquire(blocking=False):
+                stats.drop()
+                continue
+            thread = threading.Thread(target=arrival, args=(rng.choice(notebooks),), daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    feeder = threading.Thread(target=generator, daemon=True)
+    threads.append(feeder)
+    feeder.start()
+    return threads
+
+
+def _timeout(value):
+    return value if value == "auto" else float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Notebook load generator")
+    parser.add_argument("--notebooks", required=True, help="directory of notebooks")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--arrival", choices=("closed", "open"), default="closed")
+    parser.add_argument("--rate", type=float, default=1.0, help="open loop: sessions per second")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--timeout", type=_timeout, default=3,
+                        help='per-cell timeout in seconds, or "auto" for adaptive limits')
+    parser.add_argument("--think-time", type=float, default=0.0)
+    parser.add_argument("--kernel", choices=("sim", "cling"), default="cling")
+    parser.add_argument("--target", default="local", help="'local' or tcp://host:port")
+    parser.add_argument("--kernel-host", metavar="SOCKET",
+                        help="local target: run kernels in the kernel host daemon on this UNIX socket")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", help="write the final summary JSON here")
+    args = parser.parse_args(argv)
+
+    notebooks = load_notebooks(args.notebooks, single_line=args.kernel == "sim")
+    if not notebooks:
+        parser.error(f"no notebooks found in {args.notebooks}")
+
+    if args.target == "local":
+        factory = functools.partial(SimKernel, seed=args.seed) if args.kernel == "sim" else CppKernel
+        if args.kernel_host:
+            options = {"seed": args.seed} if args.kernel == "sim" else {}
+            factory = functools.partial(RemoteKernel, args.kernel_host, kind=args.kernel, options=options)
+        target = LocalTarget(factory)
+    elif args.target.startswith("tcp://"):
+        target = RemoteTarget(args.target[len("tcp://"):])
+    else:
+        parser.error("--target must be 'local' or tcp://host:port")
+
+    rng = random.Random(args.seed)
+    stats = LoadStats()
+    start = time.monotonic()
+    deadline = start + args.duration
+
+    drive = closed_loop if args.arrival == "closed" else open_loop
+    threads = drive(target, notebooks, stats, args, deadline, rng)
+
+    # Periodic report, one JSON line per interval.
+    last = start
+    while time.monotonic() < deadline:
+        time.sleep(min(args.report_interval, max(0.0, deadline - time.monotonic())))
+        now = time.monotonic()
+        report = stats.take_interval(now - last, target.active)
+        report["t"] = round(now - start, 3)
+        print(json.dumps(report), flush=True)
+        last = now
 
-session = NotebookSession()
+    # Let in-flight cells finish (bounded by the per-cell timeout).
+    grace = (args.timeout if args.timeout != "auto" else 60) + 5
+    for thread in list(threads):
+        thread.join(grace)
 
-# Cell 1
-print(session.run_cell("int x = 10;"))
+    summary = stats.summary(time.monotonic() - start, target.active)
+    summary.update({"arrival": args.arrival, "concurrency": args.concurrency, "target": args.target})
+    text = json.dumps(summary, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
 
-# Cell 2
-print(session.run_cell("x += 5;"))
 
-# Cell 3
-print(session.run_cell("std::cout << x << std::endl;"))
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# core/session/adaptive_timeout.py
+
+import math
+from collections import OrderedDict
+from core.utils.metrics import REGISTRY
+
+AUTO = "auto"
+
+_LIMIT_HELP = "Limits chosen for timeout=\"auto\" executions"
+_SOFT_LIMITS = REGISTRY.histogram("adaptive_timeout_seconds", _LIMIT_HELP, kind="soft")
+_HARD_LIMITS = REGISTRY.histogram("adaptive_timeout_seconds", _LIMIT_HELP, kind="hard")
+
+class RuntimeSketch:
+
+    """EWMA of the mean and variance of log(runtime).
+
+    Cell runtimes are roughly log-normal, so bands in log space scale with
+    the cell: a 10 ms cell and a 10 s cell both get a proportional margin.
+    """
+
+    __slots__ = ("mean", "var", "count")
+
+    def __init__(self):
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    def update(self, seconds, alpha):
+        x = math.log(max(seconds, 1e-3))
+        if self.count == 0:
+            self.mean = x
+        else:
+            delta = x - self.mean
+            self.mean += alpha * delta
+            self.var = (1 - alpha) * (self.var + alpha * delta * delta)
+        self.count += 1
+
+    def bound(self, sigmas):
+        return math.exp(self.mean + sigmas * math.sqrt(self.var))
+
+    @property
+    def typical(self):
+        return math.exp(self.mean)
+
+
+class AdaptiveTimeout:
+
+    """Soft and hard timeouts learned from a session's cell runtimes.
+
+    Each cell (by cell_id and code, so an edit starts afresh) and the
+    session as a whole keep a RuntimeSketch. The soft limit warns, the
+    hard limit interrupts. The hard limit is clamped to [min_timeout,
+    max_timeout] and the soft one comes at most halfway to it. Cells seen
+    fewer than min_samples times fall back to the session sketch with an
+    extra margin, and to default before anything has run. A timed-out run
+    is a censored sample: the cell took at least as long as it ran, so
+    that time is learned for the cell (not the session) and its limit
+    grows toward max_timeout instead of killing it at the same point
+    forever.
+    """
+
+    def __init__(self, min_timeout=1.0, max_timeout=60.0, default=3.0,
+                 soft_sigmas=2.0, hard_sigmas=3.0, soft_margin=2.0, hard_margin=5.0,
+                 unseen_margin=2.0, alpha=0.3, min_samples=2, max_cells=1024):
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.default = default
+        self.soft_sigmas = soft_sigmas
+        self.hard_sigmas = hard_sigmas
+        self.soft_margin = soft_margin
+        self.hard_margin = hard_margin
+        self.unseen_margin = unseen_margin
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_cells = max_cells
+
+        self.session = RuntimeSketch()
+        self.cells = OrderedDict()
+        self.soft_warnings = 0
+
+    def limits(self, key):
+        """Return (soft, hard, typical) seconds for the cell identified by key."""
+        sketch = self.cells.get(key)
+        margin = 1.0
+        if sketch is None or sketch.count < self.min_samples:
+            sketch, margin = self.session, self.unseen_margin
+        if sketch.count < self.min_samples:
+            hard = self._clamp(self.default)
+            return hard / 2, hard, None
+
+        hard = self._clamp(sketch.bound(self.hard_sigmas) * self.hard_margin * margin)
+        soft = sketch.bound(self.soft_sigmas) * self.soft_margin * margin
+        soft = min(max(soft, self.min_timeout / 2), hard / 2)
+        _SOFT_LIMITS.record(soft * 1e6)
+        _HARD_LIMITS.record(hard * 1e6)
+        return soft, hard, sketch.typical
+
+    def observe(self, key, seconds, status=None):
+        """Learn from a finished run. For status "timeout", seconds is a lower
+        bound on the runtime and only the cell's sketch learns it."""
+        sketch = self.cells.get(key)
+        if sketch is None:
+            sketch = self.cells[key] = RuntimeSketch()
+            if len(self.cells) > self.max_cells:
+                self.cells.popitem(last=False)
+        else:
+            self.cells.move_to_end(key)
+
+        sketch.update(seconds, self.alpha)
+        if status != "timeout":
+            self.session.update(seconds, self.alpha)
+
+    def stats(self):
+        return {
+            "cells": len(self.cells),
+            "session_samples": self.session.count,
+            "session_typical_seconds": self.session.typical if self.session.count else 0.0,
+            "soft_warnings": self.soft_warnings
+        }
+
+    # ---- internal helpers ----
+
+    def _clamp(self, seconds):
+        return min(self.max_timeout, max(self.min_timeout, seconds))
+
+
+def cell_key(code, cell_id=None):
+    """Identify a cell across runs: its cell_id and code, else its code."""
+    digest = hash(code.strip())
+    return ("cell", cell_id, digest) if cell_id is not None else ("code", digest)
@@ -0,0 +1,242 @@
+# core/session/admission.py
+
+import threading
+import time
+from core.utils.metrics import REGISTRY
+
+_ADMITTED = REGISTRY.counter("admission_admitted_total", "execute_requests let through admission control")
+_REJECT_HELP = "execute_requests rejected by admission control"
+_REJECTED = {
+    reason: REGISTRY.counter("admission_rejected_total", _REJECT_HELP, reason=reason)
+    for reason in ("overload", "session_concurrency", "tenant_concurrency", "session_rate", "tenant_rate")
+}
+
+class AdmissionRejected(Exception):
+
+    """Raised by AdmissionController.admit; retry_after is in seconds."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(f"Request rejected ({reason}); retry after {retry_after:.2f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def error_type(self):
+        return "overloaded" if self.reason == "overload" else "rate_limited"
+
+
+class TokenBucket:
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate, burst, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until a token is available (0 if one is)."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _Account:
+
+    __slots__ = ("bucket", "inflight")
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+        self.inflight = 0
+
+
+class Ticket:
+
+    __slots__ = ("session_id", "tenant_id", "admitted", "released")
+
+    def __init__(self, session_id, tenant_id, now):
+        self.session_id = session_id
+        self.tenant_id = tenant_id
+        self.admitted = now
+        self.released = False
+
+
+class AdmissionController:
+
+    """Node-wide gate in front of the session schedulers.
+
+    Each session, and each tenant when requests carry a tenant_id, has a
+    token bucket (rate per second, burst) and a cap on requests queued or
+    running. The node counts as overloaded while queue delay stays above
+    target_delay for a whole interval (CoDel-style: the minimum delay seen
+    in the interval, so a single slow start does not trip it). When nothing
+    started for an interval, the queue delay is the age of the oldest
+    admitted request still waiting, so a node too busy to start anything
+    stays overloaded. Rejections carry a retry-after hint instead of timing
+    out deep in the stack.
+    """
+
+    def __init__(self, session_rate=5.0, session_burst=50, session_concurrency=64,
+                 tenant_rate=200.0, tenant_burst=400, tenant_concurrency=512,
+                 target_delay=0.5, interval=1.0):
+        self.session_rate = session_rate
+        self.session_burst = session_burst
+        self.session_concurrency = session_concurrency
+        self.tenant_rate = tenant_rate
+        self.tenant_burst = tenant_burst
+        self.tenant_concurrency = tenant_concurrency
+        self.target_delay = target_delay
+        self.interval = interval
+
+        self._sessions = {}
+        self._tenants = {}
+        # Admitted tickets whose request has not started, oldest first.
+        self._waiting = {}
+        self._lock = threading.Lock()
+
+        # Queue-delay window: minimum delay seen since _window_start.
+        self._window_start = time.monotonic()
+        self._window_min = None
+        self._last_observed = 0.0
+        self._standing_delay = 0.0
+
+        self.admitted = 0
+        self.rejected = 0
+
+        # Kept so close() unregisters the same bound method.
+        self._collector = self.stats
+        REGISTRY.register_collector("admission", self._collector)
+
+    def admit(self, session_id, tenant_id=None):
+        """Return a Ticket, or raise AdmissionRejected."""
+        now = time.monotonic()
+        with self._lock:
+            try:
+                return self._admit(session_id, tenant_id, now)
+            except AdmissionRejected as e:
+                self.rejected += 1
+                _REJECTED[e.reason].inc()
+                raise
+
+    def release(self, ticket):
+        """Return a ticket once its request finished or was dropped."""
+        now = time.monotonic()
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self._waiting.pop(ticket, None)
+            self._release(self._sessions, ticket.session_id, now)
+            if ticket.tenant_id is not None:
+                self._release(self._tenants, ticket.tenant_id, now)
+
+    def started(self, ticket):
+        """Report that a ticket's request left its queue and started."""
+        now = time.monotonic()
+        with self._lock:
+            if self._waiting.pop(ticket, None) is not None:
+                self._observe(now - ticket.admitted, now)
+
+    def observe_queue_delay(self, seconds):
+        """Report how long a request waited in a queue before it started."""
+        now = time.monotonic()
+        with self._lock:
+            self._observe(seconds, now)
+
+    def close(self):
+        REGISTRY.unregister_collector(self._collector)
+
+    def overloaded(self):
+        with self._lock:
+            return self._overloaded(time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "sessions": len(self._sessions),
+                "tenants": len(self._tenants),
+                "standing_queue_delay": self._queue_delay(time.monotonic()),
+                "overloaded": int(self._overloaded(time.monotonic()))
+            }
+
+    # ---- internal helpers ----
+
+    def _admit(self, session_id, tenant_id, now):
+        delay = self._queue_delay(now)
+        if delay > self.target_delay:
+            raise AdmissionRejected("overload", delay)
+
+        session = self._account(self._sessions, session_id, self.session_rate, self.session_burst, now)
+        tenant = None
+        if tenant_id is not None:
+            tenant = self._account(self._tenants, tenant_id, self.tenant_rate, self.tenant_burst, now)
+
+        # Concurrency caps: a slot frees when a queued request finishes.
+        retry = max(delay, self.target_delay)
+        if session.inflight >= self.session_concurrency:
+            raise AdmissionRejected("session_concurrency", retry)
+        if tenant is not None and tenant.inflight >= self.tenant_concurrency:
+            raise AdmissionRejected("tenant_concurrency", retry)
+
+        # Check both buckets before taking from either.
+        if session.bucket.wait_time():
+            raise AdmissionRejected("session_rate", session.bucket.wait_time())
+        if tenant is not None and tenant.bucket.wait_time():
+            raise AdmissionRejected("tenant_rate", tenant.bucket.wait_time())
+
+        session.bucket.tokens -= 1
+        session.inflight += 1
+        if tenant is not None:
+            tenant.bucket.tokens -= 1
+            tenant.inflight += 1
+
+        self.admitted += 1
+        _ADMITTED.inc()
+        ticket = Ticket(session_id, tenant_id, now)
+        self._waiting[ticket] = True
+        return ticket
+
+    def _observe(self, seconds, now):
+        self._last_observed = now
+        if self._window_min is None or seconds < self._window_min:
+            self._window_min = seconds
+        if now - self._window_start >= self.interval:
+            self._standing_delay = self._window_min
+            self._window_start = now
+            self._window_min = None
+
+    def _queue_delay(self, now):
+        if now - self._last_observed <= self.interval:
+            return self._standing_delay
+        # Nothing started for a whole interval: either the queues are empty
+        # or everything in them is stuck behind running requests.
+        for ticket in self._waiting:
+            return now - ticket.admitted
+        return 0.0
+
+    def _overloaded(self, now):
+        return self._queue_delay(now) > self.target_delay
+
+    def _account(self, accounts, key, rate, burst, now):
+        account = accounts.get(key)
+        if account is None:
+            account = accounts[key] = _Account(TokenBucket(rate, burst, now))
+        else:
+            account.bucket.refill(now)
+        return account
+
+    def _release(self, accounts, key, now):
+        account = accounts.get(key)
+        if account is None:
+            return
+        account.inflight -= 1
+
+        # Forget idle accounts whose bucket has refilled: nothing to remember.
+        account.bucket.refill(now)
+        if account.inflight <= 0 and account.bucket.tokens >= account.bucket.burst:
+            del accounts[key]
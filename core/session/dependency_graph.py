@@ -0,0 +1,299 @@
+# core/session/dependency_graph.py
+
+import re
+
+# Comments, string and char literals are blanked before scanning.
+_STRIPPED = re.compile(
+    r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'',
+    re.DOTALL
+)
+_INCLUDE = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"]', re.MULTILINE)
+_DEFINE = re.compile(r'^\s*#\s*define\s+([A-Za-z_]\w*)', re.MULTILINE)
+_DIRECTIVE = re.compile(r'^\s*#[^\n]*', re.MULTILINE)
+_IDENT = re.compile(r'[A-Za-z_]\w*')
+_MEMBER = re.compile(r'(?:\.|->)\s*[A-Za-z_]\w*')
+_QUALIFIED = re.compile(r'\b(?:std|[A-Za-z_]\w*)\s*::\s*[A-Za-z_]\w*(?:\s*::\s*[A-Za-z_]\w*)*')
+_TYPE_DECL = re.compile(r'\b(?:struct|class|union|enum(?:\s+class)?|namespace)\s+([A-Za-z_]\w*)')
+_USING_ALIAS = re.compile(r'^\s*using\s+([A-Za-z_]\w*)\s*=')
+_ASSIGN = re.compile(r'^\s*([A-Za-z_]\w*)\s*(?:\[[^\]]*\]\s*)*(?:[-+*/%&|^]|<<|>>)?=(?!=)')
+_INCDEC = re.compile(r'^\s*(?:(?:\+\+|--)\s*([A-Za-z_]\w*)|([A-Za-z_]\w*)\s*(?:\+\+|--))')
+_MEMBER_CALL = re.compile(r'^\s*([A-Za-z_]\w*)\s*(?:\.|->|\[)')
+_OUTPUT = re.compile(r'^\s*(?:std\s*::\s*)?(?:cout|cerr|clog|printf|puts|putchar)\b')
+_CALL = re.compile(r'^\s*(?:[A-Za-z_]\w*\s*::\s*)*([A-Za-z_]\w*)\s*\(')
+_CONTROL = re.compile(r'^\s*(?:for|while|do|if|switch|try)\b')
+# Parenthesized declarator: int (*fp)(int), int (&ref)[3], void (*table[4])().
+_NESTED = re.compile(r'\(\s*[*&]+\s*([A-Za-z_]\w*)\s*(?:\[[^\]]*\]\s*)*\)')
+_SUBSCRIPTS = re.compile(r'\[[^\]]*\]')
+_PLAIN = re.compile(r'[\w\s*&]*')
+_TYPES = frozenset("""
+    auto bool char char16_t char32_t const constexpr double extern float
+    inline int long register short signed size_t static unsigned void
+    volatile wchar_t
+""".split())
+
+KEYWORDS = frozenset("""
+    alignas alignof asm auto bool break case catch char char16_t char32_t
+    class const constexpr const_cast continue decltype default delete do
+    double dynamic_cast else enum explicit export extern false float for
+    friend goto if inline int long mutable namespace new noexcept nullptr
+    operator private protected public register reinterpret_cast return
+    short signed sizeof static static_assert static_cast struct switch
+    template this throw true try typedef typeid typename union unsigned
+    using virtual void volatile wchar_t while size_t std endl
+    cout cerr clog cin printf puts putchar
+""".split())
+
+
+class CellInfo:
+
+    """Top-level identifiers a cell declares, assigns and reads.
+
+    reads_all marks a cell with a declaration the scanner could not parse;
+    it is treated as depending on everything before it.
+    """
+
+    def __init__(self, defs, mutates, uses, includes, reads_all=False):
+        self.defs = defs
+        self.mutates = mutates
+        self.uses = uses
+        self.includes = includes
+        self.reads_all = reads_all
+
+    @property
+    def writes(self):
+        return self.defs | self.mutates
+
+    @property
+    def reads(self):
+        return self.uses | self.mutates
+
+    @property
+    def pure(self):
+        """True if the cell only computes or prints and leaves no state behind."""
+        return not (self.defs or self.mutates or self.includes or self.reads_all)
+
+    def __repr__(self):
+        return (f"CellInfo(defs={sorted(self.defs)}, mutates={sorted(self.mutates)}, "
+                f"uses={sorted(self.uses)}, includes={self.includes}, reads_all={self.reads_all})")
+
+
+def analyze_cell(code):
+    """Extract top-level declarations and identifier usage from C/C++ code."""
+    includes = _INCLUDE.findall(code)
+    defs = set(_DEFINE.findall(code))
+    mutates = set()
+    uses = set()
+    reads_all = False
+
+    text = _STRIPPED.sub(" ", code)
+    text = _DIRECTIVE.sub(" ", text)
+
+    for statement, body in _top_level_statements(text):
+        head_defs, head_mutates, opaque, parsed = _classify(statement)
+        names = _identifiers(statement + " " + body)
+        defs |= head_defs
+        mutates |= head_mutates
+        uses |= names
+        reads_all |= not parsed
+        if opaque:
+            # Calls and loops may change anything they touch.
+            mutates |= names
+
+    uses -= defs
+    return CellInfo(defs, mutates - defs, uses, includes, reads_all)
+
+
+def _top_level_statements(text):
+    """Yield (head, body) pairs: text at brace depth 0 and the braces' contents."""
+    depth = parens = 0
+    head, body = [], []
+
+    for ch in text:
+        if ch == "(":
+            parens += 1
+        elif ch == ")":
+            parens -= 1
+
+        if ch == "{":
+            depth += 1
+            if depth == 1:
+                continue
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                # A definition with a body ends here unless a declarator follows
+                # (struct S {...} s;), which the next ';' will close.
+                statement = "".join(head)
+                if not re.search(r'\b(?:struct|class|union|enum)\b[^;]*$', statement) \
+                        or re.search(r'\)\s*(?:const\s*)?$', statement):
+                    yield statement, "".join(body)
+                    head, body = [], []
+                continue
+
+        if depth > 0:
+            body.append(ch)
+        elif ch == ";" and parens <= 0:
+            yield "".join(head), "".join(body)
+            head, body = [], []
+        else:
+            head.append(ch)
+
+    if "".join(head).strip():
+        yield "".join(head), "".join(body)
+
+
+def _classify(statement):
+    """Return (declared names, mutated names, opaque, parsed) for one
+    top-level statement. Opaque statements (calls, control flow) have
+    unknown effects; parsed is False for a declaration with no name found."""
+    defs, mutates = set(), set()
+
+    if _OUTPUT.match(statement) or statement.strip().startswith("return"):
+        return defs, mutates, False, True
+    if _CONTROL.match(statement):
+        return defs, mutates, True, True
+
+    call = _CALL.match(statement)
+    if call and call.group(1) not in KEYWORDS:
+        return defs, mutates, True, True
+
+    for match in _TYPE_DECL.finditer(statement):
+        defs.add(match.group(1))
+
+    alias = _USING_ALIAS.match(statement)
+    if alias:
+        defs.add(alias.group(1))
+        return defs, mutates, False, True
+
+    if re.match(r'\s*typedef\b', statement):
+        names = _IDENT.findall(statement)
+        if names:
+            defs.add(names[-1])
+        return defs, mutates, False, True
+
+    assign = _ASSIGN.match(statement)
+    if assign:
+        mutates.add(assign.group(1))
+        return defs, mutates, False, True
+
+    incdec = _INCDEC.match(statement)
+    if incdec:
+        mutates.add(incdec.group(1) or incdec.group(2))
+        return defs, mutates, False, True
+
+    member = _MEMBER_CALL.match(statement)
+    if member and member.group(1) not in KEYWORDS:
+        mutates.add(member.group(1))
+        return defs, mutates, False, True
+
+    # Declarations: "<type tokens> name [= init | (args) | [n] | {..}], other ..."
+    declaration = _QUALIFIED.sub("T", statement)
+    declaration = re.sub(r'<[^<>;]*>', " ", declaration)
+    parsed = True
+    for part in _split_declarators(declaration):
+        head = part.split("=")[0]
+        nested = _NESTED.search(head)
+        if nested:
+            defs.add(nested.group(1))
+            continue
+        head = _declarator_head(head)
+        tokens = _IDENT.findall(head)
+        if len(tokens) >= 2 and _PLAIN.fullmatch(head):
+            defs.add(tokens[-1])
+        elif tokens and tokens[0] in _TYPES:
+            parsed = False
+        # Otherwise an expression: a single token ("x;") or operators.
+
+    defs -= KEYWORDS
+    return defs, mutates, False, parsed
+
+
+def _split_declarators(statement):
+    """Split "int a = 1, b(2), c" into declarators, keeping the type on the first."""
+    parts, depth, current = [], 0, []
+    for ch in statement:
+        if ch in "([":
+            depth += 1
+        elif ch in ")]":
+            depth -= 1
+        if ch == "," and depth == 0:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(ch)
+    parts.append("".join(current))
+
+    if len(parts) == 1:
+        return parts
+
+    # Later declarators carry only the name: prepend the first one's type.
+    type_tokens = _IDENT.findall(_declarator_head(parts[0].split("=")[0]))[:-1]
+    prefix = " ".join(type_tokens)
+    return [parts[0]] + [f"{prefix} {part}" for part in parts[1:]]
+
+
+def _declarator_head(text):
+    # "int arr[N](...)" -> "int arr": the type and name, no sizes or arguments.
+    return _SUBSCRIPTS.sub(" ", text.split("(")[0])
+
+
+def _identifiers(text):
+    text = _MEMBER.sub(" ", text)
+    return {name for name in _IDENT.findall(text) if name not in KEYWORDS}
+
+
+class DependencyGraph:
+
+    """Def-use graph over a session's cells, in notebook order.
+
+    A cell depends on the latest earlier cell that wrote (declared or
+    assigned) any identifier it reads, or on every earlier writer if it
+    has reads_all. Includes do not create edges.
+    """
+
+    def __init__(self):
+        self.cells = {}
+
+    def update(self, cell_id, code):
+        """Record a cell's current code; returns the previous CellInfo, if any."""
+        previous = self.cells.get(cell_id)
+        self.cells[cell_id] = (code, analyze_cell(code))
+        return previous[1] if previous else None
+
+    def remove(self, cell_id):
+        self.cells.pop(cell_id, None)
+
+    def dependencies(self):
+        """Return {cell_id: set of cell_ids it directly depends on}."""
+        last_writer = {}
+        deps = {}
+
+        for cell_id, (_, info) in self.cells.items():
+            if info.reads_all:
+                deps[cell_id] = set(last_writer.values())
+            else:
+                deps[cell_id] = {last_writer[n] for n in info.reads if n in last_writer}
+            deps[cell_id].discard(cell_id)
+            for name in info.writes:
+                last_writer[name] = cell_id
+
+        return deps
+
+    def affected(self, cell_id, previous=None):
+        """Cells to re-run after editing cell_id: it and its transitive
+        dependents, in notebook order. previous is the cell's old CellInfo,
+        so cells that read names it no longer writes are included too."""
+        order = list(self.cells)
+        if cell_id not in self.cells:
+            return []
+
+        deps = self.dependencies()
+        dirty = {cell_id}
+        dropped = previous.writes - self.cells[cell_id][1].writes if previous else set()
+
+        for other in order[order.index(cell_id) + 1:]:
+            info = self.cells[other][1]
+            if deps[other] & dirty or info.reads & dropped or (info.reads_all and dropped):
+                dirty.add(other)
+
+        return [c for c in order if c in dirty]
@@ -0,0 +1,293 @@
+# core/session/frontend.py
+#
+# Pre-fork TCP front end: N processes share the client port through
+# SO_REUSEPORT (the kernel spreads connections across them) and relay each
+# message to the SessionWorker that owns its session.
+#
+#     python -m core.session.frontend --port 8765 --processes 4 --routing /tmp/routes.json
+#
+# Ownership lives in the node's RoutingTable, not in any front end, so a
+# session sticks to one worker whichever front end a connection lands on.
+# A session seen for the first time goes to a worker chosen by rendezvous
+# hashing and is claimed in the table; if another front end claimed it
+# first, its choice wins. A "session_moved" reply (after a migration) is
+# not shown to the client: the request is resent to the new owner. An
+# owner that cannot be reached loses its claim and the session is placed
+# on another worker; requests in flight on a worker whose connection
+# closes get a "worker_unavailable" error. Only client protocol messages
+# are relayed; worker-to-worker ones (import, drop, migrate) never pass.
+
+import argparse
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import signal
+import socket
+import sys
+
+from core.protocol.fast_messages import MessageValidationError, validate_session_id
+from core.protocol.message_types import MessageType
+from core.session.routing import RoutingTable
+
+# What a client may send; everything else stays between workers.
+CLIENT_TYPES = frozenset(t.value for t in (
+    MessageType.EXECUTE_REQUEST, MessageType.INTERRUPT, MessageType.RESTART,
+    MessageType.RESUME, MessageType.REQUEST_STATUS
+))
+
+class FrontEnd:
+
+    """Relays one process's client connections to the owning workers."""
+
+    def __init__(self, routing, max_redirects=3):
+        self.routing = routing
+        self.max_redirects = max_redirects
+
+    async def handle(self, reader, writer):
+        connection = _Connection(self, writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                await connection.on_client(line)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            connection.close()
+
+    async def owner(self, session_id, exclude=None):
+        """The worker serving session_id, claiming one for a new session
+        among the workers other than exclude."""
+        owner = self.routing.lookup(session_id)
+        if owner is not None:
+            return owner
+        workers = [worker for worker in self.routing.workers() if worker != exclude]
+        if not workers:
+            return None
+        # Table writes take a file lock; keep them off the event loop.
+        claim = functools.partial(self.routing.claim, session_id, _rendezvous(session_id, workers))
+        return await asyncio.get_running_loop().run_in_executor(None, claim)
+
+    async def replace(self, session_id, dead):
+        """Drop the claim of a worker that cannot be reached and place the
+        session again; another front end may have done so already."""
+        remove = functools.partial(self.routing.remove, session_id, expect=dead)
+        await asyncio.get_running_loop().run_in_executor(None, remove)
+        return await self.owner(session_id, exclude=dead)
+
+
+class _Connection:
+
+    """One client connection and its upstream connections, one per worker."""
+
+    def __init__(self, frontend, writer):
+        self.frontend = frontend
+        self.writer = writer
+        self.upstreams = {}
+        # request_id -> [message, redirects, worker address], until the final reply.
+        self.pending = {}
+
+    async def on_client(self, line):
+        try:
+            message = json.loads(line)
+            session_id = validate_session_id(message["session_id"])
+        except MessageValidationError as e:
+            self.reply(_error(message.get("request_id"), "invalid_message", str(e)))
+            return
+        except (ValueError, KeyError, TypeError):
+            self.reply(_error(None, "invalid_message", "Expected a JSON object with a session_id"))
+            return
+        if message.get("type") not in CLIENT_TYPES:
+            self.reply(_error(message.get("request_id"), "invalid_message",
+                              f"Unknown message type {message.get('type')!r}"))
+            return
+
+        if message.get("type") == MessageType.EXECUTE_REQUEST.value:
+            self.pending[message.get("request_id")] = [message, 0, None]
+        await self.forward(await self.frontend.owner(session_id), message)
+
+    async def forward(self, address, message, replaced=False):
+        request_id = message.get("request_id")
+        if address is None:
+            self.pending.pop(request_id, None)
+            self.reply(dict(_error(request_id, "no_workers", "No worker is serving"), retry_after=1.0))
+            return
+        entry = self.pending.get(request_id)
+        if entry is not None:
+            entry[2] = address
+
+        try:
+            upstream = await self._upstream(address)
+        except OSError:
+            if replaced:
+                self._unavailable(request_id, address)
+                return
+            # The owner is gone; a live worker takes the session over.
+            owner = await self.frontend.replace(message["session_id"], address)
+            await self.forward(owner, message, replaced=True)
+            return
+
+        try:
+            upstream.write((json.dumps(message) + "\n").encode("utf-8"))
+            await upstream.drain()
+        except OSError:
+            self.upstreams.pop(address, None)
+            self._unavailable(request_id, address)
+
+    def reply(self, message):
+        self.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+    def close(self):
+        for task, upstream in self.upstreams.values():
+            task.cancel()
+            upstream.close()
+        self.writer.close()
+
+    # ---- internal helpers ----
+
+    async def _upstream(self, address):
+        entry = self.upstreams.get(address)
+        if entry is not None:
+            return entry[1]
+        reader, upstream = await asyncio.open_unix_connection(address)
+        task = asyncio.ensure_future(self._relay(address, reader))
+        self.upstreams[address] = (task, upstream)
+        return upstream
+
+    async def _relay(self, address, reader):
+        # Worker -> client. Lines pass through unchanged except redirects.
+        lost = True
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if b'"execute_response"' in line or b'"error"' in line:
+                    if await self._final(json.loads(line)):
+                        continue
+                self.writer.write(line)
+                await self.writer.drain()
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # The client connection is closing.
+            lost = False
+        finally:
+            self.upstreams.pop(address, None)
+            if lost:
+                # No reply will come for what was sent to this worker.
+                for request_id, entry in list(self.pending.items()):
+                    if entry[2] == address:
+                        self._unavailable(request_id, address)
+
+    def _unavailable(self, request_id, address):
+        self.pending.pop(request_id, None)
+        self.reply(dict(_error(request_id, "worker_unavailable", f"Worker {address} is not reachable"),
+                        retry_after=1.0))
+
+    async def _final(self, message):
+        # True when the reply was a redirect handled here.
+        request_id = message.get("request_id")
+        entry = self.pending.pop(request_id, None)
+        if message.get("error_type") != "session_moved" or entry is None:
+            return False
+        if entry[1] >= self.frontend.max_redirects or not message.get("worker"):
+            return False
+
+        entry[1] += 1
+        self.pending[request_id] = entry
+        await self.forward(message["worker"], entry[0])
+        return True
+
+
+def _rendezvous(session_id, workers):
+    # Highest-random-weight hashing: every front end picks the same worker,
+    # and adding a worker only moves the sessions it wins.
+    def weight(worker):
+        return hashlib.blake2b(f"{worker}|{session_id}".encode("utf-8"), digest_size=8).digest()
+    return max(workers, key=weight)
+
+
+def _error(request_id, error_type, message):
+    return {"type": MessageType.ERROR.value, "request_id": request_id,
+            "error_type": error_type, "message": message}
+
+
+def _listen(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind((host, port))
+    sock.listen(1024)
+    sock.setblocking(False)
+    return sock
+
+
+def _serve_process(host, port, routing_path):
+    frontend = FrontEnd(RoutingTable(routing_path))
+
+    async def run():
+        server = await asyncio.start_server(frontend.handle, sock=_listen(host, port))
+        async with server:
+            await server.serve_forever()
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: os._exit(0))
+    asyncio.run(run())
+
+
+def serve(host, port, processes, routing_path):
+    """Fork processes front ends on (host, port) and restart any that exit."""
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                _serve_process(host, port, routing_path)
+            finally:
+                os._exit(1)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(processes):
+        spawn()
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            spawn()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork NDJSON front end")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--routing", required=True, help="routing table file shared with the workers")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "SO_REUSEPORT"):
+        sys.exit("SO_REUSEPORT is not available on this platform")
+    serve(args.host, args.port, args.processes, args.routing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# core/session/history.py
+
+import re
+from core.session.dependency_graph import analyze_cell
+from core.utils.metrics import REGISTRY
+
+_INCLUDE_LINE = re.compile(r'^[ \t]*#[ \t]*include[ \t]*[<"]([^>"]+)[>"][^\n]*\n?', re.MULTILINE)
+
+_REPLAYS = REGISTRY.counter("history_replays_total", "Compacted replay scripts handed out")
+_REPLAY_SAVED = REGISTRY.counter(
+    "history_replay_saved_seconds_total",
+    "Recorded cell time skipped by replaying the compacted script instead of every cell"
+)
+
+class CellRecord:
+
+    __slots__ = ("code", "info", "seconds", "status")
+
+    def __init__(self, code, info, seconds, status):
+        self.code = code
+        self.info = info
+        self.seconds = seconds
+        self.status = status
+
+
+class History:
+
+    """Cells a session has executed, and the minimal script rebuilding
+    their state.
+
+    Compaction keeps only successful cells, drops pure cells (prints,
+    expressions) and cells whose every write is redefined later before
+    anything reads it, hoists includes to the top without duplicates and
+    merges consecutive one-line cells into a single replay step.
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def record(self, code: str, seconds=0.0, status="ok", info=None):
+        self.records.append(CellRecord(code, info or analyze_cell(code), seconds, status))
+
+    def clear(self):
+        self.records = []
+
+    def compact(self):
+        """Return the replay script as [(code, recorded seconds), ...]."""
+        ok = [r for r in self.records if r.status == "ok"]
+
+        # Backwards liveness: a name is dead before a later cell redefines it.
+        dead, kept = set(), []
+        for record in reversed(ok):
+            info = record.info
+            if info.pure or (info.writes and info.writes <= dead):
+                continue
+            kept.append(record)
+            dead |= info.defs
+            dead = set() if info.reads_all else dead - info.reads
+        kept.reverse()
+
+        # Includes of every successful cell, even dropped ones, go first.
+        includes, steps = {}, []
+        for record in ok:
+            for match in _INCLUDE_LINE.finditer(record.code):
+                includes.setdefault(match.group(1), match.group(0).strip())
+        for record in kept:
+            code = _INCLUDE_LINE.sub("", record.code).strip()
+            if code:
+                steps.append((code, record.seconds))
+
+        script = [(line, 0.0) for line in includes.values()]
+        for code, seconds in steps:
+            if script and _mergeable(script[-1][0]) and _mergeable(code):
+                previous, previous_seconds = script[-1]
+                script[-1] = (f"{previous} {code}", previous_seconds + seconds)
+            else:
+                script.append((code, seconds))
+        return script
+
+    def replay_cells(self):
+        """The compacted script as a list of cells to execute; counted as a replay."""
+        script = self.compact()
+        _REPLAYS.inc()
+        _REPLAY_SAVED.inc(max(0.0, self._total_seconds() - sum(s for _, s in script)))
+        return [code for code, _ in script]
+
+    def stats(self):
+        script = self.compact()
+        history_seconds = self._total_seconds()
+        replay_seconds = sum(s for _, s in script)
+        return {
+            "cells": len(self.records),
+            "replay_cells": len(script),
+            "history_seconds": history_seconds,
+            "replay_seconds": replay_seconds,
+            "saved_seconds": max(0.0, history_seconds - replay_seconds)
+        }
+
+    # ---- internal helpers ----
+
+    def _total_seconds(self):
+        # What replaying every successful cell would cost.
+        return sum(r.seconds for r in self.records if r.status == "ok")
+
+
+def _mergeable(code):
+    # One line, no comment or directive, ending a statement: safe to join
+    # with a space and send as a single kernel input.
+    return ("\n" not in code and "//" not in code and not code.startswith("#")
+            and code.endswith((";", "}")))
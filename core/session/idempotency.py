@@ -0,0 +1,124 @@
+# core/session/idempotency.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class _Entry:
+
+    """One execution known to the cache, in flight or completed."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.expires = None
+
+
+class IdempotencyCache:
+
+    """Bounded, TTL-evicted map of request_id -> execute_response.
+
+    `claim` tells the caller whether it owns a request (and must run it)
+    or is a retry that should wait for the in-flight run or reuse the
+    cached response. Completed entries expire `ttl` seconds after they
+    finish, or oldest first over `max_entries`. In-flight entries are never
+    evicted, since a retry would then start a second execution; they end
+    with complete() or abandon(). There is one per running cell, so they
+    can only push the cache past max_entries by that many.
+    """
+
+    def __init__(self, max_entries=1024, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits_inflight = 0
+        self.hits_completed = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def claim(self, request_id):
+        """Return (entry, owner). owner is True if the caller must execute."""
+        now = time.monotonic()
+        with self._lock:
+            self._purge(now)
+
+            entry = self._entries.get(request_id)
+            if entry is not None:
+                if entry.done.is_set():
+                    self.hits_completed += 1
+                else:
+                    self.hits_inflight += 1
+                return entry, False
+
+            self.misses += 1
+            entry = self._entries[request_id] = _Entry()
+            return entry, True
+
+    def complete(self, request_id, response):
+        with self._lock:
+            entry = self._entries.get(request_id)
+            if entry is None:
+                return
+            entry.response = response
+            entry.expires = time.monotonic() + self.ttl
+            self._entries.move_to_end(request_id)
+        entry.done.set()
+
+    def record(self, request_id, response):
+        """Cache a response for a request that was answered without being
+        claimed (e.g. superseded in the queue). Not counted as a miss."""
+        with self._lock:
+            if request_id in self._entries:
+                return
+            self._entries[request_id] = _Entry()
+        self.complete(request_id, response)
+
+    def known(self, request_id):
+        """True if request_id is in flight or cached; not counted as a hit."""
+        with self._lock:
+            return request_id in self._entries
+
+    def abandon(self, request_id):
+        """Forget a request that failed to run so a retry executes it again."""
+        with self._lock:
+            entry = self._entries.pop(request_id, None)
+        if entry is not None:
+            entry.done.set()
+
+    def wait(self, entry, timeout=None):
+        """Block until an in-flight entry finishes; None if it was abandoned."""
+        entry.done.wait(timeout)
+        return entry.response
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "hits_inflight": self.hits_inflight,
+                "hits_completed": self.hits_completed,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    # ---- internal helpers ----
+
+    def _purge(self, now):
+        # Completed entries are moved to the end as they finish, so their
+        # expiry times are ordered and the scan stops at the first live
+        # one. In-flight entries are skipped.
+        over = len(self._entries) - self.max_entries + 1
+        victims = []
+        for request_id, entry in self._entries.items():
+            if entry.expires is None:
+                continue
+            if entry.expires > now and over <= 0:
+                break
+            victims.append(request_id)
+            over -= 1
+
+        for request_id in victims:
+            del self._entries[request_id]
+        self.evictions += len(victims)
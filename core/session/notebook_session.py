@@ -1,22 +1,254 @@
 # core/session/notebook_session.py
 
+import threading
+import time
+import uuid
 from core.kernel.cpp_kernel import CppKernel
+from core.kernel.kernal_manager import KernelManager
+from core.protocol.fast_messages import ExecuteResponseMessage
+from core.session.adaptive_timeout import AUTO, AdaptiveTimeout, cell_key
+from core.session.dependency_graph import DependencyGraph, analyze_cell
+from core.session.history import History
+from core.session.idempotency import IdempotencyCache
+from core.session.output_coalescer import OutputCoalescer, StreamStats
+from core.session.replay_buffer import ReplayStore
+from core.utils import tracing
+from core.utils.metrics import REGISTRY
+
+_CELL_TIME = REGISTRY.histogram("session_cell_seconds", "NotebookSession.run_cell wall time")
+_SOFT_TIMEOUTS = REGISTRY.counter("cell_soft_timeouts_total", "Cells that ran past their soft timeout")
+
+# stream_cell's trace when the caller has not made the sampling decision.
+_UNSAMPLED = object()
 
 class NotebookSession:
 
-    def __init__(self):
-        self.kernel = CppKernel()
-        self.kernel.start()
+    def __init__(self, stream_options=None, session_id=None, kernel_factory=CppKernel,
+                 standby=False, recycle_after=None, recycle_rss=None, monitor=None,
+                 timeout_options=None, kernel=None):
+        self.session_id = session_id or uuid.uuid4().hex
+
+        # Executed cells; compacts into the script that rebuilds their state.
+        self.history = History()
+
+        # The manager owns the kernel and handles timeouts and restarts.
+        # With standby or a recycle policy, state-changing cells are mirrored
+        # so another kernel can replay them.
+        self.manager = KernelManager(
+            kernel_factory, standby=standby,
+            recycle_after=recycle_after, recycle_rss=recycle_rss,
+            replay_cells=self.history.replay_cells,
+            on_state_lost=self._state_lost,
+            kernel_name=self.session_id,
+            kernel=kernel
+        )
+
+        # Optional ResourceMonitor sampling this kernel and evicting it when idle.
+        self.monitor = monitor
+        if monitor is not None:
+            monitor.register(self.manager, self.session_id)
+
+        self._standby_stats = None
+        if self.manager.standby is not None:
+            self._standby_stats = self.manager.standby.stats
+            REGISTRY.register_collector("kernel_standby", self._standby_stats, session=self.session_id)
         self.execution_count = 0
 
-    def run_cell(self, code: str):
+        # Runtime sketches behind timeout="auto"; the options set its bounds
+        # (min_timeout, max_timeout, default, ...).
+        self.timeouts = AdaptiveTimeout(**(timeout_options or {}))
+
+        # Coalescer settings (window, max_bytes, watermarks, overflow) and
+        # counters aggregated over every streamed cell.
+        self.stream_options = stream_options or {}
+        self.stream_stats = StreamStats()
+
+        # Recent stream output per request, for clients that reconnect.
+        self.replay = ReplayStore()
+
+        # Retries of a request_id reuse the first execution's response.
+        self.idempotency = IdempotencyCache()
+
+        # Def-use graph over cells run with a cell_id, for run_affected.
+        self.dependencies = DependencyGraph()
+
+    @property
+    def kernel(self):
+        return self.manager.kernel
+
+    def run_cell(self, code: str, on_output=None, timeout=None, cell_id=None):
+        """Run one cell. timeout is in seconds, None for no limit, or "auto"
+        for a hard limit learned from earlier runs plus a soft-limit warning
+        sent to on_output as a "warning" stream chunk."""
+        start = time.perf_counter_ns()
+        if cell_id is not None:
+            self.dependencies.update(cell_id, code)
         self.execution_count += 1
-        result = self.kernel.execute(code)
+
+        key = cell_key(code, cell_id)
+        warning = None
+        if timeout == AUTO:
+            soft, timeout, typical = self.timeouts.limits(key)
+            warning = threading.Timer(soft, self._warn_slow, (on_output, soft, timeout, typical))
+            warning.daemon = True
+            warning.start()
+
+        try:
+            result = self.manager.execute(code, timeout, on_output)
+        finally:
+            if warning is not None:
+                warning.cancel()
         result["execution_count"] = self.execution_count
+
+        elapsed = time.perf_counter_ns() - start
+        self.timeouts.observe(key, elapsed / 1e9, result["status"])
+        info = self.dependencies.cells[cell_id][1] if cell_id is not None else analyze_cell(code)
+        self.history.record(code, elapsed / 1e9, result["status"], info)
+        if self.manager.history is not None and result["status"] == "ok" and not info.pure:
+            self.manager.mirror(code)
+
+        _CELL_TIME.record_ns(elapsed)
+        return result
+
+    def stream_cell(self, code: str, request_id: str, send, backlog=None, on_result=None,
+                    trace=_UNSAMPLED, timeout=None, cell_id=None):
+        """Run a cell, sending coalesced stream_output messages and the
+        final execute_response through send. Returns the result dict, as
+        run_cell does.
+
+        A retry of a request_id that is running or recently finished is
+        attached to that execution instead of running the cell again.
+        on_result(result) may adjust the kernel result before it is sent.
+        A caller that already sampled passes its trace, None if sampled out.
+        """
+        dispatched = time.perf_counter_ns()
+        if trace is _UNSAMPLED:
+            tracer = tracing.TRACER
+            trace = tracer.start(self.session_id, request_id) if tracer is not None else None
+
+        entry, owner = self.idempotency.claim(request_id)
+        if not owner:
+            return self._attach_retry(entry, code, request_id, send, backlog, timeout, cell_id)
+
+        self.replay.open(request_id, send)
+        coalescer = OutputCoalescer(
+            lambda message: self.replay.publish(request_id, message),
+            request_id,
+            backlog=backlog,
+            stats=self.stream_stats,
+            **self.stream_options
+        )
+
+        try:
+            result = self.run_cell(code, coalescer.feed, timeout, cell_id)
+        except Exception:
+            self.idempotency.abandon(request_id)
+            raise
+        finally:
+            coalescer.close()
+
+        if on_result:
+            on_result(result)
+        response = ExecuteResponseMessage.from_result(
+            request_id, result["execution_count"], result
+        ).to_dict()
+        self.idempotency.complete(request_id, response)
+        if not self.replay.finish(request_id, response):
+            send(response)
+
+        if trace is not None:
+            self._finish_trace(trace, dispatched)
         return result
 
-    def reset(self):
-        self.kernel.shutdown()
-        self.kernel = CppKernel()
-        self.kernel.start()
+    def run_affected(self, cell_id: str, code: str, on_output=None, timeout=None):
+        """Run an edited cell, then every later cell that depends on it,
+        in notebook order. Returns [(cell_id, result), ...].
+
+        Stops after the first cell that does not finish with "ok", since
+        its dependents would run against missing state.
+        """
+        previous = self.dependencies.update(cell_id, code)
+        results = []
+
+        for affected in self.dependencies.affected(cell_id, previous):
+            cell_code = self.dependencies.cells[affected][0]
+            result = self.run_cell(cell_code, on_output, timeout)
+            results.append((affected, result))
+            if result["status"] != "ok":
+                break
+
+        return results
+
+    def resume_stream(self, request_id: str, last_seq: int, send):
+        """Resend output after last_seq to a reconnected client."""
+        return self.replay.resume(request_id, last_seq, send)
+
+    def reset(self, preserve_state=False):
+        """Restart the kernel. With preserve_state and a caught-up standby,
+        the standby is swapped in and definitions survive."""
+        if self.manager.restart_kernel(preserve_state):
+            return
         self.execution_count = 0
+        self.dependencies = DependencyGraph()
+        self.history.clear()
+
+    def close(self, detach=False):
+        """Release the session. detach leaves a hosted kernel running (see
+        KernelManager.shutdown), e.g. when the gateway itself shuts down."""
+        if self.monitor is not None:
+            self.monitor.unregister(self.manager)
+        if self._standby_stats is not None:
+            REGISTRY.unregister_collector(self._standby_stats)
+        self.manager.shutdown(detach)
+
+    # ---- internal helpers ----
+
+    def _warn_slow(self, on_output, soft, hard, typical):
+        _SOFT_TIMEOUTS.inc()
+        self.timeouts.soft_warnings += 1
+        if on_output is None:
+            return
+        usual = f", usually {typical:.2f}s" if typical is not None else ""
+        on_output("warning", f"Cell has run for {soft:.2f}s{usual}; "
+                             f"it will be interrupted at {hard:.2f}s\n")
+
+    def _state_lost(self):
+        # The manager could not restore the kernel and reset it.
+        self.dependencies = DependencyGraph()
+        self.history.clear()
+
+    def _finish_trace(self, trace, dispatched):
+        timings = getattr(self.kernel, "last_timings", None)
+        encoded = time.perf_counter_ns()
+
+        # Stale timings mean the kernel never finished this cell (timeout).
+        if timings is not None and timings[0] >= dispatched:
+            t_start, t_written, t_first, t_done = timings
+            trace.span("dispatch", dispatched, t_start)
+            trace.span("kernel_write", t_start, t_written)
+            trace.span("first_byte", t_written, t_first)
+            trace.span("completion_marker", t_first, t_done)
+            trace.span("response_encode", t_done, encoded)
+        trace.span("execute_request", dispatched, encoded)
+
+        tracer = tracing.TRACER
+        if tracer is not None:
+            tracer.finish(trace)
+
+    def _attach_retry(self, entry, code, request_id, send, backlog, timeout, cell_id):
+        # Replay whatever the original run has streamed and follow it live.
+        attached = self.replay.resume(request_id, 0, send)
+        response = self.idempotency.wait(entry)
+
+        if response is None:
+            # The original run raised before producing a response; run it now.
+            return self.stream_cell(code, request_id, send, backlog, timeout=timeout,
+                                    cell_id=cell_id)
+        if not attached:
+            send(response)
+        return _result(response)
+
+
+def _result(response):
+    # The result dict behind a cached execute_response.
+    return {key: response[key] for key in ("stdout", "stderr", "status", "execution_count")}
@@ -0,0 +1,202 @@
+# core/session/output_coalescer.py
+
+import threading
+import time
+from core.protocol.message_types import MessageType
+
+
+class StreamStats:
+
+    """Counters for coalesced stream output, shared across requests."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.chunks_in = 0
+        self.bytes_in = 0
+        self.messages_out = 0
+        self.bytes_out = 0
+        self.pauses = 0
+        self.pause_time = 0.0
+        self.degraded = 0
+        self.omitted_bytes = 0
+
+    def snapshot(self):
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "chunks_in": self.chunks_in,
+            "messages_out": self.messages_out,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "message_rate": self.messages_out / elapsed,
+            "coalescing_ratio": self.chunks_in / max(self.messages_out, 1),
+            "pauses": self.pauses,
+            "pause_time": self.pause_time,
+            "degraded": self.degraded,
+            "omitted_bytes": self.omitted_bytes
+        }
+
+
+class OutputCoalescer:
+
+    """Merge kernel output chunks into stream_output messages with backpressure.
+
+    Sits between the kernel reader (which calls `feed`) and a connection
+    (`send`). Chunks of the same stream are merged until `window` seconds
+    have passed or `max_bytes` are buffered. If `backlog` is given it must
+    return the connection's queued byte count; above `high_watermark` the
+    coalescer either blocks the reader ("pause", which stops reading from
+    the kernel pipe) or keeps only a tail of the output ("tail") until the
+    backlog drops below `low_watermark`.
+    """
+
+    def __init__(self, send, request_id, window=0.05, max_bytes=16384,
+                 backlog=None, high_watermark=1 << 20, low_watermark=256 << 10,
+                 overflow="pause", tail_bytes=4096, poll_interval=0.005,
+                 stats=None):
+        if overflow not in ("pause", "tail"):
+            raise ValueError("overflow must be 'pause' or 'tail'")
+
+        self.send = send
+        self.request_id = request_id
+        self.window = window
+        self.max_bytes = max_bytes
+        self.backlog = backlog
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.overflow = overflow
+        self.tail_bytes = tail_bytes
+        self.poll_interval = poll_interval
+        self.stats = stats or StreamStats()
+
+        self._lock = threading.Lock()
+        self._stream = None
+        self._chunks = []
+        self._size = 0
+        self._timer = None
+        self._closed = False
+
+        # Tail mode state, per stream.
+        self._degraded = False
+        self._tails = {}
+        self._omitted = {}
+
+    def feed(self, stream, data):
+        """Accept a chunk read from the kernel; may block under backpressure.
+        Chunks arriving after close() are dropped."""
+        if not data or self._closed:
+            return
+
+        size = _utf8_len(data)
+        self.stats.chunks_in += 1
+        self.stats.bytes_in += size
+        self._throttle()
+
+        with self._lock:
+            if self._closed:
+                return
+            if self._stream is not None and stream != self._stream:
+                self._flush_locked()
+
+            self._stream = stream
+            self._chunks.append(data)
+            self._size += size
+
+            if self._size >= self.max_bytes:
+                self._flush_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.window, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def close(self):
+        """Flush everything, including a pending tail summary."""
+        with self._lock:
+            self._closed = True
+            self._flush_locked()
+            if self._degraded:
+                self._recover_locked()
+
+    # ---- internal helpers ----
+
+    def _throttle(self):
+        if self.backlog is None:
+            return
+
+        queued = self.backlog()
+        if queued < self.high_watermark:
+            if self._degraded and queued <= self.low_watermark:
+                with self._lock:
+                    self._flush_locked()
+                    self._recover_locked()
+            return
+
+        if self.overflow == "tail":
+            with self._lock:
+                if not self._degraded:
+                    self._flush_locked()
+                    self._degraded = True
+                    self.stats.degraded += 1
+            return
+
+        # Blocking here stops the reader, so the kernel blocks on a full pipe.
+        start = time.monotonic()
+        self.stats.pauses += 1
+        while not self._closed and self.backlog() > self.low_watermark:
+            time.sleep(self.poll_interval)
+        self.stats.pause_time += time.monotonic() - start
+
+    def _flush_locked(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._chunks:
+            return
+
+        stream, data = self._stream, "".join(self._chunks)
+        self._chunks = []
+        self._size = 0
+
+        if not self._degraded:
+            self._emit(stream, data)
+            return
+
+        tail = self._tails.get(stream, "") + data
+        if len(tail) > self.tail_bytes:
+            dropped = _utf8_len(tail[:-self.tail_bytes])
+            self._omitted[stream] = self._omitted.get(stream, 0) + dropped
+            self.stats.omitted_bytes += dropped
+            tail = tail[-self.tail_bytes:]
+        self._tails[stream] = tail
+
+    def _recover_locked(self):
+        # Replace everything dropped while degraded by a summary and the tail.
+        self._degraded = False
+        for stream, tail in self._tails.items():
+            omitted = self._omitted.get(stream, 0)
+            if omitted:
+                tail = f"[... {omitted} bytes omitted ...]\n" + tail
+            self._emit(stream, tail)
+        self._tails = {}
+        self._omitted = {}
+
+    def _emit(self, stream, data):
+        self.stats.messages_out += 1
+        self.stats.bytes_out += _utf8_len(data)
+        self.send({
+            "type": MessageType.STREAM_OUTPUT.value,
+            "request_id": self.request_id,
+            "stream": stream,
+            "data": data
+        })
+
+
+def _utf8_len(data):
+    # isascii() is O(1) on str, so plain ASCII output is not re-encoded.
+    if isinstance(data, str) and not data.isascii():
+        return len(data.encode("utf-8"))
+    return len(data)
@@ -0,0 +1,163 @@
+# core/session/replay_buffer.py
+
+import threading
+from collections import OrderedDict, deque
+from core.protocol.message_types import MessageType
+
+
+class _RequestStream:
+
+    """Retained messages and subscriber for one request."""
+
+    def __init__(self):
+        self.next_seq = 1
+        self.messages = deque()
+        self.size = 0
+        self.final = None
+        self.subscriber = None
+        # Messages waiting for the subscriber, in seq order. One thread at
+        # a time drains it, outside the store lock.
+        self.outbox = deque()
+        self.draining = False
+
+
+class ReplayStore:
+
+    """Bounded per-request replay buffers so clients can resume a stream.
+
+    Every stream_output message gets a per-request `seq` (starting at 1)
+    and is kept until the request exceeds `max_messages`/`max_bytes`, at
+    which point the oldest messages are dropped. The final execute_response
+    is kept separately, so a client that resumes from beyond the window
+    still gets the result without re-running the cell. One that resumes
+    past the window of a still-running request first gets a stream_gap
+    message naming the seqs it missed.
+
+    Finished requests are evicted before running ones once there are more
+    than `max_requests`.
+    """
+
+    def __init__(self, max_requests=256, max_messages=1024, max_bytes=1 << 20):
+        self.max_requests = max_requests
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self._requests = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, request_id, send=None):
+        """Start buffering a request, forwarding live messages to send."""
+        with self._lock:
+            entry = self._requests.get(request_id)
+            if entry is None:
+                entry = self._requests[request_id] = _RequestStream()
+                self._evict()
+            entry.subscriber = send
+
+    def publish(self, request_id, message):
+        """Stamp a stream_output message with its seq, retain and forward it.
+        Dropped if the request was evicted or already has its response."""
+        with self._lock:
+            entry = self._requests.get(request_id)
+            if entry is None or entry.final is not None:
+                return
+            message["seq"] = entry.next_seq
+            entry.next_seq += 1
+
+            entry.messages.append(message)
+            entry.size += len(message["data"])
+            while entry.messages and (
+                len(entry.messages) > self.max_messages or entry.size > self.max_bytes
+            ):
+                entry.size -= len(entry.messages.popleft()["data"])
+            entry.outbox.append(message)
+        self._drain(entry)
+
+    def finish(self, request_id, response):
+        """Store the final execute_response and forward it. Returns False
+        if the request was evicted; the caller must deliver it then."""
+        with self._lock:
+            entry = self._requests.get(request_id)
+            if entry is None:
+                return False
+            entry.final = response
+            entry.outbox.append(response)
+        self._drain(entry)
+        return True
+
+    def resume(self, request_id, last_seq, send):
+        """Replay everything after last_seq to send and keep it subscribed.
+
+        Returns False if the request is unknown (never seen or evicted).
+        """
+        with self._lock:
+            entry = self._requests.get(request_id)
+            if entry is None:
+                return False
+
+            entry.subscriber = send
+            # Undelivered messages are retained too; the replay covers them.
+            entry.outbox.clear()
+            first = entry.messages[0]["seq"] if entry.messages else entry.next_seq
+
+            if last_seq + 1 < first and entry.final is not None:
+                # Resume point fell out of the window: the stored result wins.
+                messages = [entry.final]
+            else:
+                messages = [message for message in entry.messages if message["seq"] > last_seq]
+                if last_seq + 1 < first:
+                    messages.insert(0, {
+                        "type": MessageType.STREAM_GAP.value,
+                        "request_id": request_id,
+                        "from_seq": last_seq + 1,
+                        "to_seq": first - 1
+                    })
+                if entry.final is not None:
+                    messages.append(entry.final)
+            entry.outbox.extend(messages)
+        self._drain(entry)
+        return True
+
+    def detach(self, request_id):
+        with self._lock:
+            entry = self._requests.get(request_id)
+            if entry is not None:
+                entry.subscriber = None
+
+    # ---- internal helpers ----
+
+    def _evict(self):
+        # Called with the lock held. Oldest finished request first.
+        while len(self._requests) > self.max_requests:
+            victim = next((rid for rid, entry in self._requests.items() if entry.final is not None), None)
+            if victim is None:
+                self._requests.popitem(last=False)
+            else:
+                del self._requests[victim]
+
+    def _drain(self, entry):
+        # A slow subscriber only holds up its own request: send runs
+        # without the lock, and a thread finding another draining leaves
+        # its messages to it.
+        with self._lock:
+            if entry.draining:
+                return
+            entry.draining = True
+        while True:
+            with self._lock:
+                subscriber = entry.subscriber
+                if not entry.outbox or subscriber is None:
+                    entry.outbox.clear()
+                    entry.draining = False
+                    return
+                batch = list(entry.outbox)
+                entry.outbox.clear()
+
+            for message in batch:
+                try:
+                    subscriber(message)
+                except Exception:
+                    # The connection dropped; keep buffering until the client resumes.
+                    with self._lock:
+                        if entry.subscriber is subscriber:
+                            entry.subscriber = None
+                    break
@@ -0,0 +1,116 @@
+# core/session/routing.py
+
+import fcntl
+import json
+import os
+import tempfile
+import threading
+
+_ANY = object()
+
+class RoutingTable:
+
+    """session_id -> owning worker address, shared by every process on a
+    node through one JSON file.
+
+    Writers hold an flock on path + ".lock", write a temp file, fsync it and
+    os.replace() it over the table, so readers see the old or the new table,
+    never a partial one, and a switch of owner is a single atomic step.
+    Readers only re-read the file when its inode, size or mtime changed.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._table = {"version": 0, "sessions": {}, "workers": []}
+
+    def lookup(self, session_id):
+        return self._read()["sessions"].get(session_id)
+
+    def workers(self):
+        return list(self._read()["workers"])
+
+    def version(self):
+        return self._read()["version"]
+
+    def snapshot(self):
+        table = self._read()
+        return {"version": table["version"], "sessions": dict(table["sessions"]), "workers": list(table["workers"])}
+
+    def claim(self, session_id, address):
+        """Assign an unowned session to address; returns the owner either way."""
+        def change(table):
+            return table["sessions"].setdefault(session_id, address)
+        return self._update(change)
+
+    def assign(self, session_id, address, expect=_ANY):
+        """Point session_id at address. With expect, only if the current
+        owner is expect (None: unowned); returns whether it changed."""
+        def change(table):
+            sessions = table["sessions"]
+            if expect is not _ANY and sessions.get(session_id) != expect:
+                return False
+            sessions[session_id] = address
+            return True
+        return self._update(change)
+
+    def remove(self, session_id, expect=_ANY):
+        def change(table):
+            sessions = table["sessions"]
+            if session_id not in sessions or (expect is not _ANY and sessions[session_id] != expect):
+                return False
+            del sessions[session_id]
+            return True
+        return self._update(change)
+
+    def register_worker(self, address):
+        def change(table):
+            if address not in table["workers"]:
+                table["workers"].append(address)
+        self._update(change)
+
+    def unregister_worker(self, address):
+        """Forget a worker and every session it owned."""
+        def change(table):
+            table["workers"] = [w for w in table["workers"] if w != address]
+            table["sessions"] = {s: w for s, w in table["sessions"].items() if w != address}
+        self._update(change)
+
+    # ---- internal helpers ----
+
+    def _read(self):
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return self._table
+            stamp = (st.st_ino, st.st_size, st.st_mtime_ns)
+            if stamp != self._stamp:
+                with open(self.path, encoding="utf-8") as f:
+                    self._table = json.load(f)
+                self._stamp = stamp
+            return self._table
+
+    def _update(self, change):
+        with open(self.path + ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._stamp = None
+            table = json.loads(json.dumps(self._read()))
+            result = change(table)
+            if result is False:
+                return result
+            table["version"] += 1
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp = tempfile.mkstemp(dir=directory, prefix=".routing-")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(table, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp, self.path)
+            except BaseException:
+                os.unlink(temp)
+                raise
+        return result
@@ -0,0 +1,308 @@
+# core/session/scheduler.py
+
+import threading
+import time
+from collections import deque
+from core.protocol.fast_messages import ExecuteResponseMessage
+from core.protocol.message_types import MessageType
+from core.session.admission import AdmissionRejected
+from core.session.wal import COMPLETED, FAILED, RETRY
+from core.utils import tracing
+from core.utils.metrics import REGISTRY
+
+_QUEUE_WAIT = REGISTRY.histogram("scheduler_queue_seconds", "Time execute_requests wait in the session queue")
+
+
+class ScheduledExecution:
+
+    """An execute_request waiting in, or taken from, a session queue."""
+
+    def __init__(self, request, send, backlog=None):
+        self.request = request
+        self.send = send
+        self.backlog = backlog
+        self.enqueued_at = time.monotonic()
+        self.enqueued_ns = time.perf_counter_ns()
+        self.started_at = None
+        self.ticket = None
+        self.logged = False
+        self.superseded = False
+        self.response = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        self.done.wait(timeout)
+        return self.response
+
+
+class ExecutionScheduler:
+
+    """Runs a session's execute_requests one at a time, in order.
+
+    A newer request for the same (session_id, cell_id) drops older queued
+    ones with status "superseded". With cancel_running=True it also
+    interrupts a running request for that cell; the time that request
+    spent on the kernel is counted as wasted. A resubmitted request_id is
+    a retry, not a newer request: it is queued behind the original and
+    attached to its outcome through the idempotency cache.
+
+    With an AdmissionController, requests over their session or tenant
+    limits, or arriving while the node is overloaded, are answered at once
+    with an error carrying retry_after instead of being queued.
+
+    pause() holds queued requests (e.g. while the session migrates);
+    shed() answers them with an error so clients retry elsewhere.
+
+    With a WriteAheadLog, every queued request, its start and its final
+    response are logged; a request_id whose outcome was recovered from
+    before a restart gets that response instead of running again.
+    """
+
+    def __init__(self, session, cancel_running=False, admission=None, wal=None):
+        self.session = session
+        self.cancel_running = cancel_running
+        self.admission = admission
+        self.wal = wal
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._running = None
+        self._worker = None
+        self._closed = False
+        self._paused = False
+
+        self.superseded_queued = 0
+        self.superseded_running = 0
+        self.wasted_seconds = 0.0
+        self.rejected = 0
+
+    def submit(self, request, send, backlog=None):
+        """Queue an ExecuteRequestMessage; returns its ScheduledExecution."""
+        job = ScheduledExecution(request, send, backlog)
+
+        if self.wal is not None:
+            recovered = self.wal.recovered_response(request.request_id)
+            if recovered is not None:
+                job.response = recovered
+                try:
+                    send(recovered)
+                finally:
+                    job.done.set()
+                return job
+
+        if self.admission is not None:
+            try:
+                job.ticket = self.admission.admit(request.session_id, request.tenant_id)
+            except AdmissionRejected as e:
+                return self._reject(job, e.error_type, str(e), e.retry_after)
+
+        with self._cond:
+            if self._closed:
+                self._release(job)
+                raise RuntimeError("Scheduler is closed")
+
+            dropped = self._supersede(request) if request.cell_id is not None else []
+            if self.wal is not None:
+                self.wal.accepted(request)
+                job.logged = True
+            self._queue.append(job)
+            self._cond.notify()
+
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+        for stale in dropped:
+            self._finish_superseded(stale)
+        return job
+
+    def queued(self):
+        with self._cond:
+            return len(self._queue)
+
+    def pause(self, timeout=None):
+        """Stop starting queued requests; True once none is running."""
+        with self._cond:
+            self._paused = True
+            return self._cond.wait_for(lambda: self._running is None, timeout)
+
+    def join(self, timeout=None):
+        """Wait for the running request to finish; True once none is running."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._running is None, timeout)
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def shed(self, error_type, message, retry_after=0.0):
+        """Answer every queued request with an error; returns how many."""
+        with self._cond:
+            jobs = list(self._queue)
+            self._queue.clear()
+        for job in jobs:
+            self._release(job)
+            self._reject(job, error_type, message, retry_after)
+        return len(jobs)
+
+    def close(self, error_type="session_closed", message="Session closed", retry_after=0.0):
+        """Stop taking requests and answer the queued ones with an error
+        (see shed); a running one finishes. Returns how many were queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        return self.shed(error_type, message, retry_after)
+
+    def stats(self):
+        return {
+            "queued": self.queued(),
+            "superseded_queued": self.superseded_queued,
+            "superseded_running": self.superseded_running,
+            "wasted_kernel_seconds": self.wasted_seconds,
+            "rejected": self.rejected
+        }
+
+    # ---- internal helpers ----
+
+    def _supersede(self, request):
+        # Called with the lock held.
+        key = (request.session_id, request.cell_id)
+        running = self._running
+
+        # Copies of the incoming, the running or an already answered
+        # request_id are retries that attach to that run's outcome, so they
+        # are never superseded themselves.
+        retries = {request.request_id}
+        if running is not None:
+            retries.add(running.request.request_id)
+        known = self.session.idempotency.known
+
+        dropped = [job for job in self._queue
+                   if self._key(job) == key and job.request.request_id not in retries
+                   and not known(job.request.request_id)]
+        for job in dropped:
+            self._queue.remove(job)
+            job.superseded = True
+        self.superseded_queued += len(dropped)
+
+        if (self.cancel_running and running is not None and self._key(running) == key
+                and running.request.request_id != request.request_id):
+            if not running.superseded:
+                running.superseded = True
+                self.superseded_running += 1
+                self.session.kernel.interrupt()
+
+        return dropped
+
+    def _key(self, job):
+        return (job.request.session_id, job.request.cell_id)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while (not self._queue or self._paused) and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._running = self._queue.popleft()
+
+            job.started_at = time.monotonic()
+            waited = job.started_at - job.enqueued_at
+            _QUEUE_WAIT.record(waited * 1e6)
+            if job.ticket is not None:
+                self.admission.started(job.ticket)
+
+            trace = None
+            if tracing.TRACER is not None:
+                trace = tracing.TRACER.start(job.request.session_id, job.request.request_id)
+                if trace is not None:
+                    trace.span("queue", job.enqueued_ns, time.perf_counter_ns())
+
+            try:
+                if job.logged:
+                    self.wal.started(job.request.request_id)
+                result = self.session.stream_cell(
+                    job.request.code,
+                    job.request.request_id,
+                    job.send,
+                    job.backlog,
+                    on_result=lambda result, job=job: self._mark_superseded(job, result),
+                    trace=trace,
+                    timeout=job.request.timeout,
+                    cell_id=job.request.cell_id
+                )
+                job.response = ExecuteResponseMessage.from_result(
+                    job.request.request_id, result["execution_count"], result
+                ).to_dict()
+            except Exception as e:
+                job.response = {
+                    "type": MessageType.ERROR.value,
+                    "request_id": job.request.request_id,
+                    "error_type": "kernel_error",
+                    "message": str(e)
+                }
+                self._log_finished(job, FAILED)
+                job.send(job.response)
+            else:
+                self._log_finished(job, COMPLETED)
+
+            with self._cond:
+                self._running = None
+                if job.superseded:
+                    self.wasted_seconds += time.monotonic() - job.started_at
+                self._cond.notify_all()
+            self._release(job)
+            job.done.set()
+
+    def _mark_superseded(self, job, result):
+        if job.superseded:
+            result["status"] = "superseded"
+
+    def _finish_superseded(self, job):
+        request_id = job.request.request_id
+        response = ExecuteResponseMessage(request_id, 0, "superseded", "", "").to_dict()
+
+        # Retries of a superseded request get the same answer.
+        self.session.idempotency.record(request_id, response)
+
+        job.response = response
+        self._log_finished(job, COMPLETED)
+        self._release(job)
+        try:
+            job.send(response)
+        finally:
+            job.done.set()
+
+    def _reject(self, job, error_type, message, retry_after):
+        # Not recorded for idempotency: a retry after retry_after should run.
+        with self._cond:
+            self.rejected += 1
+
+        job.response = {
+            "type": MessageType.ERROR.value,
+            "request_id": job.request.request_id,
+            "error_type": error_type,
+            "message": message,
+            "retry_after": round(retry_after, 3)
+        }
+        self._log_finished(job, RETRY)
+        try:
+            job.send(job.response)
+        finally:
+            job.done.set()
+        return job
+
+    def _log_finished(self, job, outcome):
+        if not job.logged:
+            return
+        try:
+            self.wal.finished(job.request.request_id, job.request.session_id, job.response, outcome)
+        except RuntimeError:
+            # The log closed under a cell that outlived the worker's
+            # close; recovery reports the request as failed.
+            pass
+
+    def _release(self, job):
+        if job.ticket is not None:
+            self.admission.release(job.ticket)
@@ -0,0 +1,327 @@
+# core/session/wal.py
+
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from core.protocol.message_types import MessageType
+from core.utils.metrics import REGISTRY
+
+_COMMIT_TIME = REGISTRY.histogram("wal_commit_seconds", "Write + fsync time of one WAL group commit")
+
+# Frame: payload length, crc32 of the payload, then the JSON payload.
+_HEADER = struct.Struct("<II")
+_SUFFIX = ".wal"
+_TEMP = ".tmp"
+
+# Outcomes a request can be recovered with.
+COMPLETED = "completed"  # ran to an execute_response (any status)
+FAILED = "failed"        # was running when the process died; effects lost
+RETRY = "retry"          # never ran; resending it runs it
+
+QUEUED = "queued"
+RUNNING = "running"
+
+
+class WriteAheadLog:
+
+    """Append-only log of execute_requests: accepted, started, finished.
+
+    Records are buffered by the callers and written by one committer
+    thread: everything appended while the previous write + fsync was in
+    flight goes out in the next one (group commit), so a burst of requests
+    shares a single fsync. commit_delay holds each commit back a little to
+    gather bigger groups. wait(lsn) blocks until a record is durable.
+
+    The log lives in numbered segments under directory. Once segment_bytes
+    have been appended to the active segment, the next one starts with a
+    snapshot of the live state (open requests plus the last retain
+    outcomes) and the older segments are deleted, which is also the
+    compaction. The snapshot is written to a temporary file and renamed
+    into place once durable, so a segment never starts with half of one.
+
+    On start the log is replayed. Requests that were queued come back as
+    RETRY, running ones as FAILED; with every finished one they are kept
+    in recovered: request_id -> (outcome, response).
+    """
+
+    def __init__(self, directory, segment_bytes=16 << 20, retain=10000, commit_delay=0.0, sync=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.retain = retain
+        self.commit_delay = commit_delay
+        self.sync = sync
+
+        self._lock = threading.Lock()
+        self._pending = threading.Condition(self._lock)
+        self._synced = threading.Condition(self._lock)
+        self._buffer = []
+        self._appended = 0
+        self._durable = 0
+        self._closed = False
+
+        # request_id -> [session_id, QUEUED | RUNNING]
+        self._open = {}
+        # request_id -> (session_id, outcome, response), oldest first
+        self._outcomes = OrderedDict()
+
+        self.records = 0
+        self.commits = 0
+        self.bytes_written = 0
+        self.torn_records = 0
+
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(_SUFFIX + _TEMP):
+                # A snapshot the crash cut short; the old segments are intact.
+                os.unlink(os.path.join(directory, name))
+        segments = self._segments()
+        for segment in segments:
+            self._replay(segment)
+        self._resolve_crashed()
+        self.recovered = {rid: (outcome, response) for rid, (_, outcome, response) in self._outcomes.items()}
+
+        # Start from a compacted segment so old ones can go right away.
+        self._segment = (segments[-1] + 1) if segments else 1
+        self._file = None
+        self._size = 0
+        self._rotate(self._snapshot())
+
+        self._collector = self.stats
+        REGISTRY.register_collector("wal", self._collector)
+        self._committer = threading.Thread(target=self._commit_loop, daemon=True)
+        self._committer.start()
+
+    def accepted(self, request):
+        return self._append({"op": "accepted", "rid": request.request_id, "sid": request.session_id})
+
+    def started(self, request_id, wait=True):
+        """Log that a request reached the kernel. With wait, returns once
+        that is durable, so a crash can never report a run cell as RETRY."""
+        lsn = self._append({"op": "started", "rid": request_id})
+        if wait:
+            self.wait(lsn)
+        return lsn
+
+    def finished(self, request_id, session_id, response, outcome=COMPLETED):
+        return self._append({"op": "finished", "rid": request_id, "sid": session_id,
+                             "outcome": outcome, "response": response})
+
+    def wait(self, lsn, timeout=None):
+        """Block until record lsn is on disk; False on timeout or close."""
+        with self._synced:
+            return self._synced.wait_for(lambda: self._durable >= lsn or self._closed, timeout) \
+                and self._durable >= lsn
+
+    def flush(self, timeout=None):
+        with self._lock:
+            lsn = self._appended
+        return self.wait(lsn, timeout)
+
+    def status(self, request_id):
+        """(state, response): QUEUED or RUNNING with None, or the outcome
+        and its response; None if the log does not know the request."""
+        with self._lock:
+            entry = self._open.get(request_id)
+            if entry is not None:
+                return entry[1], None
+            entry = self._outcomes.get(request_id)
+            if entry is not None:
+                return entry[1], entry[2]
+        return None
+
+    def recovered_response(self, request_id):
+        """The response a request got before the restart, if it got one.
+        None for RETRY (it never ran) and for requests of this run."""
+        entry = self.recovered.get(request_id)
+        if entry is None or entry[0] == RETRY:
+            return None
+        return entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "records": self.records,
+                "commits": self.commits,
+                "records_per_commit": self.records / self.commits if self.commits else 0.0,
+                "bytes_written": self.bytes_written,
+                "open": len(self._open),
+                "outcomes": len(self._outcomes),
+                "recovered": len(self.recovered),
+                "torn_records": self.torn_records,
+                "segment": self._segment
+            }
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._closed = True
+            self._pending.notify_all()
+            self._synced.notify_all()
+        self._committer.join()
+        self._file.close()
+        REGISTRY.unregister_collector(self._collector)
+
+    # ---- internal helpers ----
+
+    def _append(self, record):
+        data = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        frame = _HEADER.pack(len(data), zlib.crc32(data)) + data
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write-ahead log is closed")
+            self._apply(record)
+            self._buffer.append(frame)
+            self._appended += 1
+            self._pending.notify()
+            return self._appended
+
+    def _apply(self, record):
+        # Called with the lock held (or during replay).
+        op = record["op"]
+        rid = record["rid"]
+        if op == "accepted":
+            self._outcomes.pop(rid, None)
+            # Never back to QUEUED: a started request must not come back as RETRY.
+            self._open.setdefault(rid, [record["sid"], QUEUED])
+        elif op == "started":
+            entry = self._open.get(rid)
+            if entry is not None:
+                entry[1] = RUNNING
+        elif op == "finished":
+            self._open.pop(rid, None)
+            self._outcomes[rid] = (record["sid"], record["outcome"], record["response"])
+            self._outcomes.move_to_end(rid)
+            while len(self._outcomes) > self.retain:
+                self._outcomes.popitem(last=False)
+
+    def _commit_loop(self):
+        while True:
+            with self._lock:
+                self._pending.wait_for(lambda: self._buffer or self._closed)
+                if not self._buffer:
+                    return
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                lsn = self._appended
+                # The snapshot already holds the batch's effects.
+                snapshot = self._snapshot() if self._size >= self.segment_bytes else None
+
+            started = time.perf_counter()
+            if snapshot is not None:
+                self._rotate(snapshot)
+            else:
+                self._write(b"".join(batch))
+            _COMMIT_TIME.record((time.perf_counter() - started) * 1e6)
+
+            with self._lock:
+                self._durable = lsn
+                self.records += len(batch)
+                self.commits += 1
+                self._synced.notify_all()
+
+    def _write(self, data):
+        self._file.write(data)
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+        self._size += len(data)
+        self.bytes_written += len(data)
+
+    def _snapshot(self):
+        # Records that rebuild the current state on their own.
+        records = []
+        for rid, (sid, state) in self._open.items():
+            records.append({"op": "accepted", "rid": rid, "sid": sid})
+            if state == RUNNING:
+                records.append({"op": "started", "rid": rid})
+        for rid, (sid, outcome, response) in self._outcomes.items():
+            records.append({"op": "finished", "rid": rid, "sid": sid, "outcome": outcome, "response": response})
+        return records
+
+    def _rotate(self, snapshot):
+        # The snapshot becomes a segment only once it is complete and
+        # durable, and old segments are deleted only after that. A crash
+        # in between replays them, then the whole snapshot, which repeats
+        # state they already hold.
+        if self._file is not None:
+            self._file.close()
+            self._segment += 1
+        old = [s for s in self._segments() if s < self._segment]
+
+        path = self._path(self._segment)
+        frames = []
+        for record in snapshot:
+            data = json.dumps(record, separators=(",", ":")).encode("utf-8")
+            frames.append(_HEADER.pack(len(data), zlib.crc32(data)) + data)
+        data = b"".join(frames)
+        with open(path + _TEMP, "wb") as f:
+            f.write(data)
+            f.flush()
+            if self.sync:
+                os.fsync(f.fileno())
+        os.replace(path + _TEMP, path)
+        self._sync_directory()
+        self.bytes_written += len(data)
+
+        self._file = open(path, "ab")
+        # Only records appended after the snapshot count toward rotation.
+        self._size = 0
+
+        for segment in old:
+            os.unlink(self._path(segment))
+        self._sync_directory()
+
+    def _replay(self, segment):
+        with open(self._path(segment), "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, crc = _HEADER.unpack_from(data, offset)
+            payload = data[offset + _HEADER.size:offset + _HEADER.size + length]
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                # Torn tail of a write cut short by the crash.
+                self.torn_records += 1
+                return
+            self._apply(json.loads(payload))
+            offset += _HEADER.size + length
+        if offset < len(data):
+            self.torn_records += 1
+
+    def _resolve_crashed(self):
+        for rid, (sid, state) in list(self._open.items()):
+            if state == RUNNING:
+                response = _lost(rid, FAILED, "The worker restarted while this request was running; "
+                                              "its effect on the session was lost")
+            else:
+                response = _lost(rid, RETRY, "The worker restarted before this request ran; send it again")
+                response["retry_after"] = 0.0
+            self._apply({"op": "finished", "rid": rid, "sid": sid, "outcome": response["outcome"],
+                         "response": response})
+
+    def _segments(self):
+        return sorted(int(name[:-len(_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(_SUFFIX) and name[:-len(_SUFFIX)].isdigit())
+
+    def _path(self, segment):
+        return os.path.join(self.directory, f"{segment:016d}{_SUFFIX}")
+
+    def _sync_directory(self):
+        if not self.sync:
+            return
+        fd = os.open(self.directory, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _lost(request_id, outcome, message):
+    return {"type": MessageType.ERROR.value, "request_id": request_id,
+            "error_type": "worker_restarted", "message": message, "outcome": outcome}
@@ -0,0 +1,493 @@
+# core/session/worker.py
+#
+# Session worker: owns NotebookSessions and serves the client protocol
+# (protocol.md) as NDJSON over a UNIX socket. Several workers on a node
+# share a RoutingTable that says which one owns each session.
+#
+#     python -m core.session.worker serve --socket /tmp/w1.sock --routing /tmp/routes.json
+#     python -m core.session.worker migrate --socket /tmp/w1.sock --session S --to /tmp/w2.sock
+#
+# Migration moves a live session to another worker: pause its queue, send
+# the compacted history and the session's files, rebuild the state in a
+# kernel on the target (a warm one from its KernelPool, if it has one),
+# then switch the routing entry in one os.replace(). The whole move has a
+# deadline; if it fails after the import, the source tells the target to
+# drop its copy. Requests still queued on the source, and any that reach
+# it afterwards, get an error with error_type "session_moved" and
+# retry_after 0.
+#
+# With --wal the worker logs every queued execution (core/session/wal.py);
+# after a crash, request_status and retries of a request_id get its
+# outcome: completed, failed or retry.
+
+import argparse
+import base64
+import functools
+import io
+import json
+import os
+import shutil
+import socket
+import sys
+import tarfile
+import threading
+import time
+
+from core.kernel.cpp_kernel import CppKernel
+from core.kernel.kernel_pool import KernelPool
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.fast_messages import (
+    ExecuteRequestMessage, MessageValidationError, validate_session_id
+)
+from core.protocol.message_types import MessageType
+from core.session.notebook_session import NotebookSession
+from core.session.routing import RoutingTable
+from core.session.scheduler import ExecutionScheduler
+from core.session.wal import WriteAheadLog
+from core.utils.metrics import REGISTRY
+
+# Worker-to-worker messages; not part of the client protocol.
+IMPORT_SESSION = "import_session"
+IMPORT_RESULT = "import_result"
+MIGRATE_SESSION = "migrate_session"
+MIGRATE_RESULT = "migrate_result"
+DROP_SESSION = "drop_session"
+DROP_RESULT = "drop_result"
+
+# How long past the migration deadline the source waits for the target's
+# reply; the target gives up at the deadline itself.
+REPLY_GRACE = 5.0
+
+_MIGRATIONS = REGISTRY.counter("session_migrations_total", "Sessions moved to another worker")
+_MIGRATION_PAUSE = REGISTRY.histogram(
+    "session_migration_pause_seconds", "Time a migrating session's queue was paused"
+)
+
+class MigrationError(RuntimeError):
+    """Raised when a session could not be moved; it stays on the source."""
+
+
+class SessionWorker:
+
+    """Serves the sessions routed to address.
+
+    A request for a session nobody owns claims it for this worker. Each
+    session gets its own ExecutionScheduler and, with files_root, a
+    directory files_root/session_id used as the kernel's working directory.
+    All schedulers share wal, a WriteAheadLog, when one is given; close()
+    gives running cells close_timeout to log their outcome. With
+    pool, a started KernelPool, new sessions start and imported ones
+    rebuild in a warm kernel (only without files_root: a pooled kernel
+    cannot change directory).
+    """
+
+    def __init__(self, address, routing, kernel_factory=CppKernel, files_root=None,
+                 session_options=None, admission=None, wal=None, pool=None, close_timeout=10.0):
+        self.address = address
+        self.routing = routing
+        self.kernel_factory = kernel_factory
+        self.files_root = files_root
+        self.session_options = session_options or {}
+        self.admission = admission
+        self.wal = wal
+        self.pool = pool
+        self.close_timeout = close_timeout
+
+        # session_id -> (NotebookSession, ExecutionScheduler)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def serve(self):
+        self._server = _listen(self.address)
+        self.routing.register_worker(self.address)
+        while True:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def close(self):
+        self.routing.unregister_worker(self.address)
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session, scheduler in sessions:
+            scheduler.close()
+        # A running cell logs its outcome when it ends; the log must still be open.
+        deadline = time.monotonic() + self.close_timeout
+        for session, scheduler in sessions:
+            if not scheduler.join(max(deadline - time.monotonic(), 0.0)):
+                session.kernel.interrupt()
+                scheduler.join(1.0)
+        for session, scheduler in sessions:
+            # Hosted kernels outlive the worker; its successor reattaches.
+            session.close(detach=True)
+        if self.wal is not None:
+            self.wal.close()
+        if self.pool is not None:
+            self.pool.close()
+        try:
+            os.unlink(self.address)
+        except FileNotFoundError:
+            pass
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions)
+
+    def migrate(self, session_id, target, timeout=30.0):
+        """Move a session to the worker at target. Returns migration stats;
+        raises MigrationError and leaves the session here on failure."""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is None:
+            raise MigrationError(f"Session {session_id} is not on this worker")
+        session, scheduler = entry
+
+        paused = time.monotonic()
+        deadline = paused + timeout
+        imported = False
+        try:
+            if not scheduler.pause(timeout):
+                raise MigrationError("The running cell did not finish in time")
+            cells = session.history.replay_cells()
+            budget = deadline - time.monotonic()
+            if budget <= 0:
+                raise MigrationError("Migration ran out of time before the import")
+            imported = True
+            reply = request(target, {
+                "type": IMPORT_SESSION,
+                "session_id": session_id,
+                "cells": cells,
+                "execution_count": session.execution_count,
+                "files": _pack(self._files_dir(session_id)),
+                "timeout": budget
+            }, timeout=budget + REPLY_GRACE)
+            if not reply.get("ok"):
+                raise MigrationError(f"Target could not rebuild the session: {reply.get('message')}")
+            if not self.routing.assign(session_id, target, expect=self.address):
+                raise MigrationError("Routing entry changed during the migration")
+        except Exception:
+            if imported:
+                _abort_import(target, session_id)
+            scheduler.resume()
+            raise
+
+        # Cut over: the target owns the session from here on. A request
+        # racing with this finds the scheduler closed and is redirected too.
+        with self._lock:
+            self._sessions.pop(session_id, None)
+        moved = scheduler.close("session_moved", f"Session moved to {target}")
+        session.close()
+        self._remove_files(session_id)
+        pause = time.monotonic() - paused
+        _MIGRATIONS.inc()
+        _MIGRATION_PAUSE.record(pause * 1e6)
+        return {
+            "session_id": session_id,
+            "target": target,
+            "replayed_cells": len(cells),
+            "rebuild_seconds": reply["seconds"],
+            "requests_moved": moved,
+            "pause_seconds": pause
+        }
+
+    # ---- message handlers ----
+
+    def on_execute_request(self, message, send):
+        request = ExecuteRequestMessage.validate(message)
+        entry = self._session(request.session_id, request.request_id, send)
+        if entry is None:
+            return
+        try:
+            entry[1].submit(request, send)
+        except RuntimeError:
+            # Closed by a migration that just finished.
+            send(_moved(request.request_id, self.routing.lookup(request.session_id)))
+
+    def on_interrupt(self, message, send):
+        entry = self._session(message["session_id"], None, send)
+        if entry is not None:
+            entry[0].kernel.interrupt()
+
+    def on_restart(self, message, send):
+        entry = self._session(message["session_id"], None, send)
+        if entry is not None:
+            entry[0].reset()
+
+    def on_resume(self, message, send):
+        entry = self._session(message["session_id"], message["request_id"], send)
+        if entry is not None and not entry[0].resume_stream(message["request_id"], message["last_seq"], send):
+            send(_error(message["request_id"], "unknown_request", "Unknown request_id"))
+
+    def on_request_status(self, message, send):
+        request_id = message["request_id"]
+        status = self.wal.status(request_id) if self.wal is not None else None
+        state, response = status if status is not None else ("unknown", None)
+        send({"type": MessageType.REQUEST_STATUS.value, "request_id": request_id,
+              "state": state, "response": response})
+
+    def on_import_session(self, message, send):
+        session_id = message["session_id"]
+        started = time.monotonic()
+        deadline = started + message.get("timeout", 30.0)
+
+        # Rebuild before anything is routed here; the first cell that
+        # fails, or the deadline passing, aborts the import and the source
+        # keeps the session.
+        try:
+            _unpack(message.get("files"), self._files_dir(session_id))
+            session = self._open(session_id, self._warm_kernel())
+            for code in message["cells"]:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise MigrationError("Rebuild did not finish in time")
+                result = session.run_cell(code, timeout=remaining)
+                if result["status"] != "ok":
+                    raise MigrationError(result["stderr"] or result["status"])
+            if time.monotonic() > deadline:
+                raise MigrationError("Rebuild did not finish in time")
+        except Exception as e:
+            self._drop(session_id)
+            send({"type": IMPORT_RESULT, "session_id": session_id, "ok": False, "message": str(e)})
+            return
+        session.execution_count = message.get("execution_count", session.execution_count)
+        send({"type": IMPORT_RESULT, "session_id": session_id, "ok": True,
+              "seconds": time.monotonic() - started})
+
+    def on_drop_session(self, message, send):
+        # The source gave up on a migration after the import; a copy that
+        # the routing table does point here is kept.
+        session_id = message["session_id"]
+        if self.routing.lookup(session_id) != self.address:
+            self._drop(session_id)
+        send({"type": DROP_RESULT, "session_id": session_id, "ok": True})
+
+    def on_migrate_session(self, message, send):
+        try:
+            stats = self.migrate(message["session_id"], message["target"], message.get("timeout", 30.0))
+        except Exception as e:
+            send({"type": MIGRATE_RESULT, "ok": False, "message": str(e)})
+            return
+        send(dict(stats, type=MIGRATE_RESULT, ok=True))
+
+    # ---- internal helpers ----
+
+    def _session(self, session_id, request_id, send):
+        # The session if this worker owns it; otherwise point the client
+        # at the owner and return None.
+        with self._lock:
+            entry = self._sessions.get(session_id)
+        if entry is not None:
+            return entry
+
+        owner = self.routing.claim(session_id, self.address)
+        if owner != self.address:
+            send(_moved(request_id, owner))
+            return None
+
+        self._open(session_id, self._warm_kernel())
+        with self._lock:
+            return self._sessions[session_id]
+
+    def _open(self, session_id, kernel=None):
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is not None:
+                if kernel is not None:
+                    kernel.shutdown()
+                return entry[0]
+            session = NotebookSession(
+                session_id=session_id,
+                kernel_factory=functools.partial(self._kernel, self._files_dir(session_id)),
+                kernel=kernel,
+                **self.session_options
+            )
+            self._sessions[session_id] = (session, ExecutionScheduler(
+                session, admission=self.admission, wal=self.wal
+            ))
+            return session
+
+    def _warm_kernel(self):
+        if self.pool is None or self.files_root is not None:
+            return None
+        return self.pool.acquire()
+
+    def _kernel(self, files):
+        kernel = self.kernel_factory()
+        if files is not None:
+            os.makedirs(files, exist_ok=True)
+            kernel.cwd = files
+        return kernel
+
+    def _drop(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            entry[1].close()
+            entry[0].close()
+        self._remove_files(session_id)
+
+    def _remove_files(self, session_id):
+        files = self._files_dir(session_id)
+        if files is not None:
+            shutil.rmtree(files, ignore_errors=True)
+
+    def _files_dir(self, session_id):
+        if not self.files_root:
+            return None
+        root = os.path.realpath(self.files_root)
+        files = os.path.realpath(os.path.join(root, session_id))
+        if os.path.dirname(files) != root:
+            raise MessageValidationError(f"Session directory {files} is outside {root}")
+        return files
+
+    def _handle(self, conn):
+        write_lock = threading.Lock()
+
+        def send(message):
+            data = (json.dumps(message) + "\n").encode("utf-8")
+            with write_lock:
+                conn.sendall(data)
+
+        with conn, conn.makefile("r", encoding="utf-8") as reader:
+            for line in reader:
+                message = {}
+                try:
+                    message = json.loads(line)
+                    if "session_id" in message:
+                        validate_session_id(message["session_id"])
+                    getattr(self, "on_" + message["type"])(message, send)
+                except (MessageValidationError, KeyError, AttributeError, ValueError) as e:
+                    try:
+                        send(_error(message.get("request_id"), "invalid_message", str(e)))
+                    except OSError:
+                        return
+                except OSError:
+                    return
+
+
+def request(address, message, timeout=30.0):
+    """Send one message to a worker and return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.settimeout(timeout)
+        conn.connect(address)
+        conn.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        with conn.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+    if not line:
+        raise MigrationError(f"Worker {address} closed the connection")
+    return json.loads(line)
+
+
+def _abort_import(target, session_id):
+    # Best effort: a target that cannot be reached rebuilt nothing, or
+    # drops its copy when its own deadline passes.
+    try:
+        request(target, {"type": DROP_SESSION, "session_id": session_id}, timeout=REPLY_GRACE)
+    except (OSError, ValueError, MigrationError):
+        pass
+
+
+def _error(request_id, error_type, message):
+    return {"type": MessageType.ERROR.value, "request_id": request_id,
+            "error_type": error_type, "message": message}
+
+
+def _moved(request_id, owner):
+    # Clients retry right away; front ends follow the routing table.
+    message = _error(request_id, "session_moved", f"Session is served by {owner}")
+    message.update({"retry_after": 0.0, "worker": owner})
+    return message
+
+
+def _pack(directory):
+    if directory is None or not os.path.isdir(directory):
+        return None
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        tar.add(directory, arcname=".")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _unpack(data, directory):
+    if directory is None:
+        return
+    os.makedirs(directory, exist_ok=True)
+    if not data:
+        return
+    with tarfile.open(fileobj=io.BytesIO(base64.b64decode(data)), mode="r:gz") as tar:
+        if hasattr(tarfile, "data_filter"):
+            tar.extractall(directory, filter="data")
+            return
+        # No extraction filters: refuse links and members that leave directory.
+        root = os.path.realpath(directory)
+        for member in tar.getmembers():
+            target = os.path.realpath(os.path.join(root, member.name))
+            if member.issym() or member.islnk() or os.path.commonpath([root, target]) != root:
+                raise MigrationError(f"Refusing archive member {member.name}")
+        tar.extractall(directory)
+
+
+def _listen(path):
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(128)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Session worker")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="serve sessions on a UNIX socket")
+    serve.add_argument("--socket", required=True)
+    serve.add_argument("--routing", required=True, help="routing table file shared by the node's workers")
+    serve.add_argument("--kernel", choices=("sim", "cling"), default="cling")
+    serve.add_argument("--files-root", help="per-session working directories live here")
+    serve.add_argument("--wal", help="directory of the write-ahead log of queued executions")
+    serve.add_argument("--pool", type=int, default=0, metavar="N",
+                       help="keep N warm kernels for new and migrated sessions (without --files-root)")
+    serve.add_argument("--pool-autoscale", action="store_true",
+                       help="size the pool from the session arrival forecast, at least --pool")
+    serve.add_argument("--pool-max", type=int, default=16, metavar="N",
+                       help="most warm kernels an autoscaled pool keeps")
+
+    migrate = commands.add_parser("migrate", help="move a session to another worker")
+    migrate.add_argument("--socket", required=True, help="the worker that owns the session")
+    migrate.add_argument("--session", required=True)
+    migrate.add_argument("--to", required=True, help="socket of the target worker")
+    migrate.add_argument("--timeout", type=float, default=30.0, help="seconds the whole move may take")
+
+    args = parser.parse_args(argv)
+    if args.command == "migrate":
+        reply = request(args.socket, {"type": MIGRATE_SESSION, "session_id": args.session,
+                                      "target": args.to, "timeout": args.timeout},
+                        timeout=args.timeout + 2 * REPLY_GRACE)
+        print(json.dumps(reply, indent=2))
+        sys.exit(0 if reply.get("ok") else 1)
+
+    factory = SimKernel if args.kernel == "sim" else CppKernel
+    wal = WriteAheadLog(args.wal) if args.wal else None
+    pool = None
+    if args.pool or args.pool_autoscale:
+        pool = KernelPool(factory, size=args.pool, autoscale=args.pool_autoscale,
+                          min_size=args.pool, max_size=max(args.pool, args.pool_max))
+        pool.start()
+    worker = SessionWorker(args.socket, RoutingTable(args.routing), factory, args.files_root,
+                           wal=wal, pool=pool)
+    try:
+        worker.serve()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        worker.close()
+
+
+if __name__ == "__main__":
+    main()
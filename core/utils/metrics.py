@@ -0,0 +1,223 @@
+# core/utils/metrics.py
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+class Histogram:
+
+    """HDR-style log-linear histogram of non-negative integer values.
+
+    Values below 2**sub_bucket_bits are counted exactly; above that each
+    power of two is split into 2**(sub_bucket_bits - 1) buckets, so the
+    relative error stays under 2**-(sub_bucket_bits - 1). Recording is a
+    couple of integer ops and a list increment, with no allocation.
+    `unit` scales recorded values on export (microseconds -> seconds).
+    """
+
+    def __init__(self, sub_bucket_bits=7, unit=1e-6):
+        self.sub_bits = sub_bucket_bits
+        self.half = 1 << (sub_bucket_bits - 1)
+        self.unit = unit
+        self.counts = [0] * ((65 - sub_bucket_bits) * self.half + (1 << sub_bucket_bits))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = int(value)
+        if value < 0:
+            value = 0
+
+        shift = value.bit_length() - self.sub_bits
+        if shift <= 0:
+            self.counts[value] += 1
+        else:
+            self.counts[shift * self.half + (value >> shift)] += 1
+
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def record_ns(self, ns):
+        self.record(ns // 1000)
+
+    def quantile(self, q):
+        """Lower bound of the bucket holding the q-th quantile, in units."""
+        if not self.count:
+            return 0.0
+
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self._lower(index), self.max) * self.unit
+        return self.max * self.unit
+
+    def snapshot(self):
+        snap = {f"p{q * 100:g}": self.quantile(q) for q in QUANTILES}
+        snap.update({
+            "count": self.count,
+            "sum": self.total * self.unit,
+            "max": self.max * self.unit
+        })
+        return snap
+
+    def _lower(self, index):
+        if index < (1 << self.sub_bits):
+            return index
+        shift = (index // self.half) - 1
+        return (index - shift * self.half) << shift
+
+
+class Counter:
+
+    """Monotonic counter."""
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, n=1):
+        self.value += n
+
+
+class MetricsRegistry:
+
+    """Named histograms, counters and stats collectors with text/JSON export."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._help = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name, help="", **labels):
+        return self._get(Histogram, name, help, labels)
+
+    def counter(self, name, help="", **labels):
+        return self._get(Counter, name, help, labels)
+
+    def register_collector(self, prefix, collect, **labels):
+        """Export collect() -> {key: number} as gauges named prefix_key."""
+        with self._lock:
+            self._collectors.append((prefix, collect, _label_key(labels)))
+
+    def unregister_collector(self, collect):
+        with self._lock:
+            self._collectors = [c for c in self._collectors if c[1] is not collect]
+
+    def to_json(self):
+        out = {}
+        for name, labels, metric in self._items():
+            key = name + _format_labels(labels)
+            if isinstance(metric, Histogram):
+                out[key] = metric.snapshot()
+            else:
+                out[key] = metric.value
+        for name, labels, value in self._collected():
+            out[name + _format_labels(labels)] = value
+        return json.dumps(out, sort_keys=True)
+
+    def to_prometheus(self):
+        lines = []
+        typed = set()
+
+        for name, labels, metric in self._items():
+            if name not in typed:
+                typed.add(name)
+                kind = "summary" if isinstance(metric, Histogram) else "counter"
+                lines.append(f"# HELP {name} {self._help.get(name, '')}")
+                lines.append(f"# TYPE {name} {kind}")
+
+            if isinstance(metric, Histogram):
+                for q in QUANTILES:
+                    q_labels = labels + (("quantile", str(q)),)
+                    lines.append(f"{name}{_format_labels(q_labels)} {metric.quantile(q):.9g}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.total * metric.unit:.9g}")
+                lines.append(f"{name}_count{_format_labels(labels)} {metric.count}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+
+        for name, labels, value in self._collected():
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name}{_format_labels(labels)} {value:.9g}")
+
+        return "\n".join(lines) + "\n"
+
+    # ---- internal helpers ----
+
+    def _get(self, cls, name, help, labels):
+        key = (name, _label_key(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = cls()
+                    if help:
+                        self._help[name] = help
+        return metric
+
+    def _items(self):
+        with self._lock:
+            items = sorted(self._metrics.items())
+        return [(name, labels, metric) for (name, labels), metric in items]
+
+    def _collected(self):
+        with self._lock:
+            collectors = list(self._collectors)
+
+        for prefix, collect, labels in collectors:
+            for key, value in collect().items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield f"{prefix}_{key}", labels, value
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+# Process-wide registry used by the kernel, manager and session hot paths.
+REGISTRY = MetricsRegistry()
+
+
+def serve_metrics(host="127.0.0.1", port=9100, registry=REGISTRY):
+    """Serve /metrics (Prometheus text) and /metrics.json on a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                body, content_type = registry.to_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                body, content_type = registry.to_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+
+            data = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
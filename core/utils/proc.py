@@ -0,0 +1,139 @@
+# core/utils/proc.py
+#
+# Cheap readers for Linux /proc. Every function returns zeros or None
+# instead of raising when the process is gone or /proc is unavailable.
+
+import os
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def rss_bytes(pid):
+    """Resident set size of a process from /proc, or 0 if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def peak_rss_bytes(pid):
+    """High-water RSS of a process (VmHWM), or 0 if unavailable."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def descendants(pid):
+    """Pids of every live process below pid, from a scan of /proc."""
+    parents = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rpartition(")")[2].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+
+    found, stack = [], [pid]
+    while stack:
+        children = parents.get(stack.pop(), [])
+        found += children
+        stack += children
+    return found
+
+
+def kernel_rss_bytes(kernel):
+    """rss_bytes() of a kernel's subprocess (0 for kernels without one)."""
+    process = getattr(kernel, "process", None)
+    if process is None:
+        return 0
+    return rss_bytes(process.pid)
+
+
+def statm(pid):
+    """(virtual, resident, shared) bytes from /proc/<pid>/statm."""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            size, resident, shared = f.read().split()[:3]
+    except (OSError, ValueError):
+        return 0, 0, 0
+    return int(size) * PAGE_SIZE, int(resident) * PAGE_SIZE, int(shared) * PAGE_SIZE
+
+
+def cpu_seconds(pid):
+    """User plus system CPU time of a process from /proc/<pid>/stat."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces; fields resume after ")".
+            fields = f.read().rpartition(")")[2].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+
+
+def smaps_rollup(pid):
+    """Copy-on-write aware footprint: PSS splits shared pages between
+    sharers, USS counts pages private to this process. Walks the page
+    tables, so it costs more than statm."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if value.strip().endswith("kB"):
+                    fields[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+
+    return {
+        "rss_bytes": fields.get("Rss", 0),
+        "pss_bytes": fields.get("Pss", 0),
+        "uss_bytes": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    }
+
+
+def memory_pressure():
+    """PSI memory stall percentages, e.g. {"some_avg10": 1.5, "full_avg10": 0.2,
+    ...}, or None where the kernel lacks /proc/pressure."""
+    pressure = {}
+    try:
+        with open("/proc/pressure/memory") as f:
+            for line in f:
+                kind, *pairs = line.split()
+                for pair in pairs:
+                    key, _, value = pair.partition("=")
+                    if key.startswith("avg"):
+                        pressure[f"{kind}_{key}"] = float(value)
+    except OSError:
+        return None
+    return pressure
+
+
+def meminfo():
+    """{"total_bytes", "available_bytes"} from /proc/meminfo."""
+    info = {}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("MemTotal", "MemAvailable"):
+                    info[key] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return {"total_bytes": info.get("MemTotal", 0), "available_bytes": info.get("MemAvailable", 0)}
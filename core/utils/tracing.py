@@ -0,0 +1,110 @@
+# core/utils/tracing.py
+
+import json
+import os
+import random
+import threading
+from collections import deque
+
+# The active tracer, or None. Hot paths check this before doing anything,
+# so nothing is allocated while tracing is off.
+TRACER = None
+
+
+class Trace:
+
+    """Spans recorded for one execute_request."""
+
+    __slots__ = ("session_id", "request_id", "spans")
+
+    def __init__(self, session_id, request_id):
+        self.session_id = session_id
+        self.request_id = request_id
+        self.spans = []
+
+    def span(self, name, start_ns, end_ns):
+        """Add a span from perf_counter_ns() stamps."""
+        self.spans.append((name, start_ns, end_ns))
+
+
+class Tracer:
+
+    """Sampled execution traces kept in a ring buffer.
+
+    Completed traces are exported as Chrome trace-event JSON (loadable in
+    Perfetto or chrome://tracing), one track per session.
+    """
+
+    def __init__(self, capacity=4096, sample_rate=1.0, seed=None):
+        self.sample_rate = sample_rate
+        self._traces = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+
+        self.started = 0
+        self.sampled_out = 0
+
+    def start(self, session_id, request_id):
+        """Begin a trace, or return None if this request is not sampled."""
+        if self.sample_rate < 1.0 and self._random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return None
+        self.started += 1
+        return Trace(session_id, request_id)
+
+    def finish(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def traces(self):
+        with self._lock:
+            return list(self._traces)
+
+    def export_chrome(self):
+        """Return the buffered traces as a Chrome trace-event dict."""
+        pid = os.getpid()
+        tids = {}
+        events = []
+
+        for trace in self.traces():
+            tid = tids.get(trace.session_id)
+            if tid is None:
+                tid = tids[trace.session_id] = len(tids) + 1
+                events.append({
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": trace.session_id}
+                })
+
+            args = {"session_id": trace.session_id, "request_id": trace.request_id}
+            for name, start_ns, end_ns in trace.spans:
+                events.append({
+                    "name": name,
+                    "cat": "execute",
+                    "ph": "X",
+                    "ts": start_ns / 1000,
+                    "dur": max(end_ns - start_ns, 0) / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args
+                })
+
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome(self, path):
+        with open(path, "w") as f:
+            json.dump(self.export_chrome(), f)
+
+
+def enable_tracing(capacity=4096, sample_rate=1.0, seed=None):
+    """Install and return a process-wide tracer."""
+    global TRACER
+    TRACER = Tracer(capacity, sample_rate, seed)
+    return TRACER
+
+
+def disable_tracing():
+    global TRACER
+    TRACER = None
@@ -0,0 +1,46 @@
+# tests/test_adaptive_timeout.py
+#
+# Limits learned for timeout="auto": per cell and code, clamped, and
+# raised by runs that timed out.
+
+from core.session.adaptive_timeout import AdaptiveTimeout, cell_key
+
+
+def test_default_is_clamped_to_the_bounds():
+    assert AdaptiveTimeout(min_timeout=5.0, default=3.0).limits("c")[:2] == (2.5, 5.0)
+    assert AdaptiveTimeout(max_timeout=2.0, default=3.0).limits("c")[:2] == (1.0, 2.0)
+
+
+def test_limits_follow_the_cells_runtime():
+    timeouts = AdaptiveTimeout()
+    for _ in range(5):
+        timeouts.observe("fast", 0.01)
+        timeouts.observe("slow", 2.0)
+
+    soft, hard, typical = timeouts.limits("slow")
+    assert abs(typical - 2.0) < 1e-6
+    assert soft <= hard / 2
+    assert hard == 10.0
+    assert timeouts.limits("fast")[1] == timeouts.min_timeout
+
+
+def test_edited_cell_is_a_new_cell():
+    assert cell_key("int a = 1;", "c1") == cell_key("  int a = 1;\n", "c1")
+    assert cell_key("int a = 1;", "c1") != cell_key("int a = 2;", "c1")
+    assert cell_key("int a = 1;", "c1") != cell_key("int a = 1;", "c2")
+
+
+def test_timeouts_raise_the_limit_toward_max():
+    timeouts = AdaptiveTimeout(max_timeout=60.0)
+    for _ in range(5):
+        timeouts.observe("other", 0.01)
+
+    limits = []
+    for _ in range(6):
+        hard = timeouts.limits("heavy")[1]
+        limits.append(hard)
+        timeouts.observe("heavy", hard, "timeout")
+
+    assert limits == sorted(limits) and limits[0] < limits[-1] == 60.0
+    # The session sketch, which unseen cells use, did not learn them.
+    assert timeouts.limits("new")[1] == timeouts.min_timeout
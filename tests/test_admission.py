@@ -0,0 +1,91 @@
+# tests/test_admission.py
+#
+# Admission control: rate and concurrency limits, and overload detection
+# that stays on while the queues are stuck.
+
+import time
+
+import pytest
+
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.fast_messages import ExecuteRequestMessage
+from core.session.admission import AdmissionController, AdmissionRejected
+from core.session.notebook_session import NotebookSession
+from core.session.scheduler import ExecutionScheduler
+
+
+@pytest.fixture
+def admission():
+    controllers = []
+
+    def make(**options):
+        controllers.append(AdmissionController(**options))
+        return controllers[-1]
+
+    yield make
+    for controller in controllers:
+        controller.close()
+
+
+def test_session_rate_is_limited(admission):
+    controller = admission(session_rate=1.0, session_burst=2)
+    controller.admit("s1")
+    controller.admit("s1")
+
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit("s1")
+    assert e.value.error_type == "rate_limited"
+    assert 0.5 < e.value.retry_after <= 1.0
+    controller.admit("s2")
+
+
+def test_session_concurrency_is_capped(admission):
+    controller = admission(session_concurrency=1)
+    ticket = controller.admit("s1")
+
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit("s1")
+    assert e.value.reason == "session_concurrency"
+
+    controller.release(ticket)
+    controller.admit("s1")
+
+
+def test_stuck_queue_counts_as_overload(admission):
+    controller = admission(target_delay=0.02, interval=0.05)
+    running = controller.admit("s1")
+    controller.started(running)
+    controller.admit("s2")
+    time.sleep(0.1)
+
+    assert controller.overloaded()
+    with pytest.raises(AdmissionRejected) as e:
+        controller.admit("s3")
+    assert e.value.error_type == "overloaded"
+    assert e.value.retry_after >= 0.1
+
+
+def test_idle_node_is_not_overloaded(admission):
+    controller = admission(target_delay=0.02, interval=0.05)
+    ticket = controller.admit("s1")
+    controller.release(ticket)
+    time.sleep(0.1)
+
+    assert not controller.overloaded()
+    controller.admit("s1")
+
+
+def test_scheduler_answers_rejections_with_retry_after(admission):
+    session = NotebookSession(session_id="s1", kernel_factory=SimKernel)
+    try:
+        scheduler = ExecutionScheduler(session, admission=admission(session_concurrency=1))
+        replies = []
+        for request_id in ("r0", "r1"):
+            request = ExecuteRequestMessage(request_id, "s1", "cpp", "int x = 0; //sim: sleep=0.3", timeout=10)
+            scheduler.submit(request, replies.append)
+
+        assert replies[0]["request_id"] == "r1"
+        assert replies[0]["error_type"] == "rate_limited"
+        assert replies[0]["retry_after"] > 0
+    finally:
+        session.close()
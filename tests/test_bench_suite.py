@@ -0,0 +1,39 @@
+# tests/test_bench_suite.py
+#
+# Baseline comparison and run aggregation of the benchmark suite.
+
+import os
+import subprocess
+
+from core.bench.suite import ChildRss, compare, median_metrics
+
+
+def test_medians_ignore_an_outlier_run():
+    runs = [{"cells_per_sec": 100.0, "latency_seconds_p50": 0.01},
+            {"cells_per_sec": 10.0, "latency_seconds_p50": 0.50},
+            {"cells_per_sec": 110.0, "latency_seconds_p50": 0.02, "kernel_max_rss_kb": 900}]
+
+    assert median_metrics(runs) == {"cells_per_sec": 100.0, "latency_seconds_p50": 0.02,
+                                    "kernel_max_rss_kb": 900}
+
+
+def test_thresholds_apply_per_metric():
+    baseline = {"tiny_cells": {"cells_per_sec": 100.0, "latency_seconds_p99": 1.0,
+                               "kernel_max_rss_kb": 1000}}
+    results = {"tiny_cells": {"cells_per_sec": 85.0, "latency_seconds_p99": 1.4,
+                              "kernel_max_rss_kb": 1150}}
+
+    regressions = compare(results, baseline, 0.2)
+    assert [metric for _, metric, *_ in regressions] == ["kernel_max_rss_kb"]
+
+    regressions = compare(results, baseline, 0.1, {"_p99": 0.3, "latency_seconds_p99": 0.5})
+    assert [metric for _, metric, *_ in regressions] == ["cells_per_sec", "kernel_max_rss_kb"]
+
+
+def test_child_rss_samples_running_children():
+    with ChildRss(interval=0.01) as children:
+        process = subprocess.Popen(["sleep", "0.3"])
+        process.wait()
+
+    if os.path.isdir("/proc"):
+        assert children.peak_kb > 0
@@ -0,0 +1,57 @@
+# tests/test_cpp_kernel.py
+#
+# stderr must end with its own cell: the kernel reads it until the
+# end-of-cell marker, never just whatever had arrived by the prompt.
+
+import pathlib
+import sys
+import textwrap
+
+from core.kernel.cpp_kernel import CppKernel
+from core.kernel.sim_kernel import SimKernel
+
+# A REPL answering like Cling: runs sim directives and the marker cell.
+FAKE_CLING = textwrap.dedent("""
+    import sys
+    sys.path.insert(0, {root!r})
+    from core.kernel import sim_cling
+    args = sim_cling.argparse.Namespace(crash_rate=0, hang_rate=0, stderr_rate=0, output_bytes=0)
+    rng = sim_cling.random.Random(0)
+    sys.stdout.write(sim_cling.PROMPT)
+    sys.stdout.flush()
+    for line in sys.stdin:
+        if "fputs" in line:
+            sys.stderr.write(sim_cling.DONE_MARKER)
+        elif not line.startswith("#include"):
+            sim_cling.run_cell(line, args, lambda rng: 0.0, rng)
+        sys.stderr.flush()
+        sys.stdout.write(sim_cling.PROMPT)
+        sys.stdout.flush()
+""")
+
+
+def _stress(kernel, cells=500):
+    kernel.start()
+    try:
+        for i in range(cells):
+            if i % 2:
+                result = kernel.execute(f"//sim: print=clean{i}")
+                assert result == {"stdout": f"clean{i}\n", "stderr": "", "status": "ok"}
+            else:
+                result = kernel.execute(f"//sim: err=100 print=hi{i}")
+                assert result["status"] == "error"
+                assert result["stdout"] == f"hi{i}\n"
+                assert len(result["stderr"]) == 100
+    finally:
+        kernel.shutdown()
+
+
+def test_stderr_stays_with_its_cell():
+    _stress(SimKernel())
+
+
+def test_stderr_stays_with_its_cell_with_marker_cell(tmp_path):
+    script = tmp_path / "fake_cling.py"
+    script.write_text(FAKE_CLING.format(root=str(pathlib.Path(__file__).resolve().parent.parent)))
+    _stress(CppKernel([sys.executable, str(script)]))
+
@@ -0,0 +1,65 @@
+# tests/test_dependency_graph.py
+#
+# Def-use analysis of cells and the re-run set after an edit.
+
+from core.kernel.sim_kernel import SimKernel
+from core.session.dependency_graph import DependencyGraph, analyze_cell
+from core.session.notebook_session import NotebookSession
+
+
+def test_declarations_assignments_and_uses():
+    info = analyze_cell('#include <vector>\nint a = b + 1, c;\nstruct P { int x; };\nd = a; // e = 1\nputs("f");')
+
+    assert info.defs == {"a", "c", "P"}
+    assert info.mutates == {"d"}
+    assert info.uses == {"b", "d", "x"}
+    assert info.includes == ["vector"]
+    assert not info.reads_all and not info.pure
+
+
+def test_calls_are_opaque_and_output_is_pure():
+    assert analyze_cell("fill(v, n);").mutates == {"fill", "v", "n"}
+    assert analyze_cell("std::cout << a << std::endl;").pure
+    assert analyze_cell("int (*fp)(int) = f;").defs == {"fp"}
+    assert analyze_cell("int *;").reads_all
+
+
+def test_affected_follows_transitive_dependents():
+    graph = DependencyGraph()
+    graph.update("c1", "int a = 1;")
+    graph.update("c2", "int b = a + 1;")
+    graph.update("c3", "int unrelated = 0;")
+    graph.update("c4", "std::cout << b;")
+
+    assert graph.dependencies() == {"c1": set(), "c2": {"c1"}, "c3": set(), "c4": {"c2"}}
+    assert graph.affected("c1") == ["c1", "c2", "c4"]
+    assert graph.affected("c3") == ["c3"]
+    assert graph.affected("missing") == []
+
+
+def test_affected_includes_readers_of_a_dropped_name():
+    graph = DependencyGraph()
+    graph.update("c1", "int a = 1;")
+    graph.update("c2", "int other = 0;")
+    graph.update("c3", "std::cout << a;")
+
+    previous = graph.update("c1", "int renamed = 1;")
+    assert graph.affected("c1", previous) == ["c1", "c3"]
+
+
+def test_run_affected_reruns_dependents_and_stops_on_failure():
+    session = NotebookSession(session_id="s1", kernel_factory=SimKernel)
+    try:
+        session.run_cell("int a = 1;", cell_id="c1")
+        session.run_cell("int b = a; //sim: print=b", cell_id="c2")
+        session.run_cell("int c = 0; //sim: print=c", cell_id="c3")
+
+        output = []
+        results = session.run_affected("c1", "int a = 2;", on_output=lambda stream, data: output.append(data))
+        assert [(cell, result["status"]) for cell, result in results] == [("c1", "ok"), ("c2", "ok")]
+        assert "b" in "".join(output)
+
+        results = session.run_affected("c1", "int a = 3; //sim: sleep=5", timeout=0.3)
+        assert [(cell, result["status"]) for cell, result in results] == [("c1", "timeout")]
+    finally:
+        session.close()
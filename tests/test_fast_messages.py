@@ -0,0 +1,64 @@
+# tests/test_fast_messages.py
+#
+# Hot-path message validation: batch errors carry their index, and bytes
+# payloads are checked at validation but decoded only when read.
+
+import pytest
+
+from core.protocol.fast_messages import (
+    ExecuteRequestMessage, ExecuteResponseMessage, MessageValidationError, parse_requests,
+    validate_requests
+)
+
+
+def _request(**fields):
+    message = {"type": "execute_request", "request_id": "r1", "session_id": "s1",
+               "language": "cpp", "code": "int x = 1;"}
+    message.update(fields)
+    return message
+
+
+@pytest.mark.parametrize("code", [b"int x = 1;", "int é = 1;".encode(), bytearray(b"int x;"),
+                                  memoryview("// 𝄞".encode())])
+def test_bytes_payloads_decode_lazily(code):
+    message = ExecuteRequestMessage.validate(_request(code=code))
+
+    assert type(message._code) is not str
+    assert message.code == bytes(code).decode("utf-8")
+    assert type(message._code) is str
+
+
+@pytest.mark.parametrize("code", [b"\xff", b"caf\xc3", b"\xc0\x80", b"\xed\xa0\x80", b"\xf4\x90\x80\x80"])
+def test_invalid_utf8_fails_validation(code):
+    with pytest.raises(MessageValidationError, match="UTF-8"):
+        ExecuteRequestMessage.validate(_request(code=code))
+
+
+def test_batch_errors_name_the_message():
+    with pytest.raises(MessageValidationError) as e:
+        validate_requests([_request(), _request(timeout="soon")])
+    assert e.value.index == 1
+    assert str(e.value).startswith("message 1:")
+
+
+@pytest.mark.parametrize("timeout", [None, 3, 2.5, "auto"])
+def test_timeouts(timeout):
+    assert ExecuteRequestMessage.validate(_request(timeout=timeout)).timeout == timeout
+
+
+@pytest.mark.parametrize("session_id", ["../s", "a/b", "", "x" * 65, 7])
+def test_malformed_session_ids_are_rejected(session_id):
+    with pytest.raises(MessageValidationError, match="session_id"):
+        ExecuteRequestMessage.validate(_request(session_id=session_id))
+
+
+def test_parse_requests_accepts_object_or_array():
+    assert len(parse_requests('{"type": "execute_request", "request_id": "r1", "session_id": "s1", '
+                              '"language": "cpp", "code": ""}')) == 1
+    assert parse_requests("[]") == []
+
+
+def test_response_round_trip():
+    response = ExecuteResponseMessage.from_result("r1", 2, {"status": "ok", "stdout": "1\n", "stderr": ""})
+    again = ExecuteResponseMessage.validate(response.to_dict())
+    assert again.to_dict() == response.to_dict()
@@ -0,0 +1,98 @@
+# tests/test_frontend.py
+#
+# The front end relays client messages to the owning worker. Workers here
+# are small asyncio servers on UNIX sockets.
+
+import asyncio
+import json
+
+from core.session.frontend import FrontEnd
+from core.session.routing import RoutingTable
+
+
+def _execute(session_id, request_id):
+    return {"type": "execute_request", "request_id": request_id, "session_id": session_id,
+            "language": "cpp", "code": "int x = 1;"}
+
+
+def _answering(received):
+    # A worker that answers every execute_request with an ok response.
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            message = json.loads(line)
+            received.append(message)
+            writer.write((json.dumps({"type": "execute_response", "request_id": message["request_id"],
+                                      "execution_count": 1, "status": "ok", "stdout": "", "stderr": ""})
+                          + "\n").encode("utf-8"))
+            await writer.drain()
+    return handle
+
+
+async def _crashing(reader, writer):
+    # A worker that dies after reading one request.
+    await reader.readline()
+    writer.close()
+
+
+def _run(tmp_path, workers, messages, replies):
+    """Serve workers {name: handler}, send messages through a front end and
+    return the first `replies` lines it sends back."""
+    routing = RoutingTable(str(tmp_path / "routes.json"))
+
+    async def main():
+        servers = []
+        for name, handler in workers.items():
+            path = str(tmp_path / f"{name}.sock")
+            routing.register_worker(path)
+            if handler is not None:
+                servers.append(await asyncio.start_unix_server(handler, path))
+        frontend = FrontEnd(RoutingTable(routing.path))
+        server = await asyncio.start_server(frontend.handle, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.sockets[0].getsockname()[1])
+        for message in messages:
+            writer.write((json.dumps(message) + "\n").encode("utf-8"))
+        await writer.drain()
+        out = [json.loads(await asyncio.wait_for(reader.readline(), 10)) for _ in range(replies)]
+        writer.close()
+        server.close()
+        for s in servers:
+            s.close()
+        return out
+
+    return routing, asyncio.run(main())
+
+
+def test_worker_messages_are_not_relayed(tmp_path):
+    received = []
+    messages = [
+        {"type": "drop_session", "session_id": "s1"},
+        {"type": "migrate_session", "session_id": "s1", "target": "/tmp/elsewhere.sock"},
+        {"type": "import_session", "session_id": "s1", "cells": []},
+        {"type": "execute_request", "request_id": "r1", "session_id": "../s1", "language": "cpp", "code": ""},
+        _execute("s1", "r2"),
+    ]
+    _, replies = _run(tmp_path, {"w1": _answering(received)}, messages, 5)
+
+    assert [r.get("error_type") for r in replies[:4]] == ["invalid_message"] * 4
+    assert replies[4]["status"] == "ok"
+    assert [m["request_id"] for m in received] == ["r2"]
+
+
+def test_pending_requests_fail_when_the_worker_goes_away(tmp_path):
+    routing = RoutingTable(str(tmp_path / "routes.json"))
+    routing.assign("s1", str(tmp_path / "w1.sock"))
+    _, replies = _run(tmp_path, {"w1": _crashing}, [_execute("s1", "r1")], 1)
+
+    assert replies[0]["error_type"] == "worker_unavailable"
+    assert replies[0]["request_id"] == "r1"
+
+
+def test_sessions_of_a_dead_owner_are_placed_again(tmp_path):
+    received = []
+    routing = RoutingTable(str(tmp_path / "routes.json"))
+    routing.assign("s1", str(tmp_path / "dead.sock"))
+    routing, replies = _run(tmp_path, {"dead": None, "live": _answering(received)},
+                            [_execute("s1", "r1")], 1)
+
+    assert replies[0]["status"] == "ok"
+    assert routing.lookup("s1") == str(tmp_path / "live.sock")
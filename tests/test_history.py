@@ -0,0 +1,66 @@
+# tests/test_history.py
+#
+# Compaction of a session's history into the shortest replay script.
+
+import pytest
+
+from core.session.history import History
+
+
+def _history(*cells):
+    history = History()
+    for code, seconds, status in cells:
+        history.record(code, seconds, status)
+    return history
+
+
+def test_compaction_drops_dead_pure_and_failed_cells():
+    history = _history(
+        ("#include <vector>\nint a = 1;", 1.0, "ok"),
+        ("std::cout << a;", 0.5, "ok"),
+        ("int b = 2;", 1.0, "ok"),
+        ("int b = 3;", 1.0, "ok"),
+        ("int broken = ;", 1.0, "error"),
+        ("int c = b + a;", 1.0, "ok"),
+        ("#include <vector>\n#include <map>", 0.1, "ok"),
+        ("void f() {\n    c++;\n}", 1.0, "ok")
+    )
+
+    assert history.compact() == [
+        ("#include <vector>", 0.0),
+        ("#include <map>", 0.0),
+        ("int a = 1; int b = 3; int c = b + a;", 3.0),
+        ("void f() {\n    c++;\n}", 1.0)
+    ]
+
+    stats = history.stats()
+    assert stats["cells"] == 8 and stats["replay_cells"] == 4
+    assert stats["history_seconds"] == pytest.approx(5.6)
+    assert stats["saved_seconds"] == pytest.approx(1.6)
+
+
+def test_a_cell_read_before_redefinition_is_kept():
+    history = _history(
+        ("int n = 1;", 0.0, "ok"),
+        ("int m = n;", 0.0, "ok"),
+        ("int n = 2;", 0.0, "ok")
+    )
+    assert history.replay_cells() == ["int n = 1; int m = n; int n = 2;"]
+
+
+def test_an_unparsed_cell_keeps_everything_before_it():
+    history = _history(
+        ("int x = 1;", 0.0, "ok"),
+        ("int *;", 0.0, "ok"),
+        ("int x = 2;", 0.0, "ok")
+    )
+    assert len(history.replay_cells()[0].split(";")) == 4
+
+
+def test_comments_and_directives_are_not_merged():
+    history = _history(
+        ("int a = 1; // one", 0.0, "ok"),
+        ("int b = 2;", 0.0, "ok"),
+        ("#define N 3", 0.0, "ok")
+    )
+    assert history.replay_cells() == ["int a = 1; // one", "int b = 2;", "#define N 3"]
@@ -0,0 +1,53 @@
+# tests/test_idempotency.py
+#
+# Retries of a request_id: attached to the running execution, answered
+# from the cache once it finished, and never given a second execution.
+
+import threading
+import time
+
+from core.session.idempotency import IdempotencyCache
+
+
+def test_retry_waits_for_the_running_execution():
+    cache = IdempotencyCache()
+    _, owner = cache.claim("r1")
+    retry, retry_owner = cache.claim("r1")
+    assert owner and not retry_owner
+
+    threading.Timer(0.05, cache.complete, ("r1", {"status": "ok"})).start()
+    assert cache.wait(retry, timeout=5) == {"status": "ok"}
+    assert cache.claim("r1")[1] is False
+    assert cache.stats()["hits_inflight"] == 1 and cache.stats()["hits_completed"] == 1
+
+
+def test_in_flight_entries_survive_the_cap():
+    cache = IdempotencyCache(max_entries=2)
+    cache.claim("running")
+    for i in range(5):
+        cache.claim(f"r{i}")
+        cache.complete(f"r{i}", {"status": "ok"})
+
+    assert cache.claim("running")[1] is False
+    cache.complete("running", {"status": "ok"})
+    entry, owner = cache.claim("running")
+    assert not owner and entry.response == {"status": "ok"}
+    assert cache.claim("r0")[1] is True
+
+
+def test_completed_entries_expire():
+    cache = IdempotencyCache(ttl=0.05)
+    cache.claim("r1")
+    cache.complete("r1", {"status": "ok"})
+    time.sleep(0.1)
+    assert cache.claim("r1")[1] is True
+
+
+def test_abandoned_request_runs_again():
+    cache = IdempotencyCache()
+    _, owner = cache.claim("r1")
+    retry, _ = cache.claim("r1")
+    cache.abandon("r1")
+
+    assert cache.wait(retry, timeout=5) is None
+    assert cache.claim("r1")[1] is True
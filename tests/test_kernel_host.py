@@ -0,0 +1,85 @@
+# tests/test_kernel_host.py
+#
+# Kernels owned by the host daemon: reattaching by id, executions that
+# outlive the gateway connection, renames and dead kernels.
+
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from core.kernel.base_kernel import KernelDied
+from core.kernel.kernel_host import KernelHost
+from core.kernel.remote_kernel import RemoteKernel, _ping
+
+
+@pytest.fixture
+def host(tmp_path):
+    host = KernelHost(str(tmp_path / "host.sock"))
+    threading.Thread(target=host.serve, daemon=True).start()
+    deadline = time.monotonic() + 5
+    while not _ping(host.path):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    yield host
+    host.close()
+
+
+def _kernel(host, kernel_id="k1"):
+    kernel = RemoteKernel(host.path, kernel_id, kind="sim", spawn=False)
+    kernel.start()
+    return kernel
+
+
+def test_a_restarted_gateway_reattaches_by_id(host):
+    kernel = _kernel(host)
+    assert not kernel.reattached
+    assert kernel.execute("//sim: print=hi") == {"stdout": "hi\n", "stderr": "", "status": "ok"}
+    pid = kernel.process.pid
+    kernel.detach()
+
+    again = _kernel(host)
+    assert again.reattached and again.process.pid == pid
+    assert again.describe()["cells"] == 1
+    again.shutdown()
+    assert again.describe() is None
+
+
+def test_execution_outlives_the_connection(host):
+    kernel = _kernel(host)
+    request = {"op": "execute", "kernel_id": "k1", "request_id": "r1", "code": "//sim: sleep=0.2 print=done"}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+        conn.connect(host.path)
+        conn.sendall((json.dumps(request) + "\n").encode("utf-8"))
+
+    output = []
+    result = kernel.resume("r1", 0, lambda stream, data: output.append(data))
+    assert result["stdout"] == "done\n" and output == ["done\n"]
+    assert kernel.describe()["last_request"] == "r1"
+
+    with pytest.raises(RuntimeError, match="Unknown request"):
+        kernel.resume("missing")
+
+
+def test_rename_replaces_the_kernel_holding_the_id(host):
+    primary = _kernel(host, "primary")
+    standby = _kernel(host, "standby")
+
+    standby.rename("primary")
+    assert standby.kernel_id == "primary"
+    assert [k["kernel_id"] for k in standby._call({"op": "list"})["kernels"]] == ["primary"]
+    assert _kernel(host, "primary").process.pid == standby.process.pid
+    assert primary.describe()["pid"] == standby.process.pid
+
+
+def test_a_dead_kernel_is_restarted_on_the_next_start(host):
+    kernel = _kernel(host)
+    with pytest.raises(KernelDied):
+        kernel.execute("//sim: crash")
+    assert not kernel.is_alive()
+
+    again = _kernel(host)
+    assert not again.reattached and again.is_alive()
+    assert again.execute("//sim: print=back")["stdout"] == "back\n"
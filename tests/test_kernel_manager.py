@@ -0,0 +1,87 @@
+# tests/test_kernel_manager.py
+#
+# The recycle policy: background replacements swapped in between cells,
+# and the backoff after a replacement that cannot help.
+
+import time
+
+from core.kernel.kernal_manager import RECYCLE_BACKOFF, KernelManager
+from core.kernel.sim_kernel import SimKernel
+
+
+def _wait(predicate, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def _run(manager, code):
+    result = manager.execute(code)
+    if result["status"] == "ok":
+        manager.mirror(code)
+    return result
+
+
+def test_recycle_after_swaps_in_a_caught_up_replacement():
+    manager = KernelManager(SimKernel, recycle_after=3)
+    try:
+        first = manager.kernel
+        for i in range(3):
+            _run(manager, f"int x{i} = {i};")
+        replacement = manager._replacement
+        assert replacement is not None and replacement.niceness == 0
+        _wait(lambda: replacement.stats()["ready"])
+
+        assert _run(manager, "//sim: print=after")["stdout"] == "after\n"
+        assert manager.kernel is not first and manager._replacement is None
+        assert manager.cells_run == 1 and replacement.stats()["mirrored"] == 3
+    finally:
+        manager.shutdown()
+
+
+def test_diverged_replacement_is_dropped_and_backs_off():
+    manager = KernelManager(SimKernel, recycle_after=2, replay_cells=lambda: ["//sim: err=10"])
+    try:
+        first = manager.kernel
+        _run(manager, "int a = 1;")
+        _run(manager, "int b = 2;")
+        replacement = manager._replacement
+        _wait(lambda: replacement.diverged)
+
+        _run(manager, "int c = 3;")
+        assert manager.kernel is first and manager._replacement is None
+        assert manager.recycle_failures == 1
+        assert manager._recycle_wait == RECYCLE_BACKOFF - 1
+    finally:
+        manager.shutdown()
+
+
+def test_replacement_over_recycle_rss_backs_off():
+    manager = KernelManager(SimKernel, recycle_rss=1)
+    try:
+        first = manager.kernel
+        _run(manager, "int a = 1;")
+        replacement = manager._replacement
+        _wait(lambda: replacement.stats()["ready"])
+
+        _run(manager, "int b = 2;")
+        assert manager.kernel is not first and manager.recycle_failures == 1
+        for _ in range(RECYCLE_BACKOFF - 1):
+            _run(manager, "//sim: print=x")
+        assert manager._replacement is None
+        _run(manager, "//sim: print=x")
+        assert manager._replacement is not None
+    finally:
+        manager.shutdown()
+
+
+def test_restart_resets_the_backoff():
+    manager = KernelManager(SimKernel, recycle_after=5)
+    try:
+        manager.recycle_failures, manager._recycle_wait = 2, 16
+        manager.restart_kernel()
+        assert manager.recycle_failures == 0 and manager._recycle_wait == 0
+        assert manager.history == []
+    finally:
+        manager.shutdown()
@@ -0,0 +1,63 @@
+# tests/test_kernel_pool.py
+#
+# Warm kernels: health-checked before they are handed out, sized from the
+# arrival forecast, and used for new sessions on a worker.
+
+import os
+import threading
+
+from core.kernel.kernel_pool import ArrivalForecast, KernelPool
+from core.kernel.sim_kernel import SimKernel
+from core.session.routing import RoutingTable
+from core.session.worker import SessionWorker, request
+
+
+def test_dead_idle_kernels_are_not_handed_out():
+    pool = KernelPool(SimKernel, size=2)
+    pool.start()
+    try:
+        assert pool.wait_ready(timeout=10)
+        for kernel in list(pool._idle):
+            kernel.shutdown()
+            kernel.process.wait()
+
+        kernel = pool.acquire()
+        assert kernel.is_alive()
+        assert kernel.execute("//sim: print=hi")["stdout"] == "hi\n"
+        kernel.shutdown()
+        assert pool.stats()["dead"] == 2 and pool.stats()["misses"] == 1
+    finally:
+        pool.close()
+
+
+def test_autoscaled_size_follows_arrivals():
+    forecast = ArrivalForecast(initial_latency=1.0)
+    pool = KernelPool(SimKernel, autoscale=True, min_size=1, max_size=8, interval=1.0, forecast=forecast)
+    with pool._cond:
+        assert pool._target() == 1
+        for rate in (2, 4, 6):
+            for _ in range(rate):
+                forecast.arrival()
+            forecast.tick(1.0)
+        assert 1 < pool._target() <= 8
+
+
+def test_new_sessions_start_in_pooled_kernels(tmp_path):
+    pool = KernelPool(SimKernel, size=1)
+    pool.start()
+    assert pool.wait_ready(timeout=10)
+    worker = SessionWorker(str(tmp_path / "w.sock"), RoutingTable(str(tmp_path / "routes.json")),
+                           SimKernel, pool=pool)
+    threading.Thread(target=worker.serve, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(worker.address):
+            break
+        threading.Event().wait(0.01)
+    try:
+        reply = request(worker.address, {"type": "execute_request", "request_id": "r1",
+                                         "session_id": "s1", "language": "cpp",
+                                         "code": "int x = 1;"}, timeout=10)
+        assert reply["status"] == "ok"
+        assert pool.stats()["hits"] == 1
+    finally:
+        worker.close()
@@ -0,0 +1,74 @@
+# tests/test_metrics.py
+#
+# The log-linear histogram's accuracy, and registry export over HTTP.
+
+import json
+import random
+import urllib.request
+
+import pytest
+
+from core.utils.metrics import Histogram, MetricsRegistry, serve_metrics
+
+
+def test_small_values_are_exact():
+    histogram = Histogram(unit=1)
+    for value in range(100):
+        histogram.record(value)
+
+    assert histogram.quantile(0.5) == 49
+    assert histogram.quantile(1.0) == 99
+    assert histogram.snapshot()["count"] == 100
+
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.99])
+def test_large_values_stay_within_relative_error(q):
+    rng = random.Random(0)
+    values = sorted(int(rng.lognormvariate(12, 2)) for _ in range(20000))
+    histogram = Histogram(unit=1)
+    for value in values:
+        histogram.record(value)
+
+    exact = values[int(q * len(values) + 0.5) - 1]
+    assert abs(histogram.quantile(q) - exact) <= exact * 2 ** -6
+
+
+def test_record_ns_stores_microseconds():
+    histogram = Histogram()
+    histogram.record_ns(2_500_000)
+    assert histogram.snapshot()["max"] == pytest.approx(0.0025)
+
+
+def test_export_formats():
+    registry = MetricsRegistry()
+    registry.counter("cells_total", "Cells run", kind="ok").inc(3)
+    registry.histogram("cell_seconds", "Cell time").record(1000)
+    stats = {"idle": 2, "name": "skipped"}
+    registry.register_collector("pool", lambda: stats, node="a")
+
+    text = registry.to_prometheus()
+    assert '# TYPE cells_total counter' in text
+    assert 'cells_total{kind="ok"} 3' in text
+    assert 'cell_seconds{quantile="0.5"} 0.001' in text
+    assert 'pool_idle{node="a"} 2' in text and "skipped" not in text
+
+    data = json.loads(registry.to_json())
+    assert data['cells_total{kind="ok"}'] == 3
+    assert data["cell_seconds"]["count"] == 1
+
+    registry.unregister_collector(registry._collectors[0][1])
+    assert "pool_idle" not in registry.to_prometheus()
+
+
+def test_metrics_endpoint():
+    registry = MetricsRegistry()
+    registry.counter("up").inc()
+    server = serve_metrics(port=0, registry=registry)
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(base + "/metrics", timeout=5) as response:
+            assert b"up 1" in response.read()
+        with urllib.request.urlopen(base + "/metrics.json", timeout=5) as response:
+            assert json.load(response) == {"up": 1}
+    finally:
+        server.shutdown()
@@ -0,0 +1,54 @@
+# tests/test_native_host.py
+#
+# Fork checkpoints on the native host, driven through NativeKernel with
+# the sim engine.
+
+import pytest
+
+from core.kernel.native_kernel import NativeKernel
+
+
+@pytest.fixture
+def kernel():
+    kernel = NativeKernel(engine="sim", max_checkpoints=3)
+    kernel.start()
+    yield kernel
+    kernel.shutdown()
+
+
+def _indexes(kernel):
+    return [c["index"] for c in kernel.checkpoints()["checkpoints"]]
+
+
+def test_a_checkpoint_per_successful_cell(kernel):
+    for _ in range(4):
+        assert kernel.execute("int x = 1;")["status"] == "ok"
+    assert kernel.execute("//sim: err=10")["status"] == "error"
+
+    report = kernel.checkpoints()
+    assert report["cells"] == 4
+    assert _indexes(kernel) == [2, 3, 4]
+    assert report["checkpoint_pss_bytes"] > 0
+
+
+def test_rollback_and_undo_resume_an_earlier_worker(kernel):
+    for _ in range(3):
+        kernel.execute("int x = 1;")
+    active = kernel.checkpoints()["active"]["pid"]
+
+    assert kernel.rollback(2) == {"restored": 2}
+    report = kernel.checkpoints()
+    assert report["cells"] == 2 and report["active"]["pid"] != active
+    assert _indexes(kernel) == [1, 2]
+
+    assert kernel.undo() == {"restored": 1}
+    result = kernel.execute("//sim: print=after")
+    assert result["status"] == "ok" and result["stdout"] == "after\n"
+    assert kernel.checkpoints()["cells"] == 2
+
+
+def test_rollback_to_a_missing_checkpoint_fails(kernel):
+    kernel.execute("int x = 1;")
+    with pytest.raises(RuntimeError, match="No checkpoint for cell 7"):
+        kernel.rollback(7)
+    assert kernel.checkpoints()["cells"] == 1
@@ -0,0 +1,69 @@
+# tests/test_output_coalescer.py
+#
+# Kernel output chunks merged into stream_output messages, and the two
+# ways of handling a connection that cannot keep up.
+
+import threading
+import time
+
+from core.session.output_coalescer import OutputCoalescer
+
+
+def _coalescer(**options):
+    sent = []
+    return OutputCoalescer(sent.append, "r1", **options), sent
+
+
+def _data(sent):
+    return [(message["stream"], message["data"]) for message in sent]
+
+
+def test_chunks_merge_per_stream():
+    coalescer, sent = _coalescer(window=10)
+    for chunk in ("a\n", "b\n", "c\n"):
+        coalescer.feed("stdout", chunk)
+    coalescer.feed("stderr", "oops\n")
+    coalescer.feed("stdout", "d\n")
+    coalescer.close()
+    coalescer.feed("stdout", "late\n")
+
+    assert _data(sent) == [("stdout", "a\nb\nc\n"), ("stderr", "oops\n"), ("stdout", "d\n")]
+    assert sent[0]["type"] == "stream_output" and sent[0]["request_id"] == "r1"
+    assert coalescer.stats.snapshot()["chunks_in"] == 5 and coalescer.stats.messages_out == 3
+
+
+def test_window_and_size_bound_a_message():
+    coalescer, sent = _coalescer(window=0.02, max_bytes=4)
+    coalescer.feed("stdout", "éé")
+    assert _data(sent) == [("stdout", "éé")]
+
+    coalescer.feed("stdout", "x")
+    time.sleep(0.1)
+    assert _data(sent)[-1] == ("stdout", "x")
+    coalescer.close()
+
+
+def test_tail_mode_keeps_the_end_of_the_output():
+    backlog = [2 << 20]
+    coalescer, sent = _coalescer(window=10, backlog=lambda: backlog[0], overflow="tail", tail_bytes=4)
+    for i in range(10):
+        coalescer.feed("stdout", f"{i}\n")
+        coalescer.flush()
+    coalescer.close()
+
+    assert _data(sent) == [("stdout", "[... 16 bytes omitted ...]\n8\n9\n")]
+    assert coalescer.stats.degraded == 1 and coalescer.stats.omitted_bytes == 16
+
+
+def test_pause_mode_blocks_the_reader_until_the_backlog_drains():
+    backlog = [2 << 20]
+    coalescer, sent = _coalescer(window=10, backlog=lambda: backlog[0], poll_interval=0.001)
+    threading.Timer(0.1, backlog.__setitem__, (0, 0)).start()
+
+    start = time.monotonic()
+    coalescer.feed("stdout", "x\n")
+    coalescer.close()
+
+    assert time.monotonic() - start >= 0.09
+    assert _data(sent) == [("stdout", "x\n")]
+    assert coalescer.stats.pauses == 1
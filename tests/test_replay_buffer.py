@@ -0,0 +1,89 @@
+# tests/test_replay_buffer.py
+#
+# Resumable streams: seq numbers, replay after a reconnect, gaps past the
+# retained window and the stored final response.
+
+from core.session.replay_buffer import ReplayStore
+
+
+def _output(data):
+    return {"type": "stream_output", "request_id": "r1", "stream": "stdout", "data": data}
+
+
+def _publish(store, count):
+    for i in range(count):
+        store.publish("r1", _output(f"{i}\n"))
+
+
+def test_messages_are_numbered_and_forwarded():
+    store, live = ReplayStore(), []
+    store.open("r1", live.append)
+    _publish(store, 3)
+
+    assert [m["seq"] for m in live] == [1, 2, 3]
+
+
+def test_resume_replays_after_last_seq_and_stays_subscribed():
+    store, first = ReplayStore(), []
+    store.open("r1", first.append)
+    _publish(store, 3)
+    store.detach("r1")
+    _publish(store, 1)
+
+    resumed = []
+    assert store.resume("r1", 2, resumed.append)
+    store.publish("r1", _output("live\n"))
+    store.finish("r1", {"type": "execute_response", "request_id": "r1"})
+
+    assert [m.get("seq") for m in resumed] == [3, 4, 5, None]
+    assert len(first) == 3
+
+
+def test_resume_past_the_window_reports_a_gap():
+    store = ReplayStore(max_messages=2)
+    store.open("r1")
+    _publish(store, 5)
+
+    resumed = []
+    store.resume("r1", 0, resumed.append)
+    assert resumed[0] == {"type": "stream_gap", "request_id": "r1", "from_seq": 1, "to_seq": 3}
+    assert [m["seq"] for m in resumed[1:]] == [4, 5]
+
+
+def test_finished_request_past_the_window_gets_its_response():
+    store = ReplayStore(max_messages=2)
+    store.open("r1")
+    _publish(store, 5)
+    response = {"type": "execute_response", "request_id": "r1"}
+    store.finish("r1", response)
+    store.publish("r1", _output("late\n"))
+
+    resumed = []
+    store.resume("r1", 0, resumed.append)
+    assert resumed == [response]
+
+
+def test_failing_subscriber_is_dropped_and_messages_kept():
+    store = ReplayStore()
+
+    def broken(message):
+        raise OSError("connection reset")
+
+    store.open("r1", broken)
+    _publish(store, 2)
+
+    resumed = []
+    store.resume("r1", 0, resumed.append)
+    assert [m["seq"] for m in resumed] == [1, 2]
+
+
+def test_finished_requests_are_evicted_first():
+    store = ReplayStore(max_requests=2)
+    store.open("running")
+    store.open("done")
+    store.finish("done", {"type": "execute_response", "request_id": "done"})
+    store.open("new")
+
+    assert not store.resume("done", 0, lambda m: None)
+    assert store.resume("running", 0, lambda m: None)
+    assert not store.finish("done", {})
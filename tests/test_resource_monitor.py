@@ -0,0 +1,98 @@
+# tests/test_resource_monitor.py
+#
+# Per-kernel sampling, and eviction of idle kernels under memory pressure.
+
+import time
+
+import pytest
+
+from core.kernel.kernal_manager import KernelManager
+from core.kernel.resource_monitor import ResourceMonitor
+from core.kernel.sim_kernel import SimKernel
+from core.utils.metrics import REGISTRY
+
+
+@pytest.fixture
+def managers():
+    managers = [KernelManager(SimKernel) for _ in range(3)]
+    yield managers
+    for manager in managers:
+        manager.shutdown()
+
+
+def _monitor(managers, **options):
+    monitor = ResourceMonitor(**options)
+    for i, manager in enumerate(managers):
+        monitor.register(manager, f"s{i}")
+    return monitor
+
+
+def _close(monitor, managers):
+    for manager in managers:
+        monitor.unregister(manager)
+    monitor.close()
+
+
+def test_samples_and_smaps_cadence(managers):
+    monitor = _monitor(managers[:1], smaps_every=2, available_watermark=0.0, pressure_watermark=101)
+    try:
+        node = monitor.sample()
+        first = monitor.sample_of(managers[0])
+        assert node["kernels"] == 1 and not node["under_pressure"]
+        assert first["running"] == 1 and first["rss_bytes"] > 0 and first["pss_bytes"] > 0
+
+        managers[0].execute("//sim: print=x")
+        monitor.sample()
+        second = monitor.sample_of(managers[0])
+        assert second["pss_bytes"] == first["pss_bytes"]
+        assert second["idle_seconds"] < first["idle_seconds"] + 1
+        assert 'kernel_rss_bytes{session="s0"}' in REGISTRY.to_prometheus()
+    finally:
+        _close(monitor, managers)
+
+    assert 'session="s0"' not in REGISTRY.to_prometheus()
+
+
+def test_pressure_evicts_the_largest_idle_kernel(managers):
+    monitor = _monitor(managers, available_watermark=2.0, min_idle=60)
+    try:
+        for manager in managers[1:]:
+            manager.last_active -= 120
+        monitor.sample()
+        evicted = [m for m in managers if m.kernel is None]
+        assert len(evicted) == 1 and evicted[0] is not managers[0]
+
+        # The evicted kernel comes back on the next cell.
+        assert evicted[0].execute("//sim: print=back")["stdout"] == "back\n"
+    finally:
+        _close(monitor, managers)
+
+
+def test_largest_rss_goes_first(managers):
+    monitor = _monitor(managers, min_idle=0)
+    try:
+        for manager, rss in zip(managers, (10, 30, 20)):
+            session_id, _, collect = monitor._managers[manager]
+            monitor._managers[manager] = (session_id, {"running": 1, "rss_bytes": rss}, collect)
+        monitor._relieve(time.monotonic())
+        assert [m.kernel is None for m in managers] == [False, True, False]
+    finally:
+        _close(monitor, managers)
+
+
+def test_recycle_action_starts_a_replacement(managers):
+    monitor = _monitor(managers[:1], available_watermark=2.0, min_idle=0, action="recycle")
+    try:
+        first = managers[0].kernel
+        monitor.sample()
+        replacement = managers[0]._replacement
+        assert replacement is not None and first is not None
+
+        deadline = time.monotonic() + 10
+        while not replacement.stats()["ready"]:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        assert managers[0].execute("//sim: print=x")["status"] == "ok"
+        assert managers[0].kernel is not first
+    finally:
+        _close(monitor, managers)
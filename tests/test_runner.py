@@ -0,0 +1,79 @@
+# tests/test_runner.py
+#
+# The notebook load generator: notebook loading, statistics, a short
+# closed-loop run on the simulator and rejections from a remote gateway.
+
+import json
+import socket
+import threading
+
+from core.runner import LoadStats, RemoteTarget, load_notebooks, main
+
+
+def _notebooks(directory):
+    (directory / "a.ipynb").write_text(json.dumps({"cells": [
+        {"cell_type": "markdown", "source": ["# title"]},
+        {"cell_type": "code", "source": ["int a = 1;\n", "int b = a;"]},
+        {"cell_type": "code", "source": "//sim: print=hi"},
+        {"cell_type": "code", "source": "   "}
+    ]}))
+    (directory / "b.cpp").write_text("int c = 1;\n//%% second\nint d = c;\n// %%\n\n")
+    (directory / "notes.md").write_text("not a notebook")
+
+
+def test_load_notebooks(tmp_path):
+    _notebooks(tmp_path)
+
+    assert load_notebooks(str(tmp_path)) == [
+        ("a.ipynb", ["int a = 1;\nint b = a;", "//sim: print=hi"]),
+        ("b.cpp", ["int c = 1;", "int d = c;"])
+    ]
+    assert load_notebooks(str(tmp_path), single_line=True)[0][1][0] == "int a = 1; int b = a;"
+
+
+def test_summary_rates():
+    stats = LoadStats()
+    for status in ("ok", "ok", "error", "timeout", "rejected"):
+        stats.record(status, 0.01)
+
+    interval = stats.take_interval(2.0, 3)
+    assert interval["cells"] == 5 and interval["cells_per_sec"] == 2.5
+    assert interval["error_rate"] == interval["timeout_rate"] == interval["rejected_rate"] == 0.2
+    assert stats.take_interval(1.0, 3)["cells"] == 0
+    assert stats.summary(2.0, 0)["cells"] == 5
+
+
+def test_closed_loop_on_the_simulator(tmp_path):
+    notebooks = tmp_path / "notebooks"
+    notebooks.mkdir()
+    _notebooks(notebooks)
+    out = tmp_path / "summary.json"
+
+    main(["--notebooks", str(notebooks), "--kernel", "sim", "--concurrency", "2",
+          "--duration", "1", "--report-interval", "0.5", "--seed", "0", "--out", str(out)])
+
+    summary = json.loads(out.read_text())
+    assert summary["cells"] > 0 and summary["error_rate"] == 0.0
+    assert summary["sessions_finished"] >= 2 and summary["kernels"] == 0
+
+
+def test_remote_rejections_are_not_errors():
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def gateway():
+        conn, _ = server.accept()
+        with conn, conn.makefile("r") as reader:
+            for line in reader:
+                request = json.loads(line)
+                reply = {"type": "error", "request_id": request["request_id"], "error_type": "overloaded",
+                         "message": "busy", "retry_after": 0.5}
+                conn.sendall((json.dumps(reply) + "\n").encode("utf-8"))
+
+    threading.Thread(target=gateway, daemon=True).start()
+    target = RemoteTarget(f"127.0.0.1:{server.getsockname()[1]}")
+    session = target.open_session()
+    try:
+        assert target.run(session, "int x = 1;", 3) == "rejected"
+    finally:
+        target.close_session(session)
+        server.close()
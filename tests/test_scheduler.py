@@ -0,0 +1,75 @@
+# tests/test_scheduler.py
+#
+# Superseding queued and running requests for a cell, and retries of a
+# request_id, which attach to the original run instead.
+
+import time
+
+import pytest
+
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.fast_messages import ExecuteRequestMessage
+from core.session.notebook_session import NotebookSession
+from core.session.scheduler import ExecutionScheduler
+
+SLOW = "int slow = 0; //sim: sleep=0.5"
+
+
+@pytest.fixture
+def session():
+    session = NotebookSession(session_id="s1", kernel_factory=SimKernel)
+    yield session
+    session.close()
+
+
+def _submit(scheduler, request_id, cell_id, code="int x = 1;"):
+    request = ExecuteRequestMessage(request_id, "s1", "cpp", code, timeout=10, cell_id=cell_id)
+    return scheduler.submit(request, lambda message: None)
+
+
+def test_newer_request_supersedes_queued_one(session):
+    scheduler = ExecutionScheduler(session)
+    _submit(scheduler, "r0", "c0", SLOW)
+    stale = _submit(scheduler, "r1", "c1")
+    fresh = _submit(scheduler, "r2", "c1")
+
+    assert stale.wait(10)["status"] == "superseded"
+    assert fresh.wait(10)["status"] == "ok"
+    assert _submit(scheduler, "r1", "c1").wait(10)["status"] == "superseded"
+    assert scheduler.stats()["superseded_queued"] == 1
+
+
+def test_resubmitted_queued_request_still_runs(session):
+    scheduler = ExecutionScheduler(session)
+    _submit(scheduler, "r0", "c0", SLOW)
+    original = _submit(scheduler, "r1", "c1")
+    retry = _submit(scheduler, "r1", "c1")
+
+    assert original.wait(10)["status"] == "ok"
+    assert retry.wait(10) == original.response
+    assert scheduler.stats()["superseded_queued"] == 0
+    assert session.execution_count == 2
+
+
+def test_resubmitted_running_request_is_not_interrupted(session):
+    scheduler = ExecutionScheduler(session, cancel_running=True)
+    original = _submit(scheduler, "r1", "c1", SLOW)
+    while scheduler.queued():
+        time.sleep(0.01)
+    retry = _submit(scheduler, "r1", "c1", SLOW)
+
+    assert original.wait(10)["status"] == "ok"
+    assert retry.wait(10) == original.response
+    assert scheduler.stats()["superseded_running"] == 0
+
+
+def test_retry_of_answered_request_keeps_its_answer(session):
+    scheduler = ExecutionScheduler(session)
+    first = _submit(scheduler, "r1", "c1")
+    assert first.wait(10)["status"] == "ok"
+
+    _submit(scheduler, "r0", "c0", SLOW)
+    retry = _submit(scheduler, "r1", "c1")
+    _submit(scheduler, "r2", "c1")
+
+    assert retry.wait(10) == first.response
@@ -0,0 +1,111 @@
+# tests/test_shm_ring.py
+#
+# The shared-memory output ring: framing across the wrap point, flow
+# control between producer and consumer, and kernel host output through it.
+
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker
+
+import pytest
+
+from core.kernel import shm_ring
+from core.kernel.remote_kernel import KERNEL_HOST, RemoteKernel, _ping
+from core.kernel.shm_ring import ShmRing
+
+pytestmark = pytest.mark.skipif(not shm_ring.available(), reason="needs eventfd and /dev/shm")
+
+
+@pytest.fixture
+def ring():
+    consumer = ShmRing(capacity=64)
+    producer = ShmRing(consumer.name, data_fd=consumer.data_fd, space_fd=consumer.space_fd)
+    # Attaching in the consumer's own process dropped its tracker entry.
+    resource_tracker.register(consumer.shm._name, "shared_memory")
+    yield producer, consumer
+    # The eventfds are the consumer's to close.
+    producer.data_fd = producer.space_fd = None
+    producer.close()
+    consumer.close()
+
+
+def test_frames_wrap_around_the_end(ring):
+    producer, consumer = ring
+    received = []
+    for i in range(50):
+        # 5-byte header plus 8 to 14 bytes: headers and payloads both straddle the end.
+        data = f"chunk-{i}é"
+        producer.write("stderr" if i % 3 == 0 else "stdout", data)
+        received += consumer.read()
+
+    assert received == [("stderr" if i % 3 == 0 else "stdout", f"chunk-{i}é") for i in range(50)]
+    assert producer.position() > 10 * consumer.capacity
+
+
+def test_read_stops_at_a_position(ring):
+    producer, consumer = ring
+    producer.write("stdout", "a")
+    mark = producer.position()
+    producer.write("stdout", "b")
+
+    assert consumer.read(mark) == [("stdout", "a")]
+    assert consumer.read() == [("stdout", "b")]
+    assert consumer.read() == []
+
+
+def test_oversized_and_full(ring):
+    producer, consumer = ring
+    with pytest.raises(ValueError):
+        producer.write("stdout", "x" * 64)
+
+    producer.write("stdout", "x" * 40)
+    with pytest.raises(TimeoutError):
+        producer.write("stdout", "y" * 20, timeout=0)
+
+
+def test_producer_waits_for_the_consumer(ring):
+    producer, consumer = ring
+    producer.write("stdout", "x" * 40)
+    threading.Timer(0.1, consumer.read).start()
+
+    start = time.monotonic()
+    producer.write("stdout", "y" * 20, timeout=5)
+    assert time.monotonic() - start >= 0.09
+    assert consumer.read() == [("stdout", "y" * 20)]
+
+
+def test_consumer_wakes_on_data(ring):
+    producer, consumer = ring
+    threading.Timer(0.02, producer.write, ("stdout", "hi")).start()
+
+    deadline = time.monotonic() + 5
+    while not consumer.read():
+        assert time.monotonic() < deadline
+        consumer.wait()
+
+
+def test_kernel_host_output_through_the_ring(tmp_path):
+    path = str(tmp_path / "host.sock")
+    host = subprocess.Popen([sys.executable, KERNEL_HOST, "--socket", path])
+    kernel = RemoteKernel(path, "k1", kind="sim", spawn=False, transport="shm", ring_capacity=4096)
+    try:
+        deadline = time.monotonic() + 10
+        while not _ping(path):
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+        kernel.start()
+        output = []
+        result = kernel.execute("//sim: err=100 out=20000 print=end", lambda *chunk: output.append(chunk))
+
+        assert kernel.ring is not None and kernel.transport == "shm"
+        assert result["status"] == "error" and len(result["stderr"]) == 100
+        assert result["stdout"].startswith("end\n") and len(result["stdout"]) == 20004
+        # The two streams are read separately; each keeps its own order.
+        for stream in ("stdout", "stderr"):
+            assert "".join(data for name, data in output if name == stream) == result[stream]
+    finally:
+        kernel.shutdown()
+        host.terminate()
+        host.wait()
@@ -0,0 +1,86 @@
+# tests/test_standby.py
+#
+# Failover to a standby kernel, and what happens when the standby's replay
+# of the mirrored cells diverged from the primary.
+
+import itertools
+import time
+
+from core.kernel import standby_kernel
+from core.kernel.kernal_manager import KernelManager
+from core.kernel.sim_kernel import SimKernel
+from core.kernel.standby_kernel import StandbyKernel
+
+STATE = "int a = 1;"
+
+
+class _Failing(SimKernel):
+
+    # Fails the state cell, as a standby that diverged would.
+    def execute(self, code, on_output=None):
+        if code == STATE:
+            return {"stdout": "", "stderr": "error: redefinition of 'a'", "status": "error"}
+        return super().execute(code, on_output)
+
+
+def _factory(failing):
+    # Kernel number n (1 = the primary) fails the state cell if n in failing.
+    count = itertools.count(1)
+    return lambda: _Failing() if next(count) in failing else SimKernel()
+
+
+def _manager(factory, lost):
+    manager = KernelManager(factory, standby=True, on_state_lost=lambda: lost.append(True))
+    assert manager.execute(STATE)["status"] == "ok"
+    manager.mirror(STATE)
+    for _ in range(500):
+        stats = manager.standby.stats()
+        if stats["pending_cells"] == 0 and (stats["ready"] or stats["diverged"]):
+            break
+        time.sleep(0.01)
+    return manager
+
+
+def test_crash_fails_over_to_the_standby():
+    lost = []
+    manager = _manager(_factory(()), lost)
+    try:
+        result = manager.execute("//sim: crash")
+        assert "state restored from standby kernel" in result["stderr"]
+        assert manager.standby.promotions == 1 and not lost
+    finally:
+        manager.shutdown()
+
+
+def test_diverged_standby_is_not_promoted():
+    lost = []
+    manager = _manager(_factory({2}), lost)
+    try:
+        assert manager.standby.stats()["diverged"]
+        result = manager.execute("//sim: crash")
+        assert "state restored by replaying history" in result["stderr"]
+        assert manager.standby.promotions == 0 and not lost
+        assert manager.execute("//sim: print=up")["stdout"] == "up\n"
+    finally:
+        manager.shutdown()
+
+
+def test_failed_replay_reports_lost_state():
+    lost = []
+    manager = _manager(_factory({2, 3}), lost)
+    try:
+        result = manager.execute("//sim: crash")
+        assert "earlier definitions are lost" in result["stderr"]
+        assert lost == [True]
+        assert manager.history == []
+    finally:
+        manager.shutdown()
+
+
+def test_standby_is_not_deprioritized_when_that_cannot_be_undone(monkeypatch):
+    monkeypatch.setattr(standby_kernel, "_can_raise_priority", lambda: False)
+    standby = StandbyKernel(SimKernel, niceness=10)
+    try:
+        assert standby.niceness == 0
+    finally:
+        standby.close()
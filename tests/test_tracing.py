@@ -0,0 +1,68 @@
+# tests/test_tracing.py
+#
+# Sampled execution traces and their Chrome trace-event export.
+
+import json
+
+import pytest
+
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.fast_messages import ExecuteRequestMessage
+from core.session.notebook_session import NotebookSession
+from core.session.scheduler import ExecutionScheduler
+from core.utils import tracing
+from core.utils.tracing import Tracer
+
+
+@pytest.fixture
+def tracer():
+    yield tracing.enable_tracing(seed=0)
+    tracing.disable_tracing()
+
+
+def test_sampling_and_capacity():
+    tracer = Tracer(capacity=3, sample_rate=0.5, seed=1)
+    for i in range(100):
+        trace = tracer.start("s1", f"r{i}")
+        if trace is not None:
+            tracer.finish(trace)
+
+    assert tracer.started + tracer.sampled_out == 100
+    assert 20 < tracer.started < 80
+    assert len(tracer.traces()) == 3
+
+
+def test_chrome_export_has_a_track_per_session(tmp_path):
+    tracer = Tracer()
+    for session_id, request_id in (("s1", "r1"), ("s2", "r2"), ("s1", "r3")):
+        trace = tracer.start(session_id, request_id)
+        trace.span("execute_request", 1_000, 5_000)
+        tracer.finish(trace)
+
+    path = tmp_path / "trace.json"
+    tracer.write_chrome(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+
+    names = [e["args"]["name"] for e in events if e["ph"] == "M"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert names == ["s1", "s2"]
+    assert [e["tid"] for e in spans] == [1, 2, 1]
+    assert spans[0]["ts"] == 1.0 and spans[0]["dur"] == 4.0
+    assert spans[2]["args"] == {"session_id": "s1", "request_id": "r3"}
+
+
+def test_scheduled_execution_is_traced(tracer):
+    session = NotebookSession(session_id="s1", kernel_factory=SimKernel)
+    try:
+        scheduler = ExecutionScheduler(session)
+        request = ExecuteRequestMessage("r1", "s1", "cpp", "//sim: print=hi", timeout=10)
+        assert scheduler.submit(request, lambda message: None).wait(10)["status"] == "ok"
+    finally:
+        session.close()
+
+    [trace] = tracer.traces()
+    names = [name for name, _, _ in trace.spans]
+    assert names[0] == "queue" and names[-1] == "execute_request"
+    assert {"dispatch", "kernel_write", "first_byte", "completion_marker"} <= set(names)
+    assert all(start <= end for _, start, end in trace.spans)
+
@@ -0,0 +1,73 @@
+# tests/test_transcript.py
+#
+# Transcripts keep raw pipe chunks, and a replay feeds them back so the
+# kernel decodes exactly what it decoded live.
+
+import sys
+import textwrap
+
+import pytest
+
+from core.kernel.cpp_kernel import MARKER_CELL, CppKernel
+from core.kernel.replay_kernel import ReplayKernel
+from core.kernel.transcript import STDOUT, TranscriptRecorder, read_transcript
+
+# A REPL whose output splits a UTF-8 character across writes, carries an
+# invalid byte and leaves a line unterminated until the next cell.
+RAW_CLING = textwrap.dedent("""
+    import os
+    import sys
+    import time
+
+    DONE = b"\\x1eccollab-done\\n"
+    self_marker = "--self-marker" in sys.argv
+    os.write(1, b"cling>\\n")
+    for line in sys.stdin.buffer:
+        if b"fputs" in line:
+            os.write(2, DONE)
+        elif line.startswith(b"split"):
+            for chunk in (b"caf\\xc3", b"\\xa9 \\xff\\n", b"tail"):
+                os.write(1, chunk)
+                time.sleep(0.05)
+        elif line.startswith(b"end"):
+            os.write(1, b" end\\n")
+            os.write(2, b"warn\\n")
+        if self_marker:
+            os.write(2, DONE)
+        os.write(1, b"cling>\\n")
+""")
+
+CELLS = ["split", "end"]
+
+
+def _run(kernel):
+    kernel.start()
+    try:
+        return [kernel.execute(code) for code in CELLS]
+    finally:
+        kernel.shutdown()
+
+
+@pytest.mark.parametrize("marker_cells", [True, False])
+def test_replay_reproduces_raw_output(tmp_path, marker_cells):
+    script = tmp_path / "raw_cling.py"
+    script.write_text(RAW_CLING)
+    path = str(tmp_path / "session.cctr")
+
+    recorder = TranscriptRecorder(path)
+    live = CppKernel([sys.executable, str(script)] + ([] if marker_cells else ["--self-marker"]), recorder)
+    if not marker_cells:
+        live.marker_cell = None
+    live_results = _run(live)
+    recorder.close()
+
+    assert live_results[0]["stdout"] == "café �\n"
+    # The unterminated "tail" ran into the prompt line, live as in replay.
+    assert live_results[1] == {"stdout": " end\n", "stderr": "warn\n", "status": "error"}
+
+    chunks = [data for channel, _, data in read_transcript(path) if channel == STDOUT]
+    assert b"caf\xc3" in chunks and b"\xa9 \xff\n" in chunks
+
+    replay = ReplayKernel(path, speed=0)
+    assert replay.marker_cell == (MARKER_CELL if marker_cells else None)
+    assert _run(replay) == live_results
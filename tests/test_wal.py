@@ -0,0 +1,146 @@
+# tests/test_wal.py
+#
+# The write-ahead log: recovery outcomes after a restart, torn tails,
+# segment compaction, group commit and recovered responses in the scheduler.
+
+import os
+
+import pytest
+
+from core.kernel.sim_kernel import SimKernel
+from core.protocol.fast_messages import ExecuteRequestMessage
+from core.session.notebook_session import NotebookSession
+from core.session.scheduler import ExecutionScheduler
+from core.session.wal import COMPLETED, FAILED, RETRY, RUNNING, WriteAheadLog
+
+
+def _request(request_id, code="//sim: print=hi"):
+    return ExecuteRequestMessage(request_id, "s1", "cpp", code, timeout=10)
+
+
+def _response(request_id):
+    return {"type": "execute_response", "request_id": request_id, "status": "ok"}
+
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "wal")
+
+
+def _reopen(wal, **options):
+    # close() only flushes: the log is left as a crash would leave it.
+    wal.close()
+    return WriteAheadLog(wal.directory, **options)
+
+
+def test_recovery_outcomes(directory):
+    wal = WriteAheadLog(directory)
+    for request_id in ("queued", "running", "done"):
+        wal.accepted(_request(request_id))
+    wal.started("running")
+    wal.started("done")
+    wal.finished("done", "s1", _response("done"))
+    assert wal.status("running") == (RUNNING, None)
+
+    wal = _reopen(wal)
+    try:
+        assert wal.recovered["queued"][0] == RETRY
+        assert wal.recovered_response("queued") is None
+        assert wal.status("queued")[1]["retry_after"] == 0.0
+
+        outcome, response = wal.status("running")
+        assert outcome == FAILED and response["error_type"] == "worker_restarted"
+        assert wal.recovered_response("done") == _response("done")
+        assert wal.status("done") == (COMPLETED, _response("done"))
+        assert wal.status("unknown") is None
+    finally:
+        wal.close()
+
+
+def test_a_started_request_never_returns_to_retry(directory):
+    wal = WriteAheadLog(directory)
+    wal.accepted(_request("r1"))
+    wal.started("r1")
+    wal.accepted(_request("r1"))
+
+    wal = _reopen(wal)
+    try:
+        assert wal.recovered["r1"][0] == FAILED
+    finally:
+        wal.close()
+
+
+def test_torn_tail_is_dropped(directory):
+    wal = WriteAheadLog(directory)
+    wal.accepted(_request("r1"))
+    wal.finished("r1", "s1", _response("r1"))
+    wal.close()
+
+    [segment] = os.listdir(directory)
+    with open(os.path.join(directory, segment), "ab") as f:
+        f.write(b"\x40\x00\x00\x00\x00\x00\x00\x00{\"op\":")
+    open(os.path.join(directory, "0000000000000009.wal.tmp"), "wb").close()
+
+    wal = WriteAheadLog(directory)
+    try:
+        assert wal.torn_records == 1
+        assert wal.recovered_response("r1") == _response("r1")
+        assert not any(name.endswith(".tmp") for name in os.listdir(directory))
+    finally:
+        wal.close()
+
+
+def test_rotation_compacts_into_a_snapshot(directory):
+    wal = WriteAheadLog(directory, segment_bytes=512, retain=5, sync=False)
+    for i in range(50):
+        wal.accepted(_request(f"r{i}"))
+        wal.flush()
+        if i != 49:
+            wal.finished(f"r{i}", "s1", _response(f"r{i}"))
+    wal.flush()
+    assert wal.stats()["segment"] > 2
+    assert len(os.listdir(directory)) == 1
+
+    wal = _reopen(wal, retain=5, sync=False)
+    try:
+        # r49 is resolved as RETRY on replay and pushes r44 out.
+        assert sorted(wal.recovered) == ["r45", "r46", "r47", "r48", "r49"]
+        assert wal.recovered["r49"][0] == RETRY
+    finally:
+        wal.close()
+
+
+def test_group_commit_shares_fsyncs(directory):
+    wal = WriteAheadLog(directory, commit_delay=0.05)
+    try:
+        for i in range(20):
+            wal.accepted(_request(f"r{i}"))
+        assert wal.flush(10)
+        stats = wal.stats()
+        assert stats["records"] == 20 and stats["commits"] < 5
+    finally:
+        wal.close()
+
+
+def test_scheduler_answers_a_recovered_request_without_running_it(directory):
+    wal = WriteAheadLog(directory)
+    wal.accepted(_request("done"))
+    wal.started("done")
+    wal.finished("done", "s1", _response("done"))
+    wal.accepted(_request("queued"))
+    wal = _reopen(wal)
+
+    session = NotebookSession(session_id="s1", kernel_factory=SimKernel)
+    try:
+        scheduler = ExecutionScheduler(session, wal=wal)
+        sent = []
+        assert scheduler.submit(_request("done"), sent.append).wait(10) == _response("done")
+        assert sent == [_response("done")] and session.execution_count == 0
+
+        # A request that never ran runs now, and its outcome replaces RETRY.
+        assert scheduler.submit(_request("queued"), sent.append).wait(10)["status"] == "ok"
+        wal.flush()
+        assert wal.status("queued")[0] == COMPLETED
+    finally:
+        session.close()
+        wal.close()
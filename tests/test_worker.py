@@ -0,0 +1,99 @@
+# tests/test_worker.py
+#
+# Session workers on one machine: migration between them, and session ids
+# that must never reach outside files_root.
+
+import os
+import threading
+
+import pytest
+
+from core.kernel.sim_kernel import SimKernel
+from core.session.routing import RoutingTable
+from core.session.worker import MigrationError, SessionWorker, request
+
+
+def _worker(tmp_path, name, **options):
+    worker = SessionWorker(str(tmp_path / f"{name}.sock"), RoutingTable(str(tmp_path / "routes.json")),
+                           SimKernel, **options)
+    threading.Thread(target=worker.serve, daemon=True).start()
+    for _ in range(100):
+        if os.path.exists(worker.address):
+            break
+        threading.Event().wait(0.01)
+    return worker
+
+
+def _session(worker, session_id, cells):
+    worker.routing.claim(session_id, worker.address)
+    session = worker._open(session_id)
+    for code in cells:
+        assert session.run_cell(code, timeout=10)["status"] == "ok"
+    return session
+
+
+@pytest.fixture
+def workers(tmp_path):
+    started = [_worker(tmp_path, "w1"), _worker(tmp_path, "w2")]
+    yield started
+    for worker in started:
+        worker.close()
+
+
+def test_migration_moves_the_session(workers):
+    source, target = workers
+    _session(source, "s1", ["int a = 1;", "int b = a;"])
+
+    stats = source.migrate("s1", target.address)
+
+    assert stats["replayed_cells"] >= 1
+    assert source.routing.lookup("s1") == target.address
+    assert source.sessions() == [] and target.sessions() == ["s1"]
+
+
+def test_failed_assign_drops_the_targets_copy(workers, monkeypatch):
+    source, target = workers
+    _session(source, "s1", ["int a = 1;"])
+    monkeypatch.setattr(source.routing, "assign", lambda *args, **kwargs: False)
+
+    with pytest.raises(MigrationError):
+        source.migrate("s1", target.address)
+
+    assert target.sessions() == []
+    assert source.sessions() == ["s1"]
+    assert source.routing.lookup("s1") == source.address
+
+
+def test_migration_past_its_deadline_leaves_the_session(workers):
+    source, target = workers
+    _session(source, "s1", ["int a = 1; //sim: sleep=0.6", "int b = 2; //sim: sleep=0.6"])
+
+    with pytest.raises(MigrationError):
+        source.migrate("s1", target.address, timeout=0.5)
+
+    assert target.sessions() == []
+    assert source.routing.lookup("s1") == source.address
+
+
+@pytest.mark.parametrize("session_id", ["../victim", "/tmp/abs", "a/b", "..", ""])
+def test_session_ids_cannot_leave_files_root(tmp_path, session_id):
+    root = tmp_path / "files"
+    victim = tmp_path / "victim"
+    victim.mkdir()
+    (victim / "keep.txt").write_text("data")
+    worker = _worker(tmp_path, "w", files_root=str(root))
+    try:
+        for message in (
+            {"type": "drop_session", "session_id": session_id},
+            {"type": "import_session", "session_id": session_id, "cells": [], "files": None},
+            {"type": "execute_request", "request_id": "r1", "session_id": session_id,
+             "language": "cpp", "code": "int x = 1;"},
+        ):
+            reply = request(worker.address, message, timeout=5)
+            assert reply["error_type"] == "invalid_message"
+    finally:
+        worker.close()
+
+    assert (victim / "keep.txt").read_text() == "data"
+    assert set(os.listdir(tmp_path)) <= {"files", "victim", "routes.json", "routes.json.lock"}
+    assert not os.path.exists("/tmp/abs")